@@ -0,0 +1,96 @@
+# agentic_rag_pipeline/benchmarks/bench_structural_splitter.py
+#
+# Micro-benchmark: แบ่งประมวลกฎหมายขนาดใหญ่ (ค่า Default ~1 ล้านตัวอักษร) ตามโครงสร้าง "มาตรา"
+# เทียบวิธีเดิม (re.search/re.split ทีละ Pattern + สร้าง RecursiveCharacterTextSplitter ใหม่ทุกชิ้น)
+# กับ Structural Splitter Engine (regex รวมรอบเดียว + Splitter ตัวเดียวที่ใช้ร่วมกัน)
+#
+# วิธีรัน (จากโฟลเดอร์แม่ของ agentic_rag_pipeline):
+#   python -m agentic_rag_pipeline.benchmarks.bench_structural_splitter --chars 1000000
+
+import re
+import time
+import argparse
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from agentic_rag_pipeline.components.structural_splitter import split_structural
+
+
+def _legacy_split(text: str) -> list:
+    """
+    วิธีเดิมก่อนปรับปรุง (คัดลอกมาเพื่อใช้เทียบเท่านั้น)
+    Pattern เดิมเขียนเป็น '\\\\n' ตามตัวอักษร ซึ่งไม่ตรงกับการขึ้นบรรทัดจริง จึงแก้เป็น '\\n' เพื่อให้เทียบงานเดียวกัน
+    """
+    patterns = [
+        r'(\nมาตรา\s+\d+)',
+        r'(\nบทที่\s+\d+)',
+        r'(\nคำถาม:)',
+    ]
+    for pattern in patterns:
+        if re.search(pattern, text):
+            structural_parts = re.split(pattern, text)
+            combined_parts = []
+            if structural_parts[0] and structural_parts[0].strip():
+                combined_parts.append(structural_parts[0].strip())
+            for i in range(1, len(structural_parts), 2):
+                combined_parts.append((structural_parts[i] + structural_parts[i + 1]).strip())
+
+            pieces = []
+            for part in combined_parts:
+                splitter = RecursiveCharacterTextSplitter(
+                    chunk_size=1000, chunk_overlap=150, separators=["\\n\\n", "\\n", " ", ""]
+                )
+                pieces.extend(splitter.split_text(part))
+            return pieces
+    return []
+
+
+def _make_law_compilation(target_chars: int) -> str:
+    """ประมวลกฎหมายสังเคราะห์: หมวด -> มาตรา (มีมาตราสั้น/ยาวปนกัน และมีการอ้างถึงมาตรากลางประโยค)"""
+    blocks = ["ประมวลกฎหมายทดสอบ\nพ.ศ. ๒๕๖๙\n"]
+    size = len(blocks[0])
+    article = 1
+    while size < target_chars:
+        if article % 40 == 1:
+            block = f"\nหมวด {article // 40 + 1}\nบทบัญญัติเกี่ยวกับเรื่องที่ {article // 40 + 1}\n"
+            blocks.append(block)
+            size += len(block)
+        body = "ผู้ใดกระทำการตามที่กำหนดไว้ในมาตรา ๓ ต้องระวางโทษตามที่บัญญัติไว้ในหมวดนี้ " * (1 + article % 7)
+        block = f"\nมาตรา {article} {body}\n"
+        blocks.append(block)
+        size += len(block)
+        article += 1
+    return "".join(blocks)
+
+
+def _time(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark structural splitting of a large law text.")
+    parser.add_argument("--chars", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    text = _make_law_compilation(args.chars)
+    legacy_pieces = _legacy_split(text)
+    _, engine_pieces = split_structural(text, "กฎหมาย")
+    print(f"เอกสารทดสอบ: {len(text):,} ตัวอักษร, {text.count(chr(10) + 'มาตรา'):,} มาตรา")
+    print(f"  จำนวน Chunk: เดิม {len(legacy_pieces):,} / ใหม่ {len(engine_pieces):,} (ผลเหมือนกัน: {legacy_pieces == engine_pieces})")
+
+    legacy = _time(_legacy_split, text, args.repeat)
+    engine = _time(lambda t: split_structural(t, "กฎหมาย"), text, args.repeat)
+
+    print(f"  search/split + new splitter (เดิม): {legacy * 1000:10.1f} ms")
+    print(f"  compiled single-pass engine (ใหม่): {engine * 1000:10.1f} ms")
+    print(f"  เร็วขึ้น {legacy / engine:.1f} เท่า")
+
+
+if __name__ == "__main__":
+    main()
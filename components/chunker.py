@@ -1,42 +1,18 @@
 # agentic_rag_pipeline/components/chunker.py (เวอร์ชัน V2 + V5)
 
-import re
+import copy
+import json
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from llama_index.core.node_parser import SemanticSplitterNodeParser
-from llama_index.core.schema import Document
 
-from agentic_rag_pipeline.core.llm_provider import get_embed_model 
+from agentic_rag_pipeline.components.semantic_splitter import semantic_split
+from agentic_rag_pipeline.components.structural_splitter import get_recursive_splitter, split_structural
 
 
-# --- [V5+V2] เพิ่ม Import ที่ขาดไป ---
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding # <-- บรรทัดนี้จะใช้ได้แล้ว
-from agentic_rag_pipeline import config
-
-
-# --- [V2] อัปเกรด Helper Function 1: Recursive ---
-def _recursive_strategy(
-    text_piece: str, 
-    base_metadata: dict, 
-    start_chunk_num: int,  # <-- [V2] รับเลขเริ่มต้น
-    chunk_size: int = 1000,
-    chunk_overlap: int = 150
-) -> List[Dict[str, Any]]:
-    """
-    กลยุทธ์การแบ่งตามขนาดที่ยืดหยุ่นที่สุด (RecursiveCharacterTextSplitter)
-    """
-    print(f" -> ใช้กลยุทธ์ Recursive Splitting (Size: {chunk_size}, Overlap: {chunk_overlap})...")
-    
-    separators = ["\\n\\n", "\\n", " ", ""]
-    
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        separators=separators
-    )
-    
-    split_texts = text_splitter.split_text(text_piece)
-    
+def _build_chunks(split_texts: List[str], base_metadata: dict, start_chunk_num: int) -> List[Dict[str, Any]]:
+    """ห่อข้อความแต่ละชิ้นเป็น Chunk (เติม Header ของเอกสาร/Section และนับเลข chunk_number ต่อ)"""
     chunks = []
     doc_title = base_metadata.get("document_title", "ไม่ระบุหัวข้อ")
     section_title = base_metadata.get("section_title", "N/A") # <-- [V2] ดึงชื่อ Section
@@ -55,6 +31,24 @@ def _recursive_strategy(
         
     return chunks
 
+# --- [V2] อัปเกรด Helper Function 1: Recursive ---
+def _recursive_strategy(
+    text_piece: str, 
+    base_metadata: dict, 
+    start_chunk_num: int,  # <-- [V2] รับเลขเริ่มต้น
+    chunk_size: int = 1000,
+    chunk_overlap: int = 150
+) -> List[Dict[str, Any]]:
+    """
+    กลยุทธ์การแบ่งตามขนาดที่ยืดหยุ่นที่สุด (RecursiveCharacterTextSplitter)
+    """
+    print(f" -> ใช้กลยุทธ์ Recursive Splitting (Size: {chunk_size}, Overlap: {chunk_overlap})...")
+    
+    # ใช้ Splitter ตัวเดียวร่วมกันต่อขนาด/overlap (ไม่สร้างใหม่ทุกครั้ง)
+    text_splitter = get_recursive_splitter(chunk_size, chunk_overlap)
+    split_texts = text_splitter.split_text(text_piece)
+    return _build_chunks(split_texts, base_metadata, start_chunk_num)
+
 # --- [V2] อัปเกรด Helper Function 2: Structural ---
 def _structural_strategy(
     text_piece: str, 
@@ -62,50 +56,18 @@ def _structural_strategy(
     start_chunk_num: int  # <-- [V2] รับเลขเริ่มต้น
 ) -> List[Dict[str, Any]]:
     """
-    กลยุทธ์การแบ่งตามโครงสร้างที่ชัดเจน เช่น 'มาตรา', 'บทที่', 'คำถาม:'
+    กลยุทธ์การแบ่งตามโครงสร้างที่ชัดเจน เช่น 'มาตรา', 'ข้อ', 'บทที่', 'คำถาม:'
+    (Pattern เลือกตาม document_type ดู components/structural_splitter.py)
     """
     print(" -> พยายามใช้กลยุทธ์ Structural Splitting...")
     
-    patterns = [
-        r'(\\nมาตรา\\s+\\d+)',     # กฎหมาย
-        r'(\\nบทที่\\s+\\d+)',      # ระเบียบ/คู่มือ
-        r'(\\nคำถาม:)',          # เอกสาร Q&A
-    ]
-    
-    final_chunks = []
-    
-    for pattern in patterns:
-        if re.search(pattern, text_piece):
-            print(f" -> ตรวจพบโครงสร้าง! กำลังแบ่งตาม pattern: {pattern}")
-            
-            structural_parts = re.split(pattern, text_piece)
-            
-            combined_parts = []
-            if structural_parts[0] and structural_parts[0].strip():
-                 combined_parts.append(structural_parts[0].strip())
+    pattern, split_texts = split_structural(text_piece, base_metadata.get("document_type"))
+    if not split_texts:
+        print(" -> ไม่พบโครงสร้างที่ชัดเจน")
+        return []
 
-            for i in range(1, len(structural_parts), 2):
-                combined_chunk = (structural_parts[i] + structural_parts[i+1]).strip()
-                combined_parts.append(combined_chunk)
-            
-            # [V2] หลังจากแบ่งตามโครงสร้างแล้ว ให้ใช้ Recursive เพื่อแบ่งชิ้นส่วนที่ยังใหญ่อยู่
-            # โดยส่งต่อ global_chunk_counter
-            global_chunk_counter = start_chunk_num
-            for part in combined_parts:
-                sub_chunks = _recursive_strategy(
-                    text_piece=part,
-                    base_metadata=base_metadata,
-                    start_chunk_num=global_chunk_counter, # <-- [V2] ส่งเลขปัจจุบัน
-                    chunk_size=1000, # (ใช้ค่า Default สำหรับ sub-chunking)
-                    chunk_overlap=150
-                )
-                final_chunks.extend(sub_chunks)
-                global_chunk_counter += len(sub_chunks) # <-- [V2] อัปเดตตัวนับ
-            
-            return final_chunks 
-
-    print(" -> ไม่พบโครงสร้างที่ชัดเจน")
-    return []
+    print(f" -> ตรวจพบโครงสร้าง! แบ่งตาม pattern: {pattern} ได้ {len(split_texts)} ชิ้น")
+    return _build_chunks(split_texts, base_metadata, start_chunk_num)
 
 
 # --- [V2] อัปเกรด Helper Function 3: Semantic ---
@@ -117,32 +79,86 @@ def _semantic_strategy(
 ) -> List[Dict[str, Any]]:
     print(f" -> ใช้กลยุทธ์ Semantic Splitting (Threshold: {breakpoint_threshold})...")
     try:
-        # [ใหม่!] สร้าง Embedding Wrapper ของ LlamaIndex โดยตรง
-        wrapped_embed_model = HuggingFaceEmbedding(model_name=config.EMBED_MODEL_NAME)
-
-        splitter = SemanticSplitterNodeParser(
-            embed_model=wrapped_embed_model, # <--- ส่ง Wrapper ของ LlamaIndex เข้าไปโดยตรง
-            breakpoint_percentile_threshold=breakpoint_threshold
-        )
-        nodes = splitter.get_nodes_from_documents([Document(text=text_piece)])
-
-        chunks = []
-        doc_title = base_metadata.get("document_title", "ไม่ระบุหัวข้อ")
-        section_title = base_metadata.get("section_title", "N/A") # <-- [V2] ดึงชื่อ Section
-
-        for i, node in enumerate(nodes):
-            chunk_metadata = base_metadata.copy()
-            chunk_metadata["chunk_number"] = start_chunk_num + i # <-- [V2] นับเลขต่อ
-            
-            # [V2] เพิ่ม Context ของ Section เข้าไป
-            enriched_content = f"จากเอกสาร: {doc_title}\nส่วน: {section_title}\n\n{node.get_content()}"
-            chunks.append({"content": enriched_content, "metadata": chunk_metadata})
-
-        return chunks
+        # Semantic Splitter แบบ Native: ตัดประโยคภาษาไทย, embed ครั้งเดียว (จำ distance ไว้ต่อ Section)
+        split_texts = semantic_split(text_piece, breakpoint_threshold=breakpoint_threshold)
+        return _build_chunks(split_texts, base_metadata, start_chunk_num)
     except Exception as e:
         print(f"   -> ❌ Semantic Splitting ล้มเหลว: {e}")
         return [] # ถ้าล้มเหลว ให้คืนค่าลิสต์ว่าง
 
+# --- Memo ผลลัพธ์ราย Section ---
+# เมื่อ Validator สั่ง RETRY_SECTION เฉพาะ Section เดียว Section อื่นๆ ที่ไม่เปลี่ยนจะดึงผลเดิมจาก memo
+# (key = hash ของเนื้อหา Section + กลยุทธ์ + พารามิเตอร์ + metadata) แทนการแบ่งใหม่ทั้งเอกสาร
+_STRATEGY_PARAMS = {
+    "recursive": {"chunk_size": 1000, "chunk_overlap": 150},
+    "semantic": {"breakpoint_threshold": 95},
+    "structural": {},
+}
+_SECTION_MEMO_SIZE = 512
+_section_memo: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+_section_memo_lock = threading.Lock()
+
+def _section_memo_key(section_text: str, strategy: str, section_metadata: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        [strategy, _STRATEGY_PARAMS.get(strategy, {}), section_metadata],
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(f"{payload}\0{section_text}".encode("utf-8")).hexdigest()
+
+def _run_strategy(section_text: str, section_metadata: Dict[str, Any], strategy: str) -> List[Dict[str, Any]]:
+    """แบ่ง Section เดียวตามกลยุทธ์ (ไม่มีแผนสำรอง) โดยนับเลข chunk_number เริ่มที่ 1 คืนลิสต์ว่างถ้าล้มเหลว"""
+    # --- [V2] เลือกเครื่องมือตามกลยุทธ์ที่กำหนด ---
+    if strategy == "structural":
+        return _structural_strategy(section_text, section_metadata, 1)
+    if strategy == "semantic":
+        return _semantic_strategy(section_text, section_metadata, 1, **_STRATEGY_PARAMS["semantic"])
+    # Default to "recursive"
+    return _recursive_strategy(section_text, section_metadata, 1, **_STRATEGY_PARAMS["recursive"])
+
+def _memoized_strategy(section_text: str, section_metadata: Dict[str, Any], strategy: str) -> List[Dict[str, Any]]:
+    """
+    เหมือน _run_strategy แต่ดึงจาก memo ถ้าเคยแบ่งด้วยกลยุทธ์และเงื่อนไขเดียวกันแล้ว
+    จำเฉพาะผลที่สำเร็จ (กลยุทธ์ที่ล้มเหลวจะถูกลองใหม่ในรอบถัดไป)
+    """
+    key = _section_memo_key(section_text, strategy, section_metadata)
+    with _section_memo_lock:
+        cached = _section_memo.get(key)
+        if cached is not None:
+            _section_memo.move_to_end(key)
+    if cached is not None:
+        print(f"   -> ♻️ ใช้ผลการแบ่งเดิมของ Section นี้ ({len(cached)} Chunks) ไม่ต้องแบ่งใหม่")
+        return cached
+
+    section_chunks = _run_strategy(section_text, section_metadata, strategy)
+    if section_chunks:
+        with _section_memo_lock:
+            _section_memo[key] = section_chunks
+            while len(_section_memo) > _SECTION_MEMO_SIZE:
+                _section_memo.popitem(last=False)
+    return section_chunks
+
+def _get_section_chunks(
+    section_text: str,
+    section_metadata: Dict[str, Any],
+    strategy: str,
+    start_chunk_num: int
+) -> List[Dict[str, Any]]:
+    """
+    คืน Chunks ของ Section ตามกลยุทธ์ (ถ้าล้มเหลวใช้ Recursive เป็นแผนสำรอง)
+    แล้วนับเลข chunk_number ใหม่ให้ต่อจาก start_chunk_num
+    """
+    section_chunks = _memoized_strategy(section_text, section_metadata, strategy)
+    # [V2] Fallback
+    if not section_chunks and strategy in ("structural", "semantic"):
+        print(f"   -> ⚠️ {strategy.capitalize()} ล้มเหลว, ใช้ Recursive เป็นแผนสำรอง")
+        section_chunks = _memoized_strategy(section_text, section_metadata, "recursive")
+
+    # คัดลอกก่อนแก้ไข เพื่อไม่ให้ผลใน memo ถูกเปลี่ยน (เช่น Indexer เติม knowledge_item_id)
+    renumbered = copy.deepcopy(section_chunks)
+    for i, chunk in enumerate(renumbered):
+        chunk["metadata"]["chunk_number"] = start_chunk_num + i
+    return renumbered
+
 # --- [V2+V5] Main Function (เวอร์ชันอัปเกรด) ---
 def create_chunks_for_text(
     text: str,
@@ -198,25 +214,7 @@ def create_chunks_for_text(
         section_metadata["section_title"] = title
         section_metadata["strategy_used"] = strategy
 
-        section_chunks = []
-        
-        # --- [V2] เลือกเครื่องมือตามกลยุทธ์ที่กำหนด ---
-        if strategy == "structural":
-            section_chunks = _structural_strategy(section_text, section_metadata, global_chunk_counter)
-            # [V2] Fallback
-            if not section_chunks:
-                print("   -> ⚠️ Structural ล้มเหลว, ใช้ Recursive เป็นแผนสำรอง")
-                section_chunks = _recursive_strategy(section_text, section_metadata, global_chunk_counter)
-        
-        elif strategy == "semantic":
-            section_chunks = _semantic_strategy(section_text, section_metadata, global_chunk_counter)
-            # [V2] Fallback
-            if not section_chunks:
-                print("   -> ⚠️ Semantic ล้มเหลว, ใช้ Recursive เป็นแผนสำรอง")
-                section_chunks = _recursive_strategy(section_text, section_metadata, global_chunk_counter)
-        
-        else: # Default to "recursive"
-            section_chunks = _recursive_strategy(section_text, section_metadata, global_chunk_counter)
+        section_chunks = _get_section_chunks(section_text, section_metadata, strategy, global_chunk_counter)
             
         all_chunks.extend(section_chunks)
         global_chunk_counter += len(section_chunks) # <-- [V2] อัปเดตตัวนับสำหรับ Section ถัดไป
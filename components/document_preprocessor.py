@@ -3,17 +3,30 @@
 import os
 import re
 import io
+import json
+import time
+import subprocess
 import docx
+from docx.oxml.ns import qn
+from docx.table import Table
+from docx.text.paragraph import Paragraph
 import ftfy
 import pandas as pd
-from pdf2image import convert_from_path
-from openai import OpenAI
+from collections import deque
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from pdf2image import convert_from_path, pdfinfo_from_path
+from openai import OpenAI, APITimeoutError, RateLimitError
 from langchain.prompts import PromptTemplate
 
 # --- ส่วนประกอบภายใน Component ---
 # Import การตั้งค่ากลางและ LLM Provider ของโปรเจกต์เรา
 from agentic_rag_pipeline import config
-from agentic_rag_pipeline.core.llm_provider import get_llm
+from agentic_rag_pipeline.core.llm_provider import get_llm_client
+from agentic_rag_pipeline.core.cache import DiskCache, make_cache_key
+from agentic_rag_pipeline.core.concurrency import AdaptiveLimiter, SingleFlight, OUTCOME_SUCCESS, OUTCOME_OVERLOAD, OUTCOME_ERROR
+from agentic_rag_pipeline.components.html_table_converter import html_table_to_markdown
+from agentic_rag_pipeline.components.text_quality import needs_proofreading, score_text_quality
 
 # --- 1. OCR Agent (ดัดแปลงจาก layout_analyzer.py) ---
 # สร้าง Client ไว้ล่วงหน้าเพื่อประสิทธิภาพที่ดีกว่า
@@ -22,6 +35,56 @@ _ocr_client = OpenAI(
     base_url=config.OCR_API_BASE,
     timeout=360.0,
 )
+_OCR_MODEL = "typhoon-ocr-preview"
+_OCR_PROMPT = "Return the markdown representation of this document."
+
+# Cache ผลลัพธ์ OCR รายหน้าบนดิสก์ (หน้าเดิม เช่น หัวจดหมาย/ภาคผนวก จะไม่ต้องเรียก API ซ้ำ)
+_ocr_cache = DiskCache(
+    path=os.path.join(config.CACHE_DIR, "ocr_pages.sqlite"),
+    max_bytes=config.OCR_CACHE_MAX_MB * 1024 * 1024,
+)
+
+# จำนวน Request ที่ส่งไปยัง OCR Service พร้อมกัน ปรับเองแบบ AIMD (เพดานคือ OCR_MAX_CONCURRENCY)
+_ocr_limiter = AdaptiveLimiter(
+    "ocr",
+    min_limit=config.OCR_MIN_CONCURRENCY if config.ADAPTIVE_CONCURRENCY_ENABLED else config.OCR_MAX_CONCURRENCY,
+    max_limit=config.OCR_MAX_CONCURRENCY,
+    latency_target_seconds=config.OCR_LATENCY_TARGET_SECONDS,
+)
+
+# หน้าเดียวกัน (รูปเหมือนกัน) ที่ถูก OCR พร้อมกันจากหลายงาน จะเรียก API เพียงครั้งเดียว
+_ocr_single_flight = SingleFlight("ocr")
+
+def get_ocr_cache_stats() -> Dict[str, Any]:
+    """คืนค่าสถิติ hit/miss ของ OCR cache"""
+    return _ocr_cache.stats()
+
+def get_ocr_concurrency_stats() -> Dict[str, Any]:
+    """คืนค่า limit ปัจจุบันและสถิติของตัวควบคุม concurrency ของ OCR"""
+    return _ocr_limiter.stats()
+
+def get_ocr_single_flight_stats() -> Dict[str, Any]:
+    """คืนค่าจำนวนคำขอ OCR ที่ถูกรวมกับคำขอเดียวกันที่กำลังทำงานอยู่"""
+    return _ocr_single_flight.stats()
+
+def _call_ocr_api(messages: List[Dict[str, Any]]) -> str:
+    """เรียก OCR API ภายใต้ _ocr_limiter แล้วแจ้งผล (สำเร็จ / 429,timeout / error อื่น) ให้ limiter ปรับขนาด"""
+    _ocr_limiter.acquire()
+    started = time.monotonic()
+    outcome = OUTCOME_ERROR
+    try:
+        response = _ocr_client.chat.completions.create(
+            model=_OCR_MODEL,
+            messages=messages,
+            max_tokens=4096,
+        )
+        outcome = OUTCOME_SUCCESS
+        return response.choices[0].message.content
+    except (RateLimitError, APITimeoutError):
+        outcome = OUTCOME_OVERLOAD
+        raise
+    finally:
+        _ocr_limiter.release(outcome, time.monotonic() - started)
 
 def _ocr_image(image_object) -> str:
     """
@@ -35,50 +98,363 @@ def _ocr_image(image_object) -> str:
         from typhoon_ocr.ocr_utils import image_to_base64png
         image_base64 = image_to_base64png(image_object)
 
-        messages = [{
-            "role": "user",
-            "content": [
-                {"type": "text", "text": "Return the markdown representation of this document."},
-                {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_base64}"}},
-            ],
-        }]
+        # ตรวจ cache ก่อน: key คือ hash ของรูปหน้า (PNG) + model + prompt
+        cache_key = make_cache_key(image_base64, _OCR_MODEL, _OCR_PROMPT)
+        if config.OCR_CACHE_ENABLED:
+            cached_text = _ocr_cache.get(cache_key)
+            if cached_text is not None:
+                return cached_text
 
-        response = _ocr_client.chat.completions.create(
-            model="typhoon-ocr-preview",
-            messages=messages,
-            max_tokens=4096,
-        )
-        raw_output = response.choices[0].message.content
+        def ocr_page() -> str:
+            messages = [{
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": _OCR_PROMPT},
+                    {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_base64}"}},
+                ],
+            }]
 
-        # Extract text from the "natural_text" field if present
-        match = re.search(r'\{\s*"natural_text":\s*"(.*)"\s*\}', raw_output, re.DOTALL)
-        if match:
-            return match.group(1).encode('utf-8').decode('unicode_escape')
+            raw_output = _call_ocr_api(messages)
+
+            # Extract text from the "natural_text" field if present
+            match = re.search(r'\{\s*"natural_text":\s*"(.*)"\s*\}', raw_output, re.DOTALL)
+            if match:
+                raw_output = match.group(1).encode('utf-8').decode('unicode_escape')
+
+            if config.OCR_CACHE_ENABLED and raw_output:
+                _ocr_cache.set(cache_key, raw_output)
+            return raw_output
+
+        # หน้าเดียวกันที่กำลัง OCR อยู่ในงานอื่น: รอผลของคำขอนั้นแทนการเรียก API ซ้ำ
+        raw_output, _ = _ocr_single_flight.do(cache_key, ocr_page)
         return raw_output
 
     except Exception as e:
         print(f" -> ERROR: เกิดข้อผิดพลาดในการเรียก OCR API: {e}")
         return ""
 
+def _iter_page_windows(page_numbers: Iterable[int], window_size: int) -> Iterable[List[int]]:
+    """
+    แบ่งเลขหน้าออกเป็นหน้าต่าง (window) ที่เป็นช่วงหน้าติดกัน และยาวไม่เกิน window_size
+    เพื่อให้ convert_from_path แปลงเฉพาะช่วงหน้านั้นๆ ได้ในครั้งเดียว
+    """
+    window: List[int] = []
+    for page_number in page_numbers:
+        if window and (len(window) >= window_size or page_number != window[-1] + 1):
+            yield window
+            window = []
+        window.append(page_number)
+    if window:
+        yield window
+
+def _convert_single_page(file_path: str, page_number: int):
+    """แปลง PDF หน้าเดียวเป็นรูปภาพ คืน None ถ้าแปลงไม่ได้"""
+    try:
+        images = convert_from_path(file_path, first_page=page_number, last_page=page_number)
+    except Exception as e:
+        print(f" -> ERROR: แปลงหน้าที่ {page_number} เป็นรูปภาพไม่ได้: {e}")
+        return None
+    if len(images) != 1:
+        print(f" -> ERROR: แปลงหน้าที่ {page_number} เป็นรูปภาพไม่ได้ (ได้ {len(images)} รูป)")
+        return None
+    return images[0]
+
+def _iter_ocr_pdf_pages(file_path: str, page_numbers: Iterable[int]) -> Iterator[Tuple[int, str]]:
+    """
+    OCR เฉพาะหน้าที่ระบุแบบ Streaming: แปลง PDF เป็นรูปภาพทีละหน้าต่าง (OCR_PAGE_WINDOW หน้า)
+    แล้วส่งไปยัง OCR service พร้อมกันไม่เกิน OCR_MAX_CONCURRENCY request
+    ระหว่างรอผลของหน้าต่างปัจจุบัน จะเตรียมหน้าต่างถัดไปไว้ล่วงหน้าเพียงหน้าต่างเดียว
+    RAM จึงคงที่ (ไม่เกิน 2 หน้าต่าง) ไม่ว่าเอกสารจะยาวแค่ไหน
+
+    Yields:
+        Tuple[int, str]: (เลขหน้า, ข้อความ) เรียงตามลำดับของ page_numbers เสมอ ครบทุกหน้า
+                         (หน้าที่แปลงเป็นรูปภาพไม่ได้จะเป็นข้อความว่าง)
+    """
+    page_numbers = list(page_numbers)
+    window_size = max(1, config.OCR_PAGE_WINDOW)
+
+    with ThreadPoolExecutor(max_workers=max(1, config.OCR_MAX_CONCURRENCY)) as executor:
+        def submit_window(window: List[int]):
+            print(f" -> กำลัง OCR หน้าที่ {window[0]}-{window[-1]} (จากทั้งหมด {len(page_numbers)} หน้า)...")
+            try:
+                images = convert_from_path(file_path, first_page=window[0], last_page=window[-1])
+            except Exception as e:
+                # แปลงทั้งหน้าต่างไม่ได้: ไม่หยุดทั้งไฟล์ แต่ลองแปลงทีละหน้า (หน้าที่ยังแปลงไม่ได้จะเป็นข้อความว่าง)
+                print(f" -> WARNING: แปลงหน้าที่ {window[0]}-{window[-1]} เป็นรูปภาพไม่ได้, จะแปลงทีละหน้าแทน: {e}")
+                images = [_convert_single_page(file_path, page_number) for page_number in window]
+            if len(images) != len(window):
+                # ได้รูปไม่ครบ (เช่น หน้าเสีย) ไม่รู้ว่าหน้าไหนหายไป: แปลงทีละหน้าเพื่อจับคู่เลขหน้าให้ถูก
+                print(f" -> WARNING: แปลงหน้าที่ {window[0]}-{window[-1]} ได้ {len(images)}/{len(window)} รูป, จะแปลงทีละหน้าแทน")
+                images = [_convert_single_page(file_path, page_number) for page_number in window]
+            return window, [executor.submit(_ocr_image, image) if image is not None else None for image in images]
+
+        pending = deque()
+        for window in _iter_page_windows(page_numbers, window_size):
+            pending.append(submit_window(window))
+            if len(pending) < 2:
+                continue
+            done_window, futures = pending.popleft()
+            for page_number, future in zip(done_window, futures):
+                yield page_number, future.result() if future is not None else ""
+
+        while pending:
+            done_window, futures = pending.popleft()
+            for page_number, future in zip(done_window, futures):
+                yield page_number, future.result() if future is not None else ""
+
+def _ocr_pdf_pages(file_path: str, page_numbers: Iterable[int]) -> Dict[int, str]:
+    """
+    OCR เฉพาะหน้าที่ระบุ (ดู _iter_ocr_pdf_pages)
+
+    Returns:
+        Dict[int, str]: ข้อความของแต่ละหน้า โดยใช้เลขหน้า (เริ่มที่ 1) เป็น key
+    """
+    return dict(_iter_ocr_pdf_pages(file_path, page_numbers))
+
+def _extract_pdf_text_layer(file_path: str) -> Dict[int, str]:
+    """
+    อ่าน Text Layer ที่ฝังอยู่ใน PDF ด้วย pdftotext (มาพร้อม poppler ที่ pdf2image ใช้อยู่แล้ว)
+    pdftotext คั่นแต่ละหน้าด้วย form feed (\\f) จึงเรียกครั้งเดียวได้ทั้งไฟล์
+
+    Returns:
+        Dict[int, str]: ข้อความของหน้าที่ "ใช้ได้" เท่านั้น (เลขหน้าเริ่มที่ 1)
+                        หน้าที่เป็นภาพสแกน หรือข้อความเพี้ยน (เช่น ฟอนต์ไทยแบบเก่า) จะไม่อยู่ในผลลัพธ์
+    """
+    try:
+        result = subprocess.run(
+            ["pdftotext", "-enc", "UTF-8", file_path, "-"],
+            capture_output=True, check=True, timeout=300,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f" -> WARNING: อ่าน Text Layer ของ PDF ไม่ได้, จะใช้ OCR ทุกหน้า: {e}")
+        return {}
+
+    usable_pages: Dict[int, str] = {}
+    for page_number, page_text in enumerate(result.stdout.decode("utf-8", errors="replace").split("\f"), start=1):
+        page_text = page_text.strip()
+        if len(page_text) < config.PDF_TEXT_LAYER_MIN_CHARS:
+            continue
+        if score_text_quality(page_text)["score"] < config.PROOFREAD_QUALITY_THRESHOLD:
+            continue
+        usable_pages[page_number] = page_text
+    return usable_pages
+
+def _iter_pdf_pages(file_path: str, total_pages: int) -> Iterator[Tuple[int, str]]:
+    """
+    สกัดข้อความจาก PDF ทีละหน้าตามลำดับ: ใช้ Text Layer ของหน้าที่เป็น PDF ดิจิทัล
+    และ OCR (แบบ Streaming ทีละหน้าต่าง) เฉพาะหน้าที่เป็นภาพสแกนหรือข้อความเพี้ยน
+    """
+    page_texts: Dict[int, str] = {}
+    if config.PDF_TEXT_LAYER_ENABLED:
+        page_texts = _extract_pdf_text_layer(file_path)
+        print(f" -> ใช้ Text Layer ได้ {len(page_texts)}/{total_pages} หน้า")
+
+    pages_to_ocr = [p for p in range(1, total_pages + 1) if p not in page_texts]
+    if pages_to_ocr:
+        print(f" -> ต้อง OCR {len(pages_to_ocr)} หน้า...")
+    ocr_pages = _iter_ocr_pdf_pages(file_path, pages_to_ocr)
+    ocr_page = None
+
+    for page_number in range(1, total_pages + 1):
+        if page_number in page_texts:
+            yield page_number, page_texts[page_number]
+            continue
+        # หน้าที่ต้อง OCR ถูกส่งออกมาตามลำดับเดียวกับ pages_to_ocr: ตรวจเลขหน้าทุกครั้ง ไม่ให้หน้าเลื่อน
+        while ocr_page is None or ocr_page[0] < page_number:
+            ocr_page = next(ocr_pages, (total_pages + 1, ""))
+        if ocr_page[0] == page_number:
+            yield ocr_page
+        else:
+            print(f" -> WARNING: ไม่ได้ผล OCR ของหน้าที่ {page_number}, ใช้ข้อความว่างแทน")
+            yield page_number, ""
+
+    if pages_to_ocr and config.OCR_CACHE_ENABLED:
+        cache_stats = _ocr_cache.stats()
+        print(f" -> OCR cache: hit {cache_stats['hits']} / miss {cache_stats['misses']} (สะสม)")
+
 def _handle_pdf_extraction(file_path: str) -> str:
-    """จัดการสกัดข้อความจาก PDF ด้วย OCR"""
-    print(" -> ตรวจพบ PDF, เริ่มกระบวนการสกัดด้วย OCR...")
-    full_content = []
+    """จัดการสกัดข้อความจาก PDF (Text Layer + OCR เฉพาะหน้าที่จำเป็น) แล้วรวมกันทีละหน้า"""
+    print(" -> ตรวจพบ PDF, เริ่มกระบวนการสกัดข้อความ...")
     try:
-        images = convert_from_path(file_path)
-        for i, image in enumerate(images):
-            print(f" -> กำลัง OCR หน้าที่ {i + 1}/{len(images)}...")
-            text_from_page = _ocr_image(image)
-            full_content.append(text_from_page)
+        total_pages = int(pdfinfo_from_path(file_path).get("Pages", 0))
+        full_content = [page_text for _, page_text in _iter_pdf_pages(file_path, total_pages)]
         return "\\n\\n--- PAGE BREAK ---\\n\\n".join(full_content)
     except Exception as e:
-        print(f" -> ERROR: ไม่สามารถแปลง PDF เป็นรูปภาพได้: {e}")
+        print(f" -> ERROR: ไม่สามารถสกัดข้อความจาก PDF ได้: {e}")
         return ""
 
+# --- 1.5 DOCX Agent: สกัดข้อความพร้อมโครงสร้าง (หัวข้อ/ตาราง) ---
+# ไฟล์ .docx มีโครงสร้างอยู่แล้ว (Style หัวข้อ, Outline Level, ตาราง) จึงสร้าง layout_map ได้ทันที
+# พร้อมตำแหน่งตัวอักษรที่แน่นอน โดยไม่ต้องให้ LLM มาเดาโครงสร้างใหม่
+_DOCX_HEADING_STYLE = re.compile(r'^(?:heading|หัวเรื่อง)\s*(\d)$', re.IGNORECASE)
+# Outline Level 9 ใน Word คือ "Body Text" (ไม่ใช่หัวข้อ)
+_DOCX_BODY_OUTLINE_LEVEL = 9
+# ระยะค้นหัวข้อรอบตำแหน่งเดิมหลังพิสูจน์อักษร (ตัวอักษร, อย่างน้อย 2% ของความยาวข้อความ)
+_REANCHOR_WINDOW_CHARS = 500
+
+def _docx_outline_level(paragraph: Paragraph) -> Optional[int]:
+    """ระดับหัวข้อของย่อหน้า (0 = ระดับสูงสุด) จาก Outline Level ของย่อหน้า หรือจาก Style (ไล่ตาม Style แม่) คืน None ถ้าไม่ใช่หัวข้อ"""
+    p_pr = paragraph._p.pPr
+    outline = p_pr.find(qn('w:outlineLvl')) if p_pr is not None else None
+    style = paragraph.style
+    while outline is None and style is not None:
+        match = _DOCX_HEADING_STYLE.match(style.name or "")
+        if match:
+            return int(match.group(1)) - 1
+        style_p_pr = style.element.pPr
+        outline = style_p_pr.find(qn('w:outlineLvl')) if style_p_pr is not None else None
+        style = style.base_style
+    if outline is None:
+        return None
+    level = int(outline.get(qn('w:val')))
+    return level if level < _DOCX_BODY_OUTLINE_LEVEL else None
+
+def _docx_table_to_markdown(table: Table) -> str:
+    rows = []
+    for row in table.rows:
+        cells, previous = [], None
+        for cell in row.cells:
+            # เซลล์ที่ผสานกัน (merged) python-docx จะคืนเซลล์เดิมซ้ำ ให้นับครั้งเดียว
+            if previous is not None and cell._tc is previous:
+                continue
+            previous = cell._tc
+            cells.append(" ".join(cell.text.split()).replace("|", "\\|"))
+        rows.append(cells)
+    rows = [row for row in rows if any(row)]
+    if not rows:
+        return ""
+    width = max(len(row) for row in rows)
+    lines = ["| " + " | ".join(row + [""] * (width - len(row))) + " |" for row in rows]
+    lines.insert(1, "| " + " | ".join(["---"] * width) + " |")
+    return "\n".join(lines)
+
+def _docx_layout_map(headings: List[Tuple[int, int, str]], text_length: int) -> Optional[Dict[str, Any]]:
+    """
+    สร้าง layout_map จากหัวข้อ [(ตำแหน่ง, ระดับ, ข้อความ)] โดยแบ่ง Section ที่ "ระดับหลัก"
+    (ระดับสูงสุดที่มีอย่างน้อย 2 หัวข้อ เช่น ถ้ามี Heading 1 แค่ชื่อเรื่องเดียว จะแบ่งที่ Heading 2)
+    """
+    if not headings:
+        return None
+    levels = sorted({level for _, level, _ in headings})
+    split_level = next(
+        (level for level in levels if sum(1 for _, h_level, _ in headings if h_level == level) >= 2),
+        levels[0]
+    )
+    boundaries = [(offset, title) for offset, level, title in headings if level <= split_level]
+
+    sections = []
+    if boundaries[0][0] > 0:
+        sections.append({"title": "ส่วนนำ", "char_start": 0})
+    for offset, title in boundaries:
+        sections.append({"title": title, "char_start": offset})
+    for i, section in enumerate(sections):
+        section["section_id"] = i + 1
+        section["char_end"] = sections[i + 1]["char_start"] if i + 1 < len(sections) else text_length
+        section["recommended_strategy"] = "recursive"
+    return {"sections": sections, "analysis": {"source": "docx", "headings": len(boundaries)}}
+
+def _extract_docx(file_path: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    สกัดข้อความจาก .docx ตามลำดับในเอกสาร (ย่อหน้า + ตารางเป็น Markdown) พร้อม layout_map จากหัวข้อ
+
+    Returns:
+        Tuple[str, Optional[Dict[str, Any]]]: (ข้อความ, layout_map หรือ None ถ้าไม่มีหัวข้อ)
+    """
+    doc = docx.Document(file_path)
+    blocks: List[str] = []
+    headings: List[Tuple[int, int, str]] = []
+    offset = 0
+    for element in doc.element.body.iterchildren():
+        if element.tag == qn('w:p'):
+            paragraph = Paragraph(element, doc)
+            block = ftfy.fix_text(paragraph.text)
+            level = _docx_outline_level(paragraph) if block.strip() else None
+            if level is not None:
+                headings.append((offset, level, block.strip()))
+        elif element.tag == qn('w:tbl'):
+            block = _docx_table_to_markdown(Table(element, doc))
+            block = ftfy.fix_text(block)
+        else:
+            continue
+        blocks.append(block)
+        offset += len(block) + 1  # +1 สำหรับ "\n" ที่ใช้เชื่อมแต่ละ block
+
+    text = "\n".join(blocks)
+    layout_map = _docx_layout_map(headings, len(text)) if config.DOCX_NATIVE_LAYOUT_ENABLED else None
+    return text, layout_map
+
+def _heading_pattern(heading: str) -> Optional[re.Pattern]:
+    """หัวข้อแบบยืดหยุ่นเรื่องช่องว่าง (พิสูจน์อักษรอาจรวม/แยกช่องว่างหรือขึ้นบรรทัดใหม่) คืน None ถ้าหัวข้อว่าง"""
+    tokens = heading.split()
+    return re.compile(r'\s+'.join(re.escape(token) for token in tokens)) if tokens else None
+
+def _locate_heading(text: str, heading: str, start: int, end: Optional[int] = None) -> int:
+    """หาตำแหน่งแรกของหัวข้อในช่วง [start, end) (ตรงตัวก่อน แล้วค่อยค้นแบบยืดหยุ่นเรื่องช่องว่าง) คืน -1 ถ้าไม่พบ"""
+    end = len(text) if end is None else end
+    offset = text.find(heading, start, end)
+    pattern = _heading_pattern(heading)
+    if offset != -1 or pattern is None:
+        return offset
+    match = pattern.search(text, start, end)
+    return match.start() if match else -1
+
+def _locate_heading_near(text: str, heading: str, expected: int, start: int, end: int) -> int:
+    """หาตำแหน่งของหัวข้อในช่วง [start, end) ที่ใกล้ expected ที่สุด คืน -1 ถ้าไม่พบ"""
+    pattern = _heading_pattern(heading)
+    if pattern is None:
+        return -1
+    offsets = [match.start() for match in pattern.finditer(text, start, end)]
+    return min(offsets, key=lambda offset: abs(offset - expected)) if offsets else -1
+
+def _reanchor_layout_map(layout_map: Optional[Dict[str, Any]], text: str) -> Optional[Dict[str, Any]]:
+    """
+    หลังพิสูจน์อักษร ตำแหน่งตัวอักษรอาจเลื่อน: หาหัวข้อแต่ละตัวในข้อความใหม่ตามลำดับ
+    ถ้าหัวข้อยังอยู่ที่ตำแหน่งเดิมพอดีใช้ตำแหน่งเดิม ไม่เช่นนั้นเลือกตำแหน่งที่ใกล้ตำแหน่งเดิมที่สุด
+    (ปรับตามความยาวข้อความที่เปลี่ยนไป) เพื่อไม่ให้ไปเจอชื่อหัวข้อเดียวกันในสารบัญหรือการอ้างอิงข้ามหัวข้อ
+    ถ้าไม่พบในระยะค้นจึงค้นต่อจากหัวข้อก่อนหน้า
+    หัวข้อที่หาไม่พบ (เช่น ถูกแก้คำ) หรือพบเฉพาะก่อนหัวข้อก่อนหน้า จะถูกรวมเข้ากับ Section ก่อนหน้า
+    """
+    if not layout_map:
+        return layout_map
+    # char_end ของ Section สุดท้าย = ความยาวข้อความก่อนพิสูจน์อักษร
+    scale = len(text) / max(1, layout_map["sections"][-1]["char_end"])
+    window = max(_REANCHOR_WINDOW_CHARS, len(text) // 50)
+    anchored = []
+    cursor = 0
+    for section in layout_map["sections"]:
+        if section["char_start"] == 0 and not anchored:
+            anchored.append(dict(section))
+            continue
+        title = section["title"]
+        if section["char_start"] >= cursor and text.startswith(title, section["char_start"]):
+            offset = section["char_start"]
+        else:
+            expected = int(section["char_start"] * scale)
+            low, high = max(0, expected - window), min(len(text), expected + window + len(title))
+            offset = _locate_heading_near(text, title, expected, max(low, cursor), high)
+            if offset == -1:
+                if _locate_heading(text, title, low, min(high, cursor + len(title))) != -1:
+                    print(f" -> WARNING: หัวข้อ '{title}' อยู่ก่อนหัวข้อก่อนหน้าในข้อความหลังพิสูจน์อักษร, รวมเข้ากับ Section ก่อนหน้า")
+                    continue
+                offset = _locate_heading(text, title, cursor)
+        if offset == -1:
+            print(f" -> WARNING: หาหัวข้อ '{title}' ในข้อความหลังพิสูจน์อักษรไม่พบ, รวมเข้ากับ Section ก่อนหน้า")
+            continue
+        anchored.append({**section, "char_start": offset})
+        cursor = offset + 1
+    if not anchored:
+        return None
+    anchored[0]["char_start"] = 0
+    for i, section in enumerate(anchored):
+        section["section_id"] = i + 1
+        section["char_end"] = anchored[i + 1]["char_start"] if i + 1 < len(anchored) else len(text)
+    return {**layout_map, "sections": anchored}
+
 # --- 2. Extraction Agent (ดัดแปลงจาก extractor.py) ---
-def _extract_raw_text_from_file(file_path: str) -> str:
+def _extract_raw_text_and_layout(file_path: str) -> Tuple[str, Optional[Dict[str, Any]]]:
     """
     ตรวจสอบนามสกุลไฟล์และเลือกวิธีสกัดข้อความดิบที่เหมาะสม
+    ไฟล์ที่มีโครงสร้างในตัว (.docx) จะได้ layout_map กลับมาด้วย (ไฟล์อื่นเป็น None)
     """
     print(f"สถานีที่ 1.1: กำลังสกัดข้อความดิบจาก {os.path.basename(file_path)}...")
     _, file_extension = os.path.splitext(file_path)
@@ -87,21 +463,27 @@ def _extract_raw_text_from_file(file_path: str) -> str:
         if file_extension.lower() == '.pdf':
             content = _handle_pdf_extraction(file_path)
         elif file_extension.lower() == '.docx':
-            doc = docx.Document(file_path)
-            content = "\\n".join([para.text for para in doc.paragraphs])
+            # ftfy ถูกใช้ทีละ block ภายใน _extract_docx แล้ว ตำแหน่งใน layout_map จึงตรงกับข้อความ
+            return _extract_docx(file_path)
         elif file_extension.lower() == '.txt':
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
         else:
             print(f" -> WARNING: ไม่รองรับนามสกุลไฟล์: {file_extension}")
-            return ""
+            return "", None
         
         # ใช้ ftfy ซ่อม "ภาษาต่างดาว" เบื้องต้นเสมอ
-        return ftfy.fix_text(content)
+        return ftfy.fix_text(content), None
         
     except Exception as e:
         print(f" -> ERROR: เกิดข้อผิดพลาดในการสกัดข้อความ: {e}")
-        return ""
+        return "", None
+
+def _extract_raw_text_from_file(file_path: str) -> str:
+    """
+    ตรวจสอบนามสกุลไฟล์และเลือกวิธีสกัดข้อความดิบที่เหมาะสม
+    """
+    return _extract_raw_text_and_layout(file_path)[0]
 
 # --- 3. Proofreader Agent (ดัดแปลงจาก proofreader.py) ---
 _proofread_prompt_template = PromptTemplate.from_template(
@@ -120,28 +502,196 @@ _proofread_prompt_template = PromptTemplate.from_template(
 """
 )
 
+# [โหมด edits] ให้ LLM ส่งกลับเฉพาะ "รายการคำที่ต้องแก้" แทนการเขียนข้อความทั้งหมดซ้ำ
+_proofread_edits_prompt_template = PromptTemplate.from_template(
+    """คุณคือบรรณาธิการตรวจทานอักษรที่มีความแม่นยำสูงสุด ภารกิจของคุณคือหาคำที่ผิดเพี้ยนจากการสแกน (OCR) หรือการสะกดผิดเล็กน้อยในข้อความต้นฉบับ
+
+**กฎเหล็กที่คุณต้องปฏิบัติตาม:**
+1.  **ห้ามเขียนข้อความต้นฉบับกลับมาทั้งหมด:** ให้ระบุเฉพาะจุดที่ต้องแก้ไขเท่านั้น
+2.  **"original" ต้องคัดลอกมาจากต้นฉบับแบบตรงทุกตัวอักษร** และยาวพอที่จะหาเจอได้ (เช่น ทั้งคำหรือทั้งวลี)
+3.  **แก้ไขเฉพาะที่ผิด:** คำที่สะกดผิด, สระหรือวรรณยุกต์เพี้ยน, หรือตัวอักษรที่ผิดพลาดจากการ OCR อย่างชัดเจนเท่านั้น ห้ามสรุปหรือเรียบเรียงใหม่
+4.  เรียงรายการตามลำดับที่ปรากฏในต้นฉบับ ถ้าไม่มีจุดที่ต้องแก้ ให้ตอบ "corrections" เป็นลิสต์ว่าง
+
+**จงตอบกลับเป็น JSON object ที่มีโครงสร้างดังนี้เท่านั้น:**
+{{
+  "corrections": [
+    {{"original": "ข้อความที่ผิดในต้นฉบับ", "replacement": "ข้อความที่ถูกต้อง"}}
+  ]
+}}
+
+**ข้อความต้นฉบับ:**
+"{text_to_proofread}"
+"""
+)
+
+def _parse_corrections(raw_text: str) -> List[Dict[str, str]]:
+    """แยกรายการแก้ไข (corrections) ออกจากคำตอบของ LLM ถ้าไม่ใช่ JSON ที่ถูกต้องจะโยน ValueError"""
+    json_string = raw_text[raw_text.find('{'):raw_text.rfind('}') + 1]
+    try:
+        corrections = json.loads(json_string).get("corrections")
+    except (json.JSONDecodeError, AttributeError) as e:
+        raise ValueError(f"คำตอบของ LLM ไม่ใช่ JSON ที่ถูกต้อง: {e}")
+    if not isinstance(corrections, list):
+        raise ValueError("คำตอบของ LLM ไม่มีลิสต์ 'corrections'")
+    return corrections
+
+def _apply_corrections(text: str, corrections: List[Dict[str, str]]) -> str:
+    """
+    นำรายการแก้ไขมาแทนที่ในข้อความต้นฉบับ (ทำในเครื่อง ไม่ต้องเรียก LLM)
+    แต่ละรายการต้องหา "original" เจอในข้อความ (ต่อจากจุดที่แก้ไปล่าสุด) ไม่เช่นนั้นจะถูกข้าม
+    เพื่อไม่ให้การแก้ไขทับซ้อนกันหรือไปแก้ผิดตำแหน่ง
+    """
+    output = []
+    cursor = 0
+    applied = 0
+    for correction in corrections:
+        if not isinstance(correction, dict):
+            continue
+        original = correction.get("original")
+        replacement = correction.get("replacement")
+        if not isinstance(original, str) or not isinstance(replacement, str) or not original:
+            continue
+        idx = text.find(original, cursor)
+        if idx == -1:
+            print(f" -> WARNING: ไม่พบข้อความ '{original[:30]}' ในต้นฉบับ, ข้ามการแก้ไขนี้")
+            continue
+        output.append(text[cursor:idx])
+        output.append(replacement)
+        cursor = idx + len(original)
+        applied += 1
+    output.append(text[cursor:])
+    if corrections:
+        print(f" -> แก้ไขได้ {applied}/{len(corrections)} จุด")
+    return "".join(output)
+
+_HTML_TABLE_PATTERN = re.compile(r'(<table.*?>.*?</table>)', re.DOTALL)
+
+def _html_table_to_markdown_with_pandas(html_table_str: str) -> str:
+    """แผนสำรอง: แปลงตาราง HTML ด้วย pandas.read_html (ช้ากว่า แต่รองรับ HTML ที่เพี้ยนได้มากกว่า)"""
+    df_list = pd.read_html(io.StringIO(html_table_str))
+    if not df_list:
+        raise ValueError("pandas ไม่พบตารางใน HTML")
+    return df_list[0].to_markdown(index=False)
+
 def _convert_html_tables_to_markdown(text: str) -> str:
-    """ค้นหาและแปลงตาราง HTML ในข้อความเป็น Markdown"""
-    tables = list(re.finditer(r'(<table.*?>.*?</table>)', text, re.DOTALL))
-    if not tables:
+    """
+    ค้นหาและแปลงตาราง HTML ในข้อความเป็น Markdown
+    ทำในรอบเดียว: ต่อข้อความผลลัพธ์ลง buffer ทีละช่วง แทนการสร้างข้อความทั้งก้อนใหม่ทุกครั้งที่แทนที่ตาราง
+    ใช้ตัวแปลงแบบเบา (html_table_converter) เป็นหลัก และใช้ pandas เป็นแผนสำรองเท่านั้น
+    """
+    if "<table" not in text:
         return text
 
-    print(f" -> ตรวจพบ {len(tables)} ตาราง HTML, กำลังแปลงเป็น Markdown...")
-    # วนลูปจากหลังมาหน้าเพื่อไม่ให้ index เพี้ยนตอนแทนที่
-    for table_match in reversed(tables):
+    output = []
+    cursor = 0
+    table_count = 0
+    for table_match in _HTML_TABLE_PATTERN.finditer(text):
         html_table_str = table_match.group(1)
+        start, end = table_match.span()
+        table_count += 1
+        try:
+            markdown_table = html_table_to_markdown(html_table_str)
+        except Exception:
+            try:
+                markdown_table = _html_table_to_markdown_with_pandas(html_table_str)
+            except Exception as e:
+                # ถ้าแปลงไม่ได้ก็ข้ามไป (คงตาราง HTML เดิมไว้) ไม่ทำให้โปรแกรมหยุด
+                print(f" -> WARNING: ไม่สามารถแปลงตารางได้, ข้ามไป... Error: {e}")
+                continue
+        output.append(text[cursor:start])
+        output.append(f"\\n\\n{markdown_table}\\n\\n")
+        cursor = end
+
+    if table_count:
+        print(f" -> ตรวจพบ {table_count} ตาราง HTML, แปลงเป็น Markdown แล้ว")
+    output.append(text[cursor:])
+    return "".join(output)
+
+# ลำดับตัวแบ่งที่ใช้หาจุดตัดข้อความ: ย่อหน้า -> บรรทัด -> ช่องว่าง (ภาษาไทยเว้นวรรคระหว่างวลี)
+_PART_SEPARATORS = ["\n\n", "\n", " "]
+
+def _split_text_parts(text: str, max_chars: int) -> List[str]:
+    """
+    แบ่งข้อความเป็นส่วนๆ ยาวไม่เกิน max_chars โดยตัดที่ขอบย่อหน้า/บรรทัด/ช่องว่างเท่านั้น
+    เพื่อไม่ให้คำภาษาไทยถูกตัดกลางคำ (ตัดตรงๆ เฉพาะกรณีที่ไม่มีตัวแบ่งเลยในช่วงนั้น)
+    ตัวแบ่งจะติดไปกับส่วนก่อนหน้า ดังนั้น "".join(parts) == text เสมอ
+    """
+    parts = []
+    start = 0
+    while len(text) - start > max_chars:
+        window = text[start:start + max_chars]
+        cut = -1
+        for separator in _PART_SEPARATORS:
+            idx = window.rfind(separator)
+            if idx > 0:
+                cut = idx + len(separator)
+                break
+        if cut <= 0:
+            cut = max_chars
+        parts.append(text[start:start + cut])
+        start += cut
+    if start < len(text):
+        parts.append(text[start:])
+    return parts
+
+def _plan_proofread_parts(text: str) -> List[Tuple[str, bool]]:
+    """
+    วางแผนว่าส่วนไหนต้องส่งให้ LLM พิสูจน์อักษร
+    ตรวจคุณภาพทีละย่อหน้าด้วยตัวตรวจในเครื่อง (text_quality) แล้วรวมย่อหน้าที่ติดกัน
+    และมีผลตรวจเหมือนกันเข้าเป็นส่วนเดียว (ส่วนที่ต้องแก้จะยาวไม่เกิน PROOFREAD_PART_SIZE)
+
+    Returns:
+        List[Tuple[str, bool]]: (ข้อความ, ต้องส่งให้ LLM หรือไม่) เรียงตามลำดับต้นฉบับ
+    """
+    max_chars = config.PROOFREAD_PART_SIZE
+    if not config.PROOFREAD_QUALITY_GATE:
+        return [(part, True) for part in _split_text_parts(text, max_chars)]
+
+    planned: List[Tuple[str, bool]] = []
+    for paragraph in re.split(r'(?<=\n\n)', text):
+        for piece in _split_text_parts(paragraph, max_chars):
+            flagged = needs_proofreading(piece)
+            if planned and planned[-1][1] == flagged and (
+                not flagged or len(planned[-1][0]) + len(piece) <= max_chars
+            ):
+                planned[-1] = (planned[-1][0] + piece, flagged)
+            else:
+                planned.append((piece, flagged))
+    return planned
+
+def _proofread_part(part: str, llm) -> str:
+    """
+    พิสูจน์อักษรข้อความหนึ่งส่วน ถ้าล้มเหลวจะคืนข้อความเดิมกลับไป เพื่อไม่ให้เนื้อหาส่วนนั้นหายไป
+    (การลองใหม่เมื่อเรียก LLM ไม่สำเร็จเป็นหน้าที่ของ LLMClient ซึ่งมี backoff และ deadline อยู่แล้ว)
+    ในโหมด "edits" LLM จะส่งกลับเฉพาะรายการแก้ไข แล้วนำมาแทนที่ในเครื่อง
+    ถ้ารายการแก้ไขอ่านไม่ได้ (ไม่ใช่ JSON) จะถามใหม่ทันทีได้อีกไม่เกิน PROOFREAD_MAX_RETRIES ครั้ง
+    """
+    if not part.strip():
+        return part
+    # LLM มักตัดช่องว่าง/การขึ้นบรรทัดที่หัวท้ายทิ้ง จึงเก็บไว้แล้วต่อกลับให้เหมือนต้นฉบับ
+    leading = part[:len(part) - len(part.lstrip())]
+    trailing = part[len(part.rstrip()):]
+    edits_mode = config.PROOFREAD_MODE == "edits"
+    prompt_template = _proofread_edits_prompt_template if edits_mode else _proofread_prompt_template
+    formatted_prompt = prompt_template.format(text_to_proofread=part)
+
+    attempts = config.PROOFREAD_MAX_RETRIES + 1 if edits_mode else 1
+    for attempt in range(attempts):
         try:
-            # ใช้ pandas อ่าน HTML ที่เป็นตาราง
-            df_list = pd.read_html(io.StringIO(html_table_str))
-            if df_list:
-                markdown_table = df_list[0].to_markdown(index=False)
-                start, end = table_match.span()
-                text = f"{text[:start]}\\n\\n{markdown_table}\\n\\n{text[end:]}"
+            # ครั้งที่ถามใหม่ไม่ใช้คำตอบเดิมจาก cache (คำตอบเดิมอ่านไม่ได้)
+            response = llm.complete(formatted_prompt, refresh=attempt > 0)
         except Exception as e:
-            # ถ้าแปลงไม่ได้ก็ข้ามไป ไม่ทำให้โปรแกรมหยุด
-            print(f" -> WARNING: ไม่สามารถแปลงตารางได้, ข้ามไป... Error: {e}")
-            pass
-    return text
+            print(f" -> WARNING: พิสูจน์อักษรล้มเหลว: {e}")
+            break
+        if not edits_mode:
+            return f"{leading}{response.text.strip()}{trailing}"
+        try:
+            return _apply_corrections(part, _parse_corrections(response.text))
+        except ValueError as e:
+            print(f" -> WARNING: อ่านรายการแก้ไขไม่ได้ (ครั้งที่ {attempt + 1}): {e}")
+
+    print(" -> WARNING: ใช้ข้อความต้นฉบับแทนสำหรับส่วนนี้")
+    return part
 
 def _proofread_text(text: str, llm) -> str:
     """
@@ -158,17 +708,19 @@ def _proofread_text(text: str, llm) -> str:
     cleaned_text = re.sub(r'\\n{3,}', '\\n\\n', cleaned_text) # ลดการเว้นบรรทัดเกิน
 
     # 2. พิสูจน์อักษรด้วย LLM (แบ่งส่งทีละส่วนเพื่อไม่ให้ context ยาวเกินไป)
-    print(" -> กำลังส่งข้อความให้ LLM ช่วยพิสูจน์อักษร...")
-    final_proofread_text = []
-    # แบ่งข้อความทุกๆ 4000 ตัวอักษร
-    text_parts = [cleaned_text[i:i+4000] for i in range(0, len(cleaned_text), 4000)]
+    # ส่งเฉพาะส่วนที่ตัวตรวจคุณภาพเห็นว่า "น่าสงสัย" พร้อมกันไม่เกิน PROOFREAD_MAX_CONCURRENCY ส่วน
+    planned_parts = _plan_proofread_parts(cleaned_text)
+    parts_to_fix = [part for part, flagged in planned_parts if flagged]
+    skipped_chars = sum(len(part) for part, flagged in planned_parts if not flagged)
+    if config.PROOFREAD_QUALITY_GATE and cleaned_text:
+        print(f" -> ตัวตรวจคุณภาพ: ข้อความสะอาดอยู่แล้ว {skipped_chars / len(cleaned_text):.0%} (ข้ามการส่ง LLM)")
+    print(f" -> กำลังส่งข้อความ {len(parts_to_fix)} ส่วนให้ LLM ช่วยพิสูจน์อักษร...")
 
-    for i, part in enumerate(text_parts):
-        print(f" -> กำลังพิสูจน์อักษรส่วนที่ {i+1}/{len(text_parts)}...")
-        formatted_prompt = _proofread_prompt_template.format(text_to_proofread=part)
-        response = llm.complete(formatted_prompt)
-        final_proofread_text.append(response.text)
+    with ThreadPoolExecutor(max_workers=max(1, config.PROOFREAD_MAX_CONCURRENCY)) as executor:
+        # executor.map คืนผลตามลำดับของ parts_to_fix เสมอ ผลลัพธ์จึงเรียงเหมือนต้นฉบับ
+        fixed_parts = iter(list(executor.map(lambda part: _proofread_part(part, llm), parts_to_fix)))
 
+    final_proofread_text = [next(fixed_parts) if flagged else part for part, flagged in planned_parts]
     return "".join(final_proofread_text)
 
 # --- 4. Main Function ของ Component ---
@@ -183,21 +735,81 @@ def process_document(file_path: str) -> str:
     Returns:
         str: The cleaned and proofread text content, or an empty string if processing fails.
     """
+    return process_document_with_layout(file_path)[0]
+
+def process_document_with_layout(file_path: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    เหมือน process_document แต่คืน layout_map ที่ได้จากโครงสร้างของไฟล์ (.docx) มาด้วย
+    ตำแหน่งใน layout_map อ้างอิงข้อความหลังพิสูจน์อักษรแล้ว
+
+    Returns:
+        Tuple[str, Optional[Dict[str, Any]]]: (ข้อความ, layout_map หรือ None)
+    """
     # ตรวจสอบว่าไฟล์มีอยู่จริงหรือไม่
     if not os.path.exists(file_path):
         print(f"ERROR: ไม่พบไฟล์ที่ '{file_path}'")
-        return ""
+        return "", None
         
     # 1. สกัดข้อความดิบ
-    raw_text = _extract_raw_text_from_file(file_path)
+    raw_text, layout_map = _extract_raw_text_and_layout(file_path)
     if not raw_text:
         print(f" -> การสกัดข้อความล้มเหลวสำหรับไฟล์ {os.path.basename(file_path)}")
-        return ""
+        return "", None
     
     # 2. พิสูจน์อักษรข้อความดิบ
     # โหลด LLM ผ่าน provider ของเรา
-    llm = get_llm() 
+    llm = get_llm_client("proofreader")
     clean_text = _proofread_text(raw_text, llm)
+    layout_map = _reanchor_layout_map(layout_map, clean_text)
     
     print(f"✅ Pre-processing สำหรับไฟล์ {os.path.basename(file_path)} เสร็จสิ้น!")
-    return clean_text
\ No newline at end of file
+    return clean_text, layout_map
+
+def iter_process_document(file_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    เวอร์ชัน Streaming ของ process_document
+    คืนผลทีละหน้า (segment) ทันทีที่สกัดและพิสูจน์อักษรหน้านั้นเสร็จ
+    ทำให้ขั้นตอนถัดไป (เช่น สร้าง Metadata) เริ่มงานได้ตั้งแต่หน้าแรกๆ
+    ในขณะที่หน้าหลังๆ ยังอยู่ระหว่าง OCR
+    (ไฟล์ .docx / .txt จะถูกส่งออกมาเป็น segment เดียว และ .docx ที่มีหัวข้อจะมี "layout_map" มาด้วย)
+
+    Args:
+        file_path (str): The full path to the document file.
+
+    Yields:
+        Dict[str, Any]: {"page_number": int, "total_pages": int, "text": str} เรียงตามลำดับหน้า
+    """
+    if not os.path.exists(file_path):
+        print(f"ERROR: ไม่พบไฟล์ที่ '{file_path}'")
+        return
+
+    llm = get_llm_client("proofreader")
+    _, file_extension = os.path.splitext(file_path)
+
+    if file_extension.lower() != '.pdf':
+        raw_text, layout_map = _extract_raw_text_and_layout(file_path)
+        if not raw_text:
+            print(f" -> การสกัดข้อความล้มเหลวสำหรับไฟล์ {os.path.basename(file_path)}")
+            return
+        clean_text = _proofread_text(raw_text, llm)
+        segment = {"page_number": 1, "total_pages": 1, "text": clean_text}
+        layout_map = _reanchor_layout_map(layout_map, clean_text)
+        if layout_map:
+            segment["layout_map"] = layout_map
+        yield segment
+        return
+
+    print(f"สถานีที่ 1.1: กำลังสกัดข้อความดิบจาก {os.path.basename(file_path)} (Streaming)...")
+    try:
+        total_pages = int(pdfinfo_from_path(file_path).get("Pages", 0))
+    except Exception as e:
+        print(f" -> ERROR: ไม่สามารถอ่านข้อมูลไฟล์ PDF ได้: {e}")
+        return
+    for page_number, page_text in _iter_pdf_pages(file_path, total_pages):
+        yield {
+            "page_number": page_number,
+            "total_pages": total_pages,
+            "text": _proofread_text(ftfy.fix_text(page_text), llm),
+        }
+
+    print(f"✅ Pre-processing (Streaming) สำหรับไฟล์ {os.path.basename(file_path)} เสร็จสิ้น!")
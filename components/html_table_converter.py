@@ -0,0 +1,153 @@
+# agentic_rag_pipeline/components/html_table_converter.py
+
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+
+# --- ตัวแปลงตาราง HTML -> Markdown แบบเบา (ไม่ต้องพึ่ง pandas) ---
+# ตาราง HTML ที่ได้จาก OCR มักเป็นตารางธรรมดา แต่มี rowspan/colspan บ่อย
+# ตัวแปลงนี้กระจายค่าของเซลล์ที่ merge ไว้ลงทุกช่องที่มันครอบคลุม (แบบเดียวกับ pandas.read_html)
+
+
+class _TableParser(HTMLParser):
+    """เก็บเซลล์ของตาราง HTML แรกที่พบเป็นลิสต์ของแถว: [(ข้อความ, rowspan, colspan, เป็น <th> หรือไม่), ...]"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows: List[List[Tuple[str, int, int, bool]]] = []
+        self._table_depth = 0
+        self._in_row = False
+        self._cell: Optional[dict] = None
+
+    @staticmethod
+    def _span(attrs, name: str) -> int:
+        for key, value in attrs:
+            if key == name:
+                try:
+                    return max(1, int(value))
+                except (TypeError, ValueError):
+                    return 1
+        return 1
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self._table_depth += 1
+        elif self._table_depth != 1:
+            # ตารางซ้อนตาราง: ให้ข้อความของตารางด้านในเป็นส่วนหนึ่งของเซลล์ด้านนอก
+            return
+        elif tag == "tr":
+            self._close_cell()
+            self.rows.append([])
+            self._in_row = True
+        elif tag in ("td", "th"):
+            self._close_cell()
+            if not self._in_row:
+                self.rows.append([])
+                self._in_row = True
+            self._cell = {
+                "parts": [],
+                "rowspan": self._span(attrs, "rowspan"),
+                "colspan": self._span(attrs, "colspan"),
+                "is_header": tag == "th",
+            }
+        elif tag == "br" and self._cell is not None:
+            self._cell["parts"].append(" ")
+
+    def handle_endtag(self, tag):
+        if tag == "table":
+            if self._table_depth == 1:
+                self._close_cell()
+                self._in_row = False
+            self._table_depth -= 1
+        elif self._table_depth != 1:
+            return
+        elif tag in ("td", "th"):
+            self._close_cell()
+        elif tag == "tr":
+            self._close_cell()
+            self._in_row = False
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell["parts"].append(data)
+
+    def _close_cell(self):
+        if self._cell is None:
+            return
+        text = " ".join("".join(self._cell["parts"]).split())
+        self.rows[-1].append((text, self._cell["rowspan"], self._cell["colspan"], self._cell["is_header"]))
+        self._cell = None
+
+
+def _build_grid(rows: List[List[Tuple[str, int, int, bool]]]) -> Tuple[List[List[str]], int]:
+    """
+    วางเซลล์ลงตาราง 2 มิติ โดยกระจาย rowspan/colspan
+    คืนค่า (grid, จำนวนแถวบนสุดที่เป็น <th> ทั้งแถว)
+    """
+    grid: List[List[Optional[str]]] = [[] for _ in rows]
+    for r, row in enumerate(rows):
+        col = 0
+        for text, rowspan, colspan, _ in row:
+            # ข้ามช่องที่ถูกจองไว้แล้วโดย rowspan ของแถวก่อนหน้า
+            while col < len(grid[r]) and grid[r][col] is not None:
+                col += 1
+            for dr in range(rowspan):
+                while len(grid) <= r + dr:
+                    grid.append([])
+                target = grid[r + dr]
+                while len(target) < col + colspan:
+                    target.append(None)
+                for dc in range(colspan):
+                    target[col + dc] = text
+            col += colspan
+
+    width = max((len(row) for row in grid), default=0)
+    filled = [[cell if cell is not None else "" for cell in row] + [""] * (width - len(row)) for row in grid]
+
+    header_rows = 0
+    for row in rows:
+        if not all(is_header for _, _, _, is_header in row):
+            break
+        header_rows += 1
+    return filled, header_rows
+
+
+def _escape_cell(text: str) -> str:
+    return text.replace("|", "\\|")
+
+
+def html_table_to_markdown(html_table: str) -> str:
+    """
+    แปลงตาราง HTML หนึ่งตารางเป็น Markdown (pipe table)
+    - แถวบนสุดที่เป็น <th> ทั้งหมดจะถูกใช้เป็นหัวตาราง (หลายแถวจะถูกรวมด้วยช่องว่าง)
+    - ถ้าไม่มี <th> จะใช้เลขคอลัมน์ 0, 1, 2, ... เป็นหัวตาราง (เหมือน pandas)
+
+    Raises:
+        ValueError: ถ้าไม่พบเซลล์ใดๆ ในตาราง
+    """
+    parser = _TableParser()
+    parser.feed(html_table)
+    parser.close()
+    parser._close_cell()
+
+    grid, header_rows = _build_grid([row for row in parser.rows if row])
+    if not grid or not grid[0]:
+        raise ValueError("ไม่พบข้อมูลในตาราง HTML")
+
+    width = len(grid[0])
+    if header_rows:
+        header = [
+            " ".join(dict.fromkeys(grid[r][c] for r in range(header_rows) if grid[r][c]))
+            for c in range(width)
+        ]
+        body = grid[header_rows:]
+    else:
+        header = [str(c) for c in range(width)]
+        body = grid
+
+    lines = [
+        "| " + " | ".join(_escape_cell(cell) for cell in header) + " |",
+        "|" + "|".join(":---" for _ in range(width)) + "|",
+    ]
+    for row in body:
+        lines.append("| " + " | ".join(_escape_cell(cell) for cell in row) + " |")
+    return "\n".join(lines)
@@ -6,7 +6,7 @@ from typing import List, Dict, Any
 
 # --- Import ส่วนประกอบกลางของโปรเจกต์ ---
 from agentic_rag_pipeline import config
-from agentic_rag_pipeline.core.llm_provider import get_embed_model
+from agentic_rag_pipeline.core.llm_provider import get_embedding_engine
 
 # --- 1. Helper Function สำหรับเชื่อมต่อ Database ---
 
@@ -84,13 +84,15 @@ def index_document_and_chunks(
             print(f" -> บันทึกเอกสารหลักสำเร็จ ได้รับ ID: {item_id}")
 
             # --- ขั้นตอนที่ 2: สร้าง Embeddings สำหรับทุก Chunks ---
-            embed_model = get_embed_model()
+            embedding_engine = get_embedding_engine()
             
             texts_to_embed = [chunk['content'] for chunk in chunks]
             print(f" -> กำลังสร้าง Embeddings สำหรับ {len(texts_to_embed)} Chunks...")
             
-            embeddings = embed_model.encode(texts_to_embed, normalize_embeddings=True)
-            print(" -> สร้าง Embeddings สำเร็จ")
+            embeddings = embedding_engine.encode(texts_to_embed, normalize=True)
+            engine_stats = embedding_engine.stats()
+            cache_hits = engine_stats.get("cache", {}).get("hits", 0)
+            print(f" -> สร้าง Embeddings สำเร็จ ({engine_stats['texts_per_second']:.1f} ข้อความ/วินาที, cache hit สะสม {cache_hits})")
 
             # --- ขั้นตอนที่ 3: บันทึกแต่ละ Chunk ลงใน knowledge_chunks ---
             print(f" -> กำลังบันทึก Chunks ทั้ง {len(chunks)} ชิ้นลงฐานข้อมูล...")
@@ -6,7 +6,8 @@ from langchain.prompts import PromptTemplate
 from typing import Dict, Any
 
 # Import LLM Provider ของโปรเจกต์เรา
-from agentic_rag_pipeline.core.llm_provider import get_llm
+from agentic_rag_pipeline import config
+from agentic_rag_pipeline.core.llm_provider import get_llm_client
 
 # --- 1. Prompt Template (The Brain of the Librarian) ---
 # นี่คือ Prompt ที่ดีที่สุดของคุณจาก smart_agent/pipeline/librarian.py
@@ -96,15 +97,18 @@ def generate_metadata_for_text(text: str, original_filename: str) -> Dict[str, A
         return fallback_metadata
         
     try:
-        llm = get_llm()
-        # ใช้เนื้อหาแค่ 8000 ตัวอักษรแรกเพื่อประหยัด Token และเวลา
-        formatted_prompt = _METADATA_PROMPT.format(document_text=text[:8000])
+        llm = get_llm_client("metadata")
+        # ใช้เนื้อหาแค่ส่วนต้น (METADATA_PREVIEW_CHARS ตัวอักษรแรก) เพื่อประหยัด Token และเวลา
+        formatted_prompt = _METADATA_PROMPT.format(document_text=text[:config.METADATA_PREVIEW_CHARS])
         
         print(" -> กำลังส่งเนื้อหาให้ LLM ช่วยสร้าง Metadata...")
         response = llm.complete(formatted_prompt)
         raw_response_text = response.text
         
         metadata = _parse_json_from_llm_response(raw_response_text)
+        if not metadata and response.cached:
+            # คำตอบผิดรูปแบบที่ค้างอยู่ใน cache: ถามใหม่แล้วบันทึกทับ
+            metadata = _parse_json_from_llm_response(llm.complete(formatted_prompt, refresh=True).text)
         
         if metadata:
             print(" -> สร้าง Metadata สำเร็จ!")
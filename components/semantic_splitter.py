@@ -0,0 +1,124 @@
+# agentic_rag_pipeline/components/semantic_splitter.py
+
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+import numpy as np
+
+from agentic_rag_pipeline import config
+from agentic_rag_pipeline.core.llm_provider import get_embedding_engine
+
+# --- Semantic Splitter แบบ Native (แทน SemanticSplitterNodeParser ของ LlamaIndex) ---
+# 1. ตัดประโยคแบบเข้าใจภาษาไทย (ภาษาไทยไม่มีช่องว่างระหว่างคำ แต่เว้นวรรคระหว่างวลี/ประโยค)
+# 2. Embed แต่ละประโยคเพียงครั้งเดียว แล้วคำนวณ cosine distance ของประโยคที่ติดกันด้วย NumPy
+# 3. เก็บ distance ของแต่ละ Section ไว้ ถ้า Validator สั่งลองใหม่ด้วย threshold อื่น
+#    จะคำนวณแค่ percentile ใหม่ ไม่ต้อง embed ซ้ำ
+
+# ตัวแบ่งประโยค: ขึ้นบรรทัดใหม่, จบประโยคแบบภาษาอังกฤษ (. ? !) หรือเว้นวรรคหลังอักษรไทย
+_SENTENCE_BOUNDARY = re.compile(r'\n+|(?<=[.!?])\s+|(?<=[ก-๙ฯ])[ \t]+')
+
+_distance_cache: "OrderedDict[str, Tuple[List[str], np.ndarray]]" = OrderedDict()
+_distance_cache_lock = threading.Lock()
+_DISTANCE_CACHE_SIZE = 256
+
+
+def split_thai_sentences(text: str) -> List[str]:
+    """
+    ตัดข้อความเป็นประโยค โดยแต่ละประโยคเก็บช่องว่างท้ายประโยคไว้ด้วย ("".join(ผลลัพธ์) == text)
+    - ประโยคที่สั้นกว่า SEMANTIC_MIN_SENTENCE_CHARS จะถูกรวมกับประโยคถัดไป (วลีสั้นๆ ในภาษาไทย)
+    - ประโยคที่ยาวเกิน SEMANTIC_MAX_SENTENCE_CHARS จะถูกตัดย่อย เพื่อไม่ให้ embed ช้า
+    """
+    pieces: List[str] = []
+    start = 0
+    for match in _SENTENCE_BOUNDARY.finditer(text):
+        if match.end() > start:
+            pieces.append(text[start:match.end()])
+            start = match.end()
+    if start < len(text):
+        pieces.append(text[start:])
+
+    max_chars = config.SEMANTIC_MAX_SENTENCE_CHARS
+    bounded: List[str] = []
+    for piece in pieces:
+        while len(piece) > max_chars:
+            bounded.append(piece[:max_chars])
+            piece = piece[max_chars:]
+        if piece:
+            bounded.append(piece)
+
+    sentences: List[str] = []
+    buffer = ""
+    for piece in bounded:
+        buffer += piece
+        if len(buffer.strip()) >= config.SEMANTIC_MIN_SENTENCE_CHARS:
+            sentences.append(buffer)
+            buffer = ""
+    if buffer:
+        # เศษท้ายสุดที่สั้นเกินไป ให้ต่อท้ายประโยคก่อนหน้า
+        if sentences:
+            sentences[-1] += buffer
+        else:
+            sentences.append(buffer)
+    return sentences
+
+
+def _sentence_distances(text: str) -> Tuple[List[str], np.ndarray]:
+    """
+    ตัดประโยค + คำนวณ cosine distance ระหว่างประโยคที่ติดกัน (จำผลไว้ตาม hash ของข้อความ)
+    แต่ละประโยคถูก embed พร้อมประโยคข้างเคียง (SEMANTIC_BUFFER_SIZE) เพื่อให้มีบริบท
+    """
+    key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    with _distance_cache_lock:
+        if key in _distance_cache:
+            _distance_cache.move_to_end(key)
+            return _distance_cache[key]
+
+    sentences = split_thai_sentences(text)
+    if len(sentences) < 2:
+        distances = np.zeros(0, dtype=np.float32)
+    else:
+        buffer_size = config.SEMANTIC_BUFFER_SIZE
+        windows = [
+            "".join(sentences[max(0, i - buffer_size):i + buffer_size + 1]).strip()
+            for i in range(len(sentences))
+        ]
+        embeddings = get_embedding_engine().encode(windows, normalize=True)
+        # vector ถูก normalize แล้ว: cosine similarity = dot product ของแถวที่ติดกัน
+        similarities = np.einsum("ij,ij->i", embeddings[:-1], embeddings[1:])
+        distances = (1.0 - similarities).astype(np.float32)
+
+    with _distance_cache_lock:
+        _distance_cache[key] = (sentences, distances)
+        while len(_distance_cache) > _DISTANCE_CACHE_SIZE:
+            _distance_cache.popitem(last=False)
+    return sentences, distances
+
+
+def semantic_split(text: str, breakpoint_threshold: float = 95) -> List[str]:
+    """
+    แบ่งข้อความตามความหมาย: ตัดตรงจุดที่ distance ระหว่างประโยคติดกันสูงกว่า percentile ที่กำหนด
+
+    Args:
+        text (str): ข้อความของ Section
+        breakpoint_threshold (float): percentile (0-100) ของ distance ที่ใช้เป็นจุดตัด
+
+    Returns:
+        List[str]: ข้อความแต่ละ Chunk (ตัดช่องว่างหัวท้ายแล้ว และไม่มีชิ้นว่าง)
+    """
+    sentences, distances = _sentence_distances(text)
+    if len(distances) == 0:
+        return [text.strip()] if text.strip() else []
+
+    breakpoint = np.percentile(distances, breakpoint_threshold)
+    cut_after = np.nonzero(distances > breakpoint)[0]
+
+    chunks: List[str] = []
+    start = 0
+    for index in cut_after:
+        chunks.append("".join(sentences[start:index + 1]))
+        start = index + 1
+    chunks.append("".join(sentences[start:]))
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
@@ -0,0 +1,161 @@
+# agentic_rag_pipeline/components/structural_splitter.py
+
+import re
+import json
+import threading
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from agentic_rag_pipeline import config
+
+# --- เครื่องแบ่งตามโครงสร้าง (Structural Splitter Engine) ---
+# รวม Pattern ทั้งหมดของประเภทเอกสารเป็น regex เดียว (alternation + named group) compile ครั้งเดียว
+# แล้วสแกนข้อความรอบเดียวเพื่อเก็บ "ตำแหน่งขอบเขต" ของทุก Pattern พร้อมกัน
+# จากนั้นเลือก Pattern ที่มีลำดับความสำคัญสูงสุดที่พบ (ลำดับเดียวกับที่ลอง re.search ทีละตัวแบบเดิม)
+# ชิ้นที่ยังใหญ่เกินจะถูกแบ่งต่อด้วย RecursiveCharacterTextSplitter ตัวเดียวที่ใช้ร่วมกัน
+
+# Pattern ทุกตัวจับเฉพาะ "ต้นบรรทัด" (หลังช่องว่างนำหน้า) จึงไม่ต้องเขียน ^ เอง
+# และไม่ตรงกับการอ้างถึงกลางประโยค เช่น "ตามมาตรา 5"
+ARTICLE = r'มาตรา[ \t]*\d+'           # กฎหมาย
+CLAUSE = r'ข้อ(?:ที่)?[ \t]*\d+'         # ระเบียบ/ประกาศ
+CHAPTER = r'บทที่[ \t]*\d+'            # ระเบียบ/คู่มือ
+QUESTION = r'(?:คำถาม|ถาม)[ \t]*[:：]'  # เอกสาร Q&A
+# (\d ของ Python ครอบคลุมเลขไทย ๐-๙ อยู่แล้ว)
+
+DEFAULT_DOCUMENT_TYPE = "อื่นๆ"
+
+# ลำดับในลิสต์ = ลำดับความสำคัญ (ใช้ Pattern แรกที่พบในข้อความ)
+_PATTERN_REGISTRY: Dict[str, List[str]] = {
+    "กฎหมาย": [ARTICLE, CLAUSE, CHAPTER],
+    "ระเบียบ": [CLAUSE, ARTICLE, CHAPTER],
+    "ประกาศ": [CLAUSE, ARTICLE],
+    "แนวคำวินิจฉัย": [ARTICLE, CLAUSE, QUESTION],
+    "คำถาม-คำตอบ": [QUESTION, CLAUSE],
+    "คู่มือ": [CHAPTER, QUESTION, CLAUSE],
+    DEFAULT_DOCUMENT_TYPE: [ARTICLE, CHAPTER, QUESTION, CLAUSE],
+}
+_registry_lock = threading.Lock()
+_compiled: Dict[str, "StructuralSplitter"] = {}
+
+_SUB_CHUNK_SIZE = 1000
+_SUB_CHUNK_OVERLAP = 150
+_SUB_CHUNK_SEPARATORS = ["\\n\\n", "\\n", " ", ""]
+
+
+@lru_cache(maxsize=None)
+def get_recursive_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """RecursiveCharacterTextSplitter ที่ใช้ร่วมกัน (ต่อขนาด/overlap) แทนการสร้างใหม่ทุกชิ้น"""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=_SUB_CHUNK_SEPARATORS
+    )
+
+
+class StructuralSplitter:
+    """Pattern ของประเภทเอกสารหนึ่งๆ ที่ compile รวมเป็น regex เดียว"""
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = list(patterns)
+        # ขึ้นต้นด้วย "\n" ตามตัวอักษร ทำให้ regex engine กระโดดหาเฉพาะตำแหน่งขึ้นบรรทัดใหม่
+        # (เร็วกว่า ^ + MULTILINE ที่ต้องลองทุกตำแหน่งหลายเท่า)
+        self._regex = re.compile(
+            "\n[ \t]*(?:" + "|".join(f"(?P<p{i}>{pattern})" for i, pattern in enumerate(self.patterns)) + ")"
+        )
+
+    def boundaries(self, text: str) -> Tuple[Optional[str], List[int]]:
+        """
+        สแกนรอบเดียว แล้วคืนตำแหน่งเริ่มของหัวข้อตาม Pattern ที่สำคัญที่สุดที่พบ
+
+        Returns:
+            Tuple[Optional[str], List[int]]: (Pattern ที่ใช้, [ตำแหน่งเริ่ม, ...]) หรือ (None, []) ถ้าไม่พบ
+        """
+        found: Dict[str, List[int]] = {}
+        # เติม "\n" หน้าข้อความให้บรรทัดแรกถูกตรวจด้วย: match.start() ในข้อความที่เติมแล้ว = ต้นบรรทัดในข้อความเดิม
+        for match in self._regex.finditer("\n" + text):
+            found.setdefault(match.lastgroup, []).append(match.start())
+        for i, pattern in enumerate(self.patterns):
+            offsets = found.get(f"p{i}")
+            if offsets:
+                return pattern, offsets
+        return None, []
+
+    def split(self, text: str) -> Tuple[Optional[str], List[str]]:
+        """
+        แบ่งข้อความที่หัวข้อ (หัวข้อติดไปกับเนื้อหาของตัวเอง ข้อความก่อนหัวข้อแรกเป็นชิ้นแรก)
+
+        Returns:
+            Tuple[Optional[str], List[str]]: (Pattern ที่ใช้, ชิ้นส่วน) หรือ (None, []) ถ้าไม่พบโครงสร้าง
+        """
+        pattern, offsets = self.boundaries(text)
+        if not offsets:
+            return None, []
+        if offsets[0] != 0:
+            offsets = [0] + offsets
+        offsets.append(len(text))
+        parts = [text[start:end].strip() for start, end in zip(offsets, offsets[1:])]
+        return pattern, [part for part in parts if part]
+
+
+def _normalize_document_type(document_type: Optional[str]) -> str:
+    return document_type if document_type in _PATTERN_REGISTRY else DEFAULT_DOCUMENT_TYPE
+
+
+def register_patterns(document_type: str, patterns: List[str]):
+    """กำหนด Pattern (เรียงตามความสำคัญ) ให้ประเภทเอกสาร แทนที่ของเดิม"""
+    compiled = StructuralSplitter(patterns)  # compile ก่อน เพื่อให้ regex ที่ผิดไม่ถูกบันทึก
+    with _registry_lock:
+        _PATTERN_REGISTRY[document_type] = list(patterns)
+        _compiled[document_type] = compiled
+
+
+def get_structural_splitter(document_type: Optional[str] = None) -> StructuralSplitter:
+    """คืน StructuralSplitter ที่ compile แล้วของประเภทเอกสาร (ประเภทที่ไม่รู้จักจะใช้ชุด Default)"""
+    document_type = _normalize_document_type(document_type)
+    with _registry_lock:
+        splitter = _compiled.get(document_type)
+        if splitter is None:
+            splitter = StructuralSplitter(_PATTERN_REGISTRY[document_type])
+            _compiled[document_type] = splitter
+        return splitter
+
+
+def split_structural(text: str, document_type: Optional[str] = None) -> Tuple[Optional[str], List[str]]:
+    """
+    แบ่งข้อความตามโครงสร้างของประเภทเอกสาร แล้วแบ่งชิ้นที่ยังใหญ่ต่อด้วย Recursive (1000/150)
+
+    Returns:
+        Tuple[Optional[str], List[str]]: (Pattern ที่ใช้, ข้อความแต่ละ Chunk) หรือ (None, []) ถ้าไม่พบโครงสร้าง
+    """
+    pattern, parts = get_structural_splitter(document_type).split(text)
+    if not parts:
+        return None, []
+    sub_splitter = get_recursive_splitter(_SUB_CHUNK_SIZE, _SUB_CHUNK_OVERLAP)
+    pieces: List[str] = []
+    for part in parts:
+        # ชิ้นที่ไม่เกินขนาด Splitter จะคืนตัวเองอยู่แล้ว (part ถูก strip แล้ว) จึงข้ามการเรียก
+        if len(part) <= _SUB_CHUNK_SIZE:
+            pieces.append(part)
+        else:
+            pieces.extend(sub_splitter.split_text(part))
+    return pattern, pieces
+
+
+def _load_patterns_file(path: str):
+    """
+    โหลด Pattern เพิ่มเติมจากไฟล์ JSON ({"ประเภทเอกสาร": ["regex", ...]}) ทับของเดิมรายประเภท
+    regex เขียนเฉพาะตัวหัวข้อ (เช่น "ภาคผนวก[ \\t]*[ก-ฮ]") ตัว Engine จะจับเฉพาะต้นบรรทัดให้เอง
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            registry = json.load(f)
+        for document_type, patterns in registry.items():
+            register_patterns(document_type, patterns)
+        print(f" -> โหลด Structural Patterns จาก {path} ({len(registry)} ประเภทเอกสาร)")
+    except Exception as e:
+        print(f" -> WARNING: โหลด Structural Patterns จาก {path} ไม่สำเร็จ, ใช้ค่า Default: {e}")
+
+
+if config.STRUCTURAL_PATTERNS_FILE:
+    _load_patterns_file(config.STRUCTURAL_PATTERNS_FILE)
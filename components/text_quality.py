@@ -0,0 +1,105 @@
+# agentic_rag_pipeline/components/text_quality.py
+
+import re
+from typing import Dict, Any, Optional, Set
+
+from agentic_rag_pipeline import config
+
+# --- ตัวตรวจคุณภาพข้อความ (OCR Quality Scorer) แบบไม่ใช้ LLM ---
+# ใช้คัดกรองว่าข้อความส่วนไหน "น่าสงสัย" และควรส่งให้ LLM พิสูจน์อักษร
+# ส่วนที่สะอาดอยู่แล้ว (เช่น DOCX/TXT ส่วนใหญ่) จะถูกส่งผ่านไปโดยไม่แตะต้อง
+
+# pythainlp เป็น dependency เสริม: ถ้าติดตั้งไว้ จะใช้ "อัตราการพบคำในพจนานุกรม" เป็นสัญญาณเพิ่ม
+try:
+    from pythainlp.tokenize import word_tokenize
+    from pythainlp.corpus import thai_words
+except ImportError:
+    word_tokenize = None
+    thai_words = None
+
+_THAI_CHAR = re.compile(r'[ก-๛]')
+_LATIN_CHAR = re.compile(r'[A-Za-z]')
+
+# อักขระแทนที่ (�) และร่องรอยของภาษาไทยที่ถูก decode ผิดเป็น latin-1 (เช่น "à¸")
+_BROKEN_CHAR = re.compile(r'�|à¸|à¹')
+
+# ลำดับสระ/วรรณยุกต์ที่เป็นไปไม่ได้ในภาษาไทย (มักเกิดจาก OCR อ่านเพี้ยน)
+_INVALID_THAI_SEQUENCE = re.compile(
+    # สระบน/ล่าง, วรรณยุกต์ หรือเครื่องหมาย ที่ไม่ได้ตามหลังพยัญชนะหรือสระบน/ล่าง
+    r'(?<![ก-ฮัิ-ฺ็ํ])[ัิ-ฺ็-๎]'
+    # วรรณยุกต์ซ้อนกัน หรือสระบนซ้อนกัน
+    r'|[่-๋]{2,}|[ัิ-ื]{2,}'
+    # สระหน้า (เ แ โ ใ ไ) ที่ไม่ได้ตามด้วยพยัญชนะ (เช่น "เเ" ที่ควรเป็น "แ")
+    r'|[เ-ไ](?![ก-ฮ])'
+    # สระอำที่ไม่ได้ตามหลังพยัญชนะหรือวรรณยุกต์
+    r'|(?<![ก-ฮ่-๋])ำ'
+)
+
+# อักขระที่ไม่ควรพบในเอกสารภาษาไทย/อังกฤษทั่วไป (เช่น อักษรจีน, สัญลักษณ์แปลกๆ จาก OCR)
+_GARBAGE_CHAR = re.compile(r'[^฀-๿\x20-\x7E\s“”‘’–—•…°×÷±§¶©®™]')
+
+# คำที่มีทั้งอักษรไทยและอักษรละตินปนกันในคำเดียว (เช่น "กรมกาsปกครอง")
+_MIXED_SCRIPT_TOKEN = re.compile(r'\S*(?:[ก-๎][A-Za-z]|[A-Za-z][ก-๎])\S*')
+
+_thai_dictionary: Optional[Set[str]] = None
+
+
+def _dictionary_hit_rate(text: str) -> Optional[float]:
+    """สัดส่วนของคำภาษาไทยที่พบในพจนานุกรม (None ถ้าไม่ได้ติดตั้ง pythainlp)"""
+    global _thai_dictionary
+    if word_tokenize is None:
+        return None
+    if _thai_dictionary is None:
+        _thai_dictionary = set(thai_words())
+    words = [w for w in word_tokenize(text, keep_whitespace=False) if _THAI_CHAR.search(w)]
+    if not words:
+        return None
+    return sum(1 for w in words if w in _thai_dictionary) / len(words)
+
+
+def score_text_quality(text: str) -> Dict[str, Any]:
+    """
+    ให้คะแนนคุณภาพของข้อความ (0.0 = เละมาก, 1.0 = สะอาด) จากสัญญาณต่างๆ ที่คำนวณได้เร็ว
+
+    Returns:
+        Dict[str, Any]: คะแนนรวม ("score") และค่าของแต่ละสัญญาณ
+    """
+    stripped = text.strip()
+    if not stripped:
+        return {"score": 1.0}
+
+    n_chars = len(stripped)
+    n_thai = len(_THAI_CHAR.findall(stripped))
+    n_latin = len(_LATIN_CHAR.findall(stripped))
+    n_tokens = max(1, len(stripped.split()))
+
+    broken_ratio = len(_BROKEN_CHAR.findall(stripped)) / n_chars
+    invalid_sequence_ratio = len(_INVALID_THAI_SEQUENCE.findall(stripped)) / n_thai if n_thai else 0.0
+    garbage_ratio = len(_GARBAGE_CHAR.findall(stripped)) / n_chars
+    mixed_script_ratio = len(_MIXED_SCRIPT_TOKEN.findall(stripped)) / n_tokens
+    dictionary_hit_rate = _dictionary_hit_rate(stripped) if n_thai else None
+
+    penalty = (
+        20 * broken_ratio
+        + 20 * invalid_sequence_ratio
+        + 5 * garbage_ratio
+        + 5 * mixed_script_ratio
+    )
+    if dictionary_hit_rate is not None:
+        penalty += 0.5 * (1 - dictionary_hit_rate)
+
+    return {
+        "score": max(0.0, 1.0 - penalty),
+        "thai_ratio": n_thai / n_chars,
+        "latin_ratio": n_latin / n_chars,
+        "broken_char_ratio": broken_ratio,
+        "invalid_sequence_ratio": invalid_sequence_ratio,
+        "garbage_ratio": garbage_ratio,
+        "mixed_script_ratio": mixed_script_ratio,
+        "dictionary_hit_rate": dictionary_hit_rate,
+    }
+
+
+def needs_proofreading(text: str) -> bool:
+    """True ถ้าคะแนนคุณภาพต่ำกว่า PROOFREAD_QUALITY_THRESHOLD และควรส่งให้ LLM แก้"""
+    return score_text_quality(text)["score"] < config.PROOFREAD_QUALITY_THRESHOLD
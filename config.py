@@ -25,16 +25,105 @@ LLM_API_BASE = os.getenv("LLM_API_BASE", "http://3.113.24.61/llm-large-inference
 LLM_API_KEY = os.getenv("LLM_API_KEY", "EMPTY")
 LLM_TIMEOUT = int(os.getenv("LLM_TIMEOUT", 120))
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", 0.1))
+# LLM Client กลาง (connection pool + จำกัด concurrency + backoff)
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", 16))
+# ปรับจำนวน Request พร้อมกันเองแบบ AIMD (เพิ่มทีละ 1 เมื่อเร็วและไม่มี Error, ลดครึ่งเมื่อเจอ 429/timeout) ใช้กับ LLM และ OCR
+ADAPTIVE_CONCURRENCY_ENABLED = os.getenv("ADAPTIVE_CONCURRENCY_ENABLED", "true").lower() == "true"
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))  # Request พร้อมกันสูงสุดทั้ง Process (เพดานของ AIMD)
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", 1))
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", 4))
+LLM_LATENCY_TARGET_SECONDS = float(os.getenv("LLM_LATENCY_TARGET_SECONDS", 90))  # ตอบช้ากว่านี้จะไม่เพิ่ม limit
+LLM_PER_CALLER_CONCURRENCY = int(os.getenv("LLM_PER_CALLER_CONCURRENCY", 4))  # ค่าเริ่มต้นต่อผู้เรียก (validator, proofreader, ...)
+LLM_CALLER_CONCURRENCY = os.getenv("LLM_CALLER_CONCURRENCY", "")  # กำหนดแยกรายผู้เรียก เช่น "validator=6,proofreader=4"
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 4))  # ลองใหม่เมื่อเจอ 429 / 5xx / connection error
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", 1.0))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", 30.0))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", 600))  # เวลาสูงสุดต่อการเรียกหนึ่งครั้ง (รวมรอคิวและลองใหม่)
+# Cache คำตอบของ LLM ลงดิสก์ (key = model + temperature + hash ของ prompt) รันเอกสารเดิมซ้ำจะแทบไม่เรียก LLM
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_STAGES = os.getenv("LLM_CACHE_STAGES", "metadata,layout,proofreader,validator")  # ขั้นตอน (caller) ที่ใช้ cache
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", 168))
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", 256))
 
 # Embedding Model
 EMBED_MODEL_NAME = os.getenv("EMBED_MODEL_NAME", "BAAI/bge-m3")
 EMBED_DEVICE = os.getenv("EMBED_DEVICE", "cpu") # Change to 'cuda' if you have a GPU
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 32))  # จำนวนข้อความสูงสุดต่อ batch ที่ส่งเข้าโมเดล
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", 5))  # เวลารอรวมคำขอจากหลาย Thread เป็น batch เดียว
+# Cache "ข้อความ -> Vector" แบบถาวร (ไม่ต้อง encode Chunk/ประโยคเดิมซ้ำ)
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", 200000))
 
 # OCR Service
 OCR_API_BASE = os.getenv("OCR_API_BASE", "http://3.113.24.61/typhoon-ocr-service/v1")
 OCR_API_KEY = os.getenv("OCR_API_KEY", "not-used")
+# จำนวนหน้าที่แปลงเป็นรูปภาพต่อรอบ (ยิ่งน้อย ยิ่งใช้ RAM น้อย)
+OCR_PAGE_WINDOW = int(os.getenv("OCR_PAGE_WINDOW", 8))
+# จำนวน Request ที่ส่งไปยัง OCR Service พร้อมกันได้สูงสุด (เพดานของ AIMD ถ้าเปิด ADAPTIVE_CONCURRENCY_ENABLED)
+OCR_MAX_CONCURRENCY = int(os.getenv("OCR_MAX_CONCURRENCY", 4))
+OCR_MIN_CONCURRENCY = int(os.getenv("OCR_MIN_CONCURRENCY", 1))
+OCR_LATENCY_TARGET_SECONDS = float(os.getenv("OCR_LATENCY_TARGET_SECONDS", 60))
+# อ่าน Text Layer ที่ฝังอยู่ใน PDF (ด้วย pdftotext) ก่อน แล้ว OCR เฉพาะหน้าที่เป็นภาพสแกน/ข้อความเพี้ยน
+PDF_TEXT_LAYER_ENABLED = os.getenv("PDF_TEXT_LAYER_ENABLED", "true").lower() == "true"
+PDF_TEXT_LAYER_MIN_CHARS = int(os.getenv("PDF_TEXT_LAYER_MIN_CHARS", 50))  # หน้าที่มีข้อความน้อยกว่านี้ถือว่าเป็นภาพ
+# Cache ผลลัพธ์ OCR รายหน้า (key = hash ของรูปหน้า + model + prompt)
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", 512))
+
+# Proofreader (พิสูจน์อักษรด้วย LLM)
+PROOFREAD_PART_SIZE = int(os.getenv("PROOFREAD_PART_SIZE", 4000))  # ขนาดสูงสุด (ตัวอักษร) ต่อการเรียก LLM หนึ่งครั้ง
+PROOFREAD_MAX_CONCURRENCY = int(os.getenv("PROOFREAD_MAX_CONCURRENCY", 4))
+PROOFREAD_MAX_RETRIES = int(os.getenv("PROOFREAD_MAX_RETRIES", 2))  # ถามใหม่เมื่อรายการแก้ไข (โหมด edits) อ่านไม่ได้
+# "full" = ให้ LLM เขียนข้อความทั้งหมดกลับมา, "edits" = ให้ LLM ส่งเฉพาะรายการคำที่ต้องแก้ (ประหยัด Output Token)
+PROOFREAD_MODE = os.getenv("PROOFREAD_MODE", "full")
+# ตรวจคุณภาพข้อความในเครื่องก่อน แล้วส่งให้ LLM เฉพาะย่อหน้าที่คะแนนต่ำกว่าเกณฑ์
+PROOFREAD_QUALITY_GATE = os.getenv("PROOFREAD_QUALITY_GATE", "true").lower() == "true"
+PROOFREAD_QUALITY_THRESHOLD = float(os.getenv("PROOFREAD_QUALITY_THRESHOLD", 0.9))
+
+# Semantic Splitter (ตัดประโยคภาษาไทย + แบ่งตามความหมาย)
+SEMANTIC_MIN_SENTENCE_CHARS = int(os.getenv("SEMANTIC_MIN_SENTENCE_CHARS", 40))   # วลีที่สั้นกว่านี้จะรวมกับประโยคถัดไป
+SEMANTIC_MAX_SENTENCE_CHARS = int(os.getenv("SEMANTIC_MAX_SENTENCE_CHARS", 400))  # ประโยคที่ยาวกว่านี้จะถูกตัดย่อย
+SEMANTIC_BUFFER_SIZE = int(os.getenv("SEMANTIC_BUFFER_SIZE", 1))  # จำนวนประโยคข้างเคียงที่ embed รวมกัน
+
+# Layout Analysis (แบ่งเอกสารเป็นหน้าต่างที่ซ้อนทับกัน แล้วให้ LLM หาหัวข้อพร้อมกัน)
+LAYOUT_WINDOW_CHARS = int(os.getenv("LAYOUT_WINDOW_CHARS", 12000))
+LAYOUT_WINDOW_OVERLAP = int(os.getenv("LAYOUT_WINDOW_OVERLAP", 1000))
+LAYOUT_MAX_CONCURRENCY = int(os.getenv("LAYOUT_MAX_CONCURRENCY", 4))
+# วิเคราะห์ด้วยกฎก่อน (ไม่เรียก LLM) ใช้ผลทันทีถ้า confidence ถึงเกณฑ์ ไม่เช่นนั้นจึงส่งให้ LLM
+LAYOUT_RULES_ENABLED = os.getenv("LAYOUT_RULES_ENABLED", "true").lower() == "true"
+LAYOUT_RULES_MIN_CONFIDENCE = float(os.getenv("LAYOUT_RULES_MIN_CONFIDENCE", 0.8))
+# ไฟล์ .docx: สร้าง layout_map จาก Style หัวข้อ/Outline Level ตอนสกัดข้อความ (ข้าม LLM ในสถานี Layout Analysis)
+DOCX_NATIVE_LAYOUT_ENABLED = os.getenv("DOCX_NATIVE_LAYOUT_ENABLED", "true").lower() == "true"
+
+# Structural Splitter: ไฟล์ JSON สำหรับกำหนด Pattern หัวข้อเองรายประเภทเอกสาร ({"ประเภทเอกสาร": ["regex", ...]}) ว่าง = ใช้ค่า Default
+STRUCTURAL_PATTERNS_FILE = os.getenv("STRUCTURAL_PATTERNS_FILE", "")
+
+# Validator (ตรวจคุณภาพ Chunks ด้วย LLM)
+VALIDATION_MAX_CONCURRENCY = int(os.getenv("VALIDATION_MAX_CONCURRENCY", 4))  # จำนวน Chunk ที่ส่งตรวจพร้อมกันได้สูงสุด
+# จำนวน Chunk ที่รวมตรวจใน Prompt เดียว (1 = ตรวจทีละชิ้นแบบเดิม) ปรับตาม Context Window ของโมเดล
+VALIDATION_PACK_SIZE = int(os.getenv("VALIDATION_PACK_SIZE", 1))
+VALIDATION_PACK_MAX_CHARS = int(os.getenv("VALIDATION_PACK_MAX_CHARS", 24000))  # ขนาดข้อความรวมสูงสุดต่อ Prompt
+# Pre-Validator: คัดกรองปัญหาเชิงกลไก (Chunk ว่าง, ตัดกลางคำ, Overlap ซ้ำ, หัวข้อโดดๆ) ด้วยกฎในเครื่องก่อนส่งให้ LLM
+PRE_VALIDATION_ENABLED = os.getenv("PRE_VALIDATION_ENABLED", "true").lower() == "true"
+PRE_VALIDATION_MIN_CHARS = int(os.getenv("PRE_VALIDATION_MIN_CHARS", 30))  # เนื้อหา (ไม่นับ Header) ที่สั้นกว่านี้ถือว่าแทบว่าง
+# ใช้ Embedding Similarity ของ Chunk ที่ติดกันเป็นสัญญาณ Overlap ซ้ำซ้อนด้วย (ต้องโหลดโมเดล Embedding)
+PRE_VALIDATION_EMBEDDING_CHECK = os.getenv("PRE_VALIDATION_EMBEDDING_CHECK", "false").lower() == "true"
+PRE_VALIDATION_DUPLICATE_SIMILARITY = float(os.getenv("PRE_VALIDATION_DUPLICATE_SIMILARITY", 0.98))
+# ตรวจแบบสุ่มตัวอย่าง (Stratified Sampling) สำหรับเอกสารที่มี Chunks ตั้งแต่ VALIDATION_SAMPLING_MIN_CHUNKS ขึ้นไป (0 = ปิด)
+VALIDATION_SAMPLING_MIN_CHUNKS = int(os.getenv("VALIDATION_SAMPLING_MIN_CHUNKS", 200))
+VALIDATION_SAMPLING_MAX_FAILURE_RATE = float(os.getenv("VALIDATION_SAMPLING_MAX_FAILURE_RATE", 0.05))  # อัตราความล้มเหลวที่ยอมรับได้
+VALIDATION_SAMPLING_CONFIDENCE = float(os.getenv("VALIDATION_SAMPLING_CONFIDENCE", 0.95))
+# Cache ผลตรวจที่ "ผ่าน" (key = hash ของ Chunk ก่อนหน้า + Chunk ปัจจุบัน + ข้อมูล Section + เวอร์ชัน Prompt)
+VALIDATION_CACHE_ENABLED = os.getenv("VALIDATION_CACHE_ENABLED", "true").lower() == "true"
+VALIDATION_CACHE_MAX_MB = int(os.getenv("VALIDATION_CACHE_MAX_MB", 64))
 
 # --- Pipeline Settings ---
+# ใช้ Preprocess แบบ Streaming (รับผลทีละหน้า และเริ่มสร้าง Metadata ได้ตั้งแต่หน้าแรกๆ)
+PREPROCESS_STREAMING = os.getenv("PREPROCESS_STREAMING", "false").lower() == "true"
+# จำนวนตัวอักษรส่วนต้นของเอกสารที่ใช้สร้าง Metadata
+METADATA_PREVIEW_CHARS = int(os.getenv("METADATA_PREVIEW_CHARS", 8000))
+# โฟลเดอร์สำหรับเก็บ Cache ต่างๆ ที่ต้องอยู่ข้ามการรัน (OCR ฯลฯ)
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(project_root, ".cache"))
 # Default folder to look for new documents
 DATA_ROOT_FOLDER = os.getenv("DATA_ROOT_FOLDER", "data/")
 
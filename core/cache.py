@@ -0,0 +1,129 @@
+# agentic_rag_pipeline/core/cache.py
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional, Dict, Any
+
+
+def make_cache_key(*parts) -> str:
+    """
+    สร้าง key สำหรับ cache จากหลายส่วนประกอบ (str หรือ bytes) ด้วย SHA-256
+    แต่ละส่วนถูกคั่นด้วย byte ว่าง เพื่อไม่ให้ ("ab", "c") ชนกับ ("a", "bc")
+    """
+    hasher = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        hasher.update(part)
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+class DiskCache:
+    """
+    Cache แบบ key -> ข้อความ ที่เก็บลงดิสก์ด้วย SQLite (ใช้ร่วมกันได้หลาย Thread)
+
+    - ขนาดรวมเกิน max_bytes เมื่อไหร่ จะลบรายการที่ถูกใช้ล่าสุดนานที่สุดออกก่อน (LRU)
+    - ถ้ากำหนด ttl_seconds รายการที่ถูกบันทึกไว้นานกว่านั้นจะถือว่าหมดอายุ (miss) และถูกลบทิ้ง
+    - นับจำนวน hit / miss ไว้ดูผ่าน stats()
+    - ไฟล์ฐานข้อมูลจะถูกสร้างตอนใช้งานครั้งแรกเท่านั้น
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON entries(last_access)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """คืนค่าที่เก็บไว้ หรือ None ถ้าไม่มีใน cache"""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        """บันทึกค่าลง cache แล้วลบรายการเก่าออกถ้าขนาดรวมเกิน max_bytes"""
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        if self.ttl_seconds is not None:
+            conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        overflow = total - self.max_bytes
+        rows = conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC")
+        to_delete = []
+        for key, size in rows:
+            if overflow <= 0:
+                break
+            to_delete.append((key,))
+            overflow -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", to_delete)
+
+    def stats(self) -> Dict[str, Any]:
+        """สถิติการใช้งาน cache (hit, miss, hit rate, จำนวนรายการ, ขนาดรวม)"""
+        with self._lock:
+            conn = self._connect()
+            entries, total_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "total_bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+        }
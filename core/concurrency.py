@@ -0,0 +1,183 @@
+# agentic_rag_pipeline/core/concurrency.py
+
+import time
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Any, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# --- ตัวควบคุมจำนวน Request พร้อมกันแบบปรับตัวเอง (AIMD) ---
+# ใช้กับ Endpoint ที่ใช้ร่วมกันหลายงาน (LLM, OCR) ซึ่งความจุจริงเปลี่ยนไปตามภาระของเครื่อง
+#   - Additive Increase: ตอบสำเร็จและเร็วพอครบหนึ่ง "รอบ" (จำนวนเท่ากับ limit) -> limit + 1
+#   - Multiplicative Decrease: เจอ 429 / timeout -> limit * decrease_factor (ลดได้ไม่เกินครั้งละหนึ่งรอบ)
+#   - Error อื่นๆ (เช่น 5xx) หรือ latency เกินเป้า -> คงค่าเดิม ไม่เพิ่ม
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_OVERLOAD = "overload"
+OUTCOME_ERROR = "error"
+
+
+class AdaptiveLimiter:
+    """
+    Semaphore ที่ขนาดปรับได้เองตามผลตอบรับของ Endpoint (AIMD)
+    ถ้า min_limit == max_limit จะทำงานเหมือน Semaphore ขนาดคงที่
+
+    ใช้งาน:
+        if limiter.acquire(timeout=...):
+            started = time.monotonic()
+            ... ส่ง Request ...
+            limiter.release(OUTCOME_SUCCESS, time.monotonic() - started)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        min_limit: int,
+        max_limit: int,
+        initial_limit: Optional[int] = None,
+        latency_target_seconds: Optional[float] = None,
+        decrease_factor: float = 0.5,
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        start = initial_limit if initial_limit is not None else self.max_limit
+        self.limit = float(min(self.max_limit, max(self.min_limit, start)))
+        self.latency_target_seconds = latency_target_seconds
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._condition = threading.Condition()
+        self._successes_since_change = 0
+        self._last_decrease = 0.0
+        self._latency_ewma: Optional[float] = None
+        self._counts = {OUTCOME_SUCCESS: 0, OUTCOME_OVERLOAD: 0, OUTCOME_ERROR: 0}
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """รอจนมีช่องว่าง (in_flight < limit) คืนค่า False ถ้ารอเกิน timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                wait = None if deadline is None else deadline - time.monotonic()
+                if wait is not None and wait <= 0:
+                    return False
+                self._condition.wait(wait)
+            self.in_flight += 1
+            return True
+
+    def release(self, outcome: str = OUTCOME_SUCCESS, latency_seconds: Optional[float] = None):
+        """คืนช่อง พร้อมแจ้งผลของ Request (success / overload / error) และเวลาที่ใช้"""
+        with self._condition:
+            self.in_flight -= 1
+            self._counts[outcome] = self._counts.get(outcome, 0) + 1
+            if latency_seconds is not None:
+                self._latency_ewma = latency_seconds if self._latency_ewma is None else (
+                    0.8 * self._latency_ewma + 0.2 * latency_seconds
+                )
+
+            if outcome == OUTCOME_OVERLOAD:
+                self._decrease()
+            elif outcome == OUTCOME_SUCCESS and self._is_healthy(latency_seconds):
+                self._successes_since_change += 1
+                if self._successes_since_change >= int(self.limit) and self.limit < self.max_limit:
+                    self.limit = min(self.max_limit, self.limit + 1)
+                    self._successes_since_change = 0
+            self._condition.notify_all()
+
+    def _is_healthy(self, latency_seconds: Optional[float]) -> bool:
+        if self.latency_target_seconds is None or latency_seconds is None:
+            return True
+        return latency_seconds <= self.latency_target_seconds
+
+    def _decrease(self):
+        # Request ที่ส่งไปพร้อมกันมักล้มเหลวพร้อมกัน: ลดได้ครั้งเดียวต่อหนึ่งช่วง latency
+        now = time.monotonic()
+        cooldown = self._latency_ewma if self._latency_ewma is not None else 1.0
+        if now - self._last_decrease < cooldown:
+            return
+        new_limit = max(self.min_limit, int(self.limit * self.decrease_factor))
+        if new_limit < self.limit:
+            print(f" -> ⚠️ [{self.name}] Endpoint รับภาระไม่ไหว ลดจำนวน Request พร้อมกัน {int(self.limit)} -> {new_limit}")
+        self.limit = float(new_limit)
+        self._successes_since_change = 0
+        self._last_decrease = now
+
+    def stats(self) -> Dict[str, Any]:
+        """ค่าปัจจุบันของ limit, จำนวนที่กำลังทำงาน และจำนวนผลลัพธ์แต่ละแบบ"""
+        with self._condition:
+            return {
+                "limit": int(self.limit),
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "in_flight": self.in_flight,
+                "latency_ewma_seconds": self._latency_ewma,
+                "successes": self._counts[OUTCOME_SUCCESS],
+                "overloads": self._counts[OUTCOME_OVERLOAD],
+                "errors": self._counts[OUTCOME_ERROR],
+            }
+
+
+class SingleFlightTimeout(TimeoutError):
+    """ผู้ที่รอผลร่วม (follower) รอเกิน timeout ที่กำหนด ขณะที่งานของผู้ทำงานจริงยังไม่เสร็จ"""
+
+
+class SingleFlight:
+    """
+    รวมคำขอที่เหมือนกันซึ่งกำลังทำงานพร้อมกันให้เหลือครั้งเดียว (single-flight)
+    ผู้เรียกคนแรกของ key จะเป็นผู้ทำงานจริง คนที่ตามมาระหว่างนั้นจะรอผลเดียวกัน (รวมถึง Exception)
+    เมื่องานเสร็จ key จะถูกลบ คำขอครั้งถัดไปจึงเริ่มงานใหม่ (การจำผลระยะยาวเป็นหน้าที่ของ cache)
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], T], timeout: Optional[float] = None) -> Tuple[T, bool]:
+        """
+        Args:
+            timeout (float | None): เวลารอสูงสุด (วินาที) ของผู้ที่รอผลร่วม (ไม่มีผลกับผู้ทำงานจริง)
+
+        Returns:
+            Tuple[T, bool]: (ผลลัพธ์, True ถ้าใช้ผลร่วมกับคำขอที่กำลังทำงานอยู่)
+
+        Raises:
+            SingleFlightTimeout: ถ้ารอผลร่วมเกิน timeout
+        """
+        with self._lock:
+            self.calls += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            try:
+                return future.result(timeout=timeout), True
+            except FutureTimeoutError:
+                if future.done():  # TimeoutError ที่ผู้ทำงานจริงโยนออกมาเอง
+                    raise
+                raise SingleFlightTimeout(f"{self.name}: timed out after {timeout:.1f}s waiting for an in-flight call") from None
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return future.result(), False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "coalesced_rate": self.coalesced / self.calls if self.calls else 0.0,
+                "in_flight": len(self._in_flight),
+            }
@@ -0,0 +1,207 @@
+# agentic_rag_pipeline/core/embedding_cache.py
+
+import os
+import re
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any
+
+try:
+    import fcntl
+except ImportError:  # Windows: ไม่มี flock ใช้เฉพาะ transaction ของ SQLite กันการจองแถวซ้ำ
+    fcntl = None
+
+import numpy as np
+
+from agentic_rag_pipeline.core.cache import make_cache_key
+
+
+class EmbeddingCache:
+    """
+    Cache แบบถาวรสำหรับ "ข้อความ -> Vector" (float32)
+
+    - Vector ถูกเก็บเรียงกันในไฟล์ memory-mapped (vectors.f32) แถวละ 1 vector
+    - ตำแหน่งแถวของแต่ละ key อยู่ใน SQLite (index.sqlite)
+    - key = hash(ชื่อโมเดล, normalize หรือไม่, ข้อความ)
+    - เมื่อจำนวนรายการถึง max_entries จะนำแถวที่ถูกใช้ล่าสุดนานที่สุดกลับมาใช้ใหม่ (LRU)
+    - ใช้ร่วมกันได้หลาย Process (API server, graph, uvicorn หลาย worker): จองแถวใน transaction
+      แบบ BEGIN IMMEDIATE ของ SQLite และล็อกไฟล์ (flock) ระหว่างเขียน/อ่าน vector
+    """
+
+    _INITIAL_CAPACITY = 1024
+
+    def __init__(self, directory: str, model_name: str, dimension: int, max_entries: int):
+        self.directory = os.path.join(directory, re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name))
+        self.model_name = model_name
+        self.dimension = dimension
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._vectors: Optional[np.memmap] = None
+        self._capacity = 0
+        self._next_row = 0
+        self._lock_file = None
+
+    def _open(self):
+        if self._conn is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, row INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON entries(last_access)")
+        self._conn.commit()
+        self._next_row = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM entries").fetchone()[0]
+        self._lock_file = open(os.path.join(self.directory, "vectors.lock"), "a+")
+
+        vectors_path = os.path.join(self.directory, "vectors.f32")
+        row_bytes = self.dimension * 4
+        existing_rows = os.path.getsize(vectors_path) // row_bytes if os.path.exists(vectors_path) else 0
+        self._map_vectors(max(existing_rows, self._next_row, min(self._INITIAL_CAPACITY, self.max_entries)))
+
+    def _map_vectors(self, capacity: int):
+        """เปิด (หรือขยาย) ไฟล์ vector ให้รองรับได้ capacity แถว"""
+        vectors_path = os.path.join(self.directory, "vectors.f32")
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(vectors_path, "ab") as f:
+            f.truncate(max(capacity * self.dimension * 4, os.path.getsize(vectors_path)))
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+        self._capacity = capacity
+
+    def _ensure_capacity(self, rows: int):
+        """ขยาย memmap ถ้าแถวที่ต้องใช้เกินขนาดที่เปิดไว้ (เช่น Process อื่นขยายไฟล์ไปแล้ว)"""
+        if rows > self._capacity:
+            self._map_vectors(min(self.max_entries, max(rows, self._capacity * 2)))
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """ล็อกข้าม Process: เขียน = exclusive, อ่าน = shared (ไม่มีผลบนระบบที่ไม่มี fcntl)"""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _key(self, text: str, normalize: bool) -> str:
+        return make_cache_key(self.model_name, "normalized" if normalize else "raw", text)
+
+    def _lookup_rows(self, keys: List[str]) -> Dict[str, int]:
+        """คืนตำแหน่งแถวของ key ที่มีอยู่ใน cache (query ทีละ 500 key ตามข้อจำกัดของ SQLite)"""
+        rows: Dict[str, int] = {}
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows.update(self._conn.execute(
+                f"SELECT key, row FROM entries WHERE key IN ({placeholders})", batch
+            ).fetchall())
+        return rows
+
+    def get_many(self, texts: List[str], normalize: bool) -> Dict[int, np.ndarray]:
+        """
+        ค้นหาหลายข้อความพร้อมกัน
+
+        Returns:
+            Dict[int, np.ndarray]: vector ของข้อความที่พบใน cache โดยใช้ตำแหน่งใน texts เป็น key
+        """
+        if not texts:
+            return {}
+        keys = [self._key(text, normalize) for text in texts]
+        found: Dict[int, np.ndarray] = {}
+        with self._lock:
+            self._open()
+            with self._file_lock(exclusive=False):
+                rows = self._lookup_rows(list(dict.fromkeys(keys)))
+                if rows:
+                    self._ensure_capacity(max(rows.values()) + 1)
+                for i, key in enumerate(keys):
+                    if key in rows:
+                        found[i] = np.array(self._vectors[rows[key]])
+            if rows:
+                now = time.time()
+                self._conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?", [(now, k) for k in rows])
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, texts: List[str], vectors: np.ndarray, normalize: bool):
+        """บันทึก vector ของหลายข้อความลง cache (เขียนทับถ้ามี key อยู่แล้ว)"""
+        if not texts:
+            return
+        with self._lock:
+            self._open()
+            now = time.time()
+            pending: Dict[str, np.ndarray] = {}
+            for text, vector in zip(texts, vectors):
+                pending[self._key(text, normalize)] = vector
+
+            with self._file_lock(exclusive=True):
+                # BEGIN IMMEDIATE: ถือ write lock ของ SQLite ตั้งแต่อ่าน MAX(row) จนถึงบันทึกแถวที่จอง
+                # Process อื่นจึงจองแถวเดียวกันซ้ำไม่ได้
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    assigned = self._lookup_rows(list(pending))
+                    new_keys = [k for k in pending if k not in assigned]
+                    free_rows = self._allocate_rows(len(new_keys), protected=set(assigned))
+                    assigned.update(zip(new_keys, free_rows))
+
+                    if assigned:
+                        self._ensure_capacity(max(assigned.values()) + 1)
+                    for key, row in assigned.items():
+                        self._vectors[row] = pending[key]
+                    self._vectors.flush()
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO entries (key, row, last_access) VALUES (?, ?, ?)",
+                        [(key, row, now) for key, row in assigned.items()]
+                    )
+                    self._conn.commit()
+                except BaseException:
+                    self._conn.rollback()
+                    raise
+
+    def _allocate_rows(self, count: int, protected: set) -> List[int]:
+        """
+        จองแถวว่างจำนวน count แถว: ใช้แถวใหม่ก่อน ถ้าเต็ม max_entries แล้วจะไล่รายการเก่าสุดออก (LRU)
+        โดยไม่ไล่ key ใน protected (key ที่กำลังถูกเขียนทับในรอบเดียวกัน)
+        ต้องเรียกภายใน transaction ของ put_many (แถวถัดไปอ่านจาก SQLite ทุกครั้ง ไม่ใช้ตัวนับใน Process)
+        """
+        rows: List[int] = []
+        self._next_row = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM entries").fetchone()[0]
+        fresh = min(count, self.max_entries - self._next_row)
+        if fresh > 0:
+            needed = self._next_row + fresh
+            rows.extend(range(self._next_row, needed))
+            self._next_row = needed
+
+        evict = count - len(rows)
+        if evict > 0:
+            victims = []
+            for key, row in self._conn.execute("SELECT key, row FROM entries ORDER BY last_access ASC"):
+                if len(victims) >= evict:
+                    break
+                if key not in protected:
+                    victims.append((key, row))
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in victims])
+            rows.extend(row for _, row in victims)
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self._next_row,
+            "max_entries": self.max_entries,
+        }
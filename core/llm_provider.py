@@ -1,33 +1,337 @@
 # agentic_rag_pipeline/core/llm_provider.py
 
-from llama_index.llms.openai_like import OpenAILike
+import os
+import time
+import queue
+import random
+import asyncio
+import threading
+from typing import List, Dict, Any, Optional
+
+import httpx
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
 # Import our central config
 from agentic_rag_pipeline import config
+from agentic_rag_pipeline.core.cache import DiskCache, make_cache_key
+from agentic_rag_pipeline.core.concurrency import AdaptiveLimiter, SingleFlight, SingleFlightTimeout, OUTCOME_SUCCESS, OUTCOME_OVERLOAD, OUTCOME_ERROR
+from agentic_rag_pipeline.core.embedding_cache import EmbeddingCache
 
 # --- Global cache for models to avoid reloading ---
-_llm_instance = None
+_llm_client_instance = None
+_llm_client_lock = threading.Lock()
 _embed_model_instance = None
+_embedding_engine_instance = None
+_embedding_engine_lock = threading.Lock()
+
+
+class LLMRequestError(RuntimeError):
+    """เรียก LLM ไม่สำเร็จ (หมดจำนวนครั้งที่ลองใหม่ หรือได้ Error ที่ลองใหม่ไม่ได้)"""
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """เรียก LLM ไม่เสร็จภายในเวลาที่กำหนด (deadline) รวมเวลารอคิวและการลองใหม่แล้ว"""
+
+
+class LLMResponse:
+    """ผลลัพธ์จาก LLMClient (มี .text เหมือน CompletionResponse ของ LlamaIndex, cached = มาจาก cache)"""
+
+    def __init__(self, text: str, raw: Optional[Dict[str, Any]] = None, cached: bool = False):
+        self.text = text
+        self.raw = raw or {}
+        self.cached = cached
+
+    def __str__(self) -> str:
+        return self.text
 
-def get_llm():
+
+def _parse_caller_limits(spec: str) -> Dict[str, int]:
+    """แปลง "validator=6,proofreader=4" เป็น {"validator": 6, "proofreader": 4}"""
+    limits = {}
+    for item in spec.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip().isdigit():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+class LLMClient:
     """
-    Provides a singleton instance of the Language Model (LLM).
-    Loads the model on first call and returns the cached instance subsequently.
+    Client กลางสำหรับเรียก LLM (OpenAI-compatible /chat/completions) ของทุกขั้นตอนใน Pipeline
+
+    - ใช้ HTTP connection pool ร่วมกัน (httpx) แทนการเปิด connection ใหม่ทุกครั้ง
+    - จำกัดจำนวน Request พร้อมกันทั้งระบบ (ปรับเองแบบ AIMD ไม่เกิน LLM_MAX_CONCURRENCY) และแยกตามผู้เรียก (caller)
+      เช่น "validator" ส่งได้ไม่เกิน LLM_PER_CALLER_CONCURRENCY เพื่อไม่ให้แย่งคิวขั้นตอนอื่นจนหมด
+    - ลองใหม่เมื่อเจอ 429 / 5xx / connection error ด้วย exponential backoff แบบสุ่ม (jitter)
+      และเคารพ header Retry-After
+    - ทุกการเรียกมี deadline (LLM_DEADLINE_SECONDS) รวมเวลารอคิวและการลองใหม่
+    - Cache คำตอบลงดิสก์ (มี TTL) สำหรับขั้นตอนที่เปิดใช้ คำตอบจาก cache ไม่ต้องรอคิว
+    - Prompt เดียวกันที่ถูกส่งพร้อมกันหลาย Thread จะถูกรวมเป็น Request เดียว (single-flight)
+    - เรียกได้ทั้งแบบ sync (complete) และ async (acomplete)
     """
-    global _llm_instance
-    if _llm_instance is None:
-        print("Initializing LLM for the first time...")
-        _llm_instance = OpenAILike(
-            model=config.LLM_MODEL_NAME,
-            api_base=config.LLM_API_BASE,
-            api_key=config.LLM_API_KEY,
-            temperature=config.LLM_TEMPERATURE,
-            is_chat_model=True,
+
+    def __init__(self):
+        self.model = config.LLM_MODEL_NAME
+        self.temperature = config.LLM_TEMPERATURE
+        self._url = config.LLM_API_BASE.rstrip("/") + "/chat/completions"
+        self._headers = {"Authorization": f"Bearer {config.LLM_API_KEY}"}
+        self._http = httpx.Client(
             timeout=config.LLM_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=config.LLM_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=config.LLM_POOL_MAX_CONNECTIONS,
+            ),
+        )
+        # Request พร้อมกันทั้ง Process: ปรับเองแบบ AIMD ระหว่าง LLM_MIN_CONCURRENCY ถึง LLM_MAX_CONCURRENCY
+        self.limiter = AdaptiveLimiter(
+            "llm",
+            min_limit=config.LLM_MIN_CONCURRENCY if config.ADAPTIVE_CONCURRENCY_ENABLED else config.LLM_MAX_CONCURRENCY,
+            max_limit=config.LLM_MAX_CONCURRENCY,
+            initial_limit=config.LLM_INITIAL_CONCURRENCY,
+            latency_target_seconds=config.LLM_LATENCY_TARGET_SECONDS,
+        )
+        self._caller_limits = _parse_caller_limits(config.LLM_CALLER_CONCURRENCY)
+        self._caller_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self.cache = DiskCache(
+            path=os.path.join(config.CACHE_DIR, "llm_responses.sqlite"),
+            max_bytes=config.LLM_CACHE_MAX_MB * 1024 * 1024,
+            ttl_seconds=config.LLM_CACHE_TTL_HOURS * 3600,
+        ) if config.LLM_CACHE_ENABLED else None
+        self.single_flight = SingleFlight("llm")
+
+    def _cache_key(self, prompt: str) -> str:
+        return make_cache_key(self.model, repr(self.temperature), prompt)
+
+    def _slots_for(self, caller: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if caller not in self._caller_slots:
+                limit = self._caller_limits.get(caller, config.LLM_PER_CALLER_CONCURRENCY)
+                self._caller_slots[caller] = threading.BoundedSemaphore(max(1, limit))
+            return self._caller_slots[caller]
+
+    def _record(self, caller: str, **deltas):
+        with self._lock:
+            stats = self._stats.setdefault(
+                caller, {"requests": 0, "retries": 0, "errors": 0, "deadline_exceeded": 0, "cache_hits": 0, "coalesced": 0, "latency_seconds": 0.0}
+            )
+            for key, value in deltas.items():
+                stats[key] += value
+
+    @staticmethod
+    def _backoff_seconds(attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+        ceiling = min(config.LLM_BACKOFF_MAX_SECONDS, config.LLM_BACKOFF_BASE_SECONDS * (2 ** attempt))
+        return random.uniform(ceiling / 2, ceiling)
+
+    def _post(self, prompt: str, timeout: float) -> httpx.Response:
+        return self._http.post(
+            self._url,
+            headers=self._headers,
+            timeout=timeout,
+            json={
+                "model": self.model,
+                "temperature": self.temperature,
+                "messages": [{"role": "user", "content": prompt}],
+            },
         )
-        print("LLM Initialized.")
-    return _llm_instance
+
+    def complete(
+        self,
+        prompt: str,
+        caller: str = "default",
+        deadline: Optional[float] = None,
+        use_cache: bool = False,
+        refresh: bool = False
+    ) -> LLMResponse:
+        """
+        ส่ง prompt ไปยัง LLM แล้วรอผล
+
+        Args:
+            prompt (str): ข้อความที่จะส่ง
+            caller (str): ชื่อผู้เรียก (ใช้แยกโควตา concurrency และสถิติ)
+            deadline (float | None): เวลาสูงสุด (วินาที) ของการเรียกครั้งนี้ ค่าเริ่มต้นคือ LLM_DEADLINE_SECONDS
+            use_cache (bool): อ่าน/บันทึกคำตอบใน cache (ถ้าเปิด LLM_CACHE_ENABLED)
+            refresh (bool): ไม่อ่านจาก cache แต่บันทึกคำตอบใหม่ทับ (ใช้เมื่อคำตอบเดิมใน cache ใช้ไม่ได้)
+
+        Raises:
+            LLMDeadlineExceeded: ถ้าไม่เสร็จภายใน deadline
+            LLMRequestError: ถ้าลองใหม่ครบแล้วยังไม่สำเร็จ หรือได้ Error ที่ลองใหม่ไม่ได้ (เช่น 400)
+        """
+        # deadline นับจากตอนเรียก ใช้ร่วมกันทั้งผู้ส่ง Request จริงและผู้ที่รอผลร่วม (single-flight)
+        expires_at = time.monotonic() + (deadline or config.LLM_DEADLINE_SECONDS)
+        key = self._cache_key(prompt)
+        cache = self.cache if use_cache else None
+        if cache is not None and not refresh:
+            cached_text = cache.get(key)
+            if cached_text is not None:
+                self._record(caller, cache_hits=1)
+                return LLMResponse(cached_text, cached=True)
+
+        def call() -> LLMResponse:
+            return self._complete_with_limits(prompt, caller, expires_at)
+
+        try:
+            response, shared = self.single_flight.do(key, call, timeout=max(0.0, expires_at - time.monotonic()))
+        except SingleFlightTimeout:
+            self._record(caller, coalesced=1, deadline_exceeded=1)
+            raise LLMDeadlineExceeded(f"LLM call for '{caller}' exceeded its deadline waiting for an identical in-flight call")
+        if shared:
+            self._record(caller, coalesced=1)
+        # บันทึกตามการตั้งค่าของผู้เรียกแต่ละคน: ผู้ทำงานจริงอาจปิด cache ไว้ขณะที่ผู้รอผลร่วมเปิด
+        if cache is not None and response.text.strip():
+            cache.set(key, response.text)
+        return response
+
+    def _complete_with_limits(self, prompt: str, caller: str, expires_at: float) -> LLMResponse:
+        def remaining() -> float:
+            left = expires_at - time.monotonic()
+            if left <= 0:
+                raise LLMDeadlineExceeded(f"LLM call for '{caller}' exceeded its deadline")
+            return left
+
+        try:
+            caller_slots = self._slots_for(caller)
+            if not caller_slots.acquire(timeout=remaining()):
+                raise LLMDeadlineExceeded(f"LLM call for '{caller}' timed out waiting for a caller slot")
+            try:
+                return self._complete_with_retries(prompt, caller, remaining)
+            finally:
+                caller_slots.release()
+        except LLMDeadlineExceeded:
+            self._record(caller, deadline_exceeded=1)
+            raise
+
+    def _send_once(self, prompt: str, caller: str, remaining) -> tuple[Optional[LLMResponse], Optional[Exception], Optional[str]]:
+        """
+        ส่ง Request หนึ่งครั้งภายใต้ limiter กลาง แล้วแจ้งผลให้ limiter ปรับขนาด
+        คืนค่า (ผลลัพธ์, error ที่ลองใหม่ได้, Retry-After)
+        """
+        if not self.limiter.acquire(timeout=remaining()):
+            raise LLMDeadlineExceeded(f"LLM call for '{caller}' timed out waiting for a global slot")
+        started = time.monotonic()
+        outcome = OUTCOME_ERROR
+        try:
+            response = self._post(prompt, timeout=min(config.LLM_TIMEOUT, remaining()))
+            if response.status_code == 429:
+                outcome = OUTCOME_OVERLOAD
+                return None, LLMRequestError("LLM returned HTTP 429"), response.headers.get("Retry-After")
+            if response.status_code >= 500:
+                return None, LLMRequestError(f"LLM returned HTTP {response.status_code}"), response.headers.get("Retry-After")
+            if response.status_code >= 400:
+                self._record(caller, requests=1, errors=1)
+                raise LLMRequestError(f"LLM returned HTTP {response.status_code}: {response.text[:200]}")
+            try:
+                data = response.json()
+                text = data["choices"][0]["message"].get("content") or ""
+            except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+                # คำตอบไม่ใช่ JSON หรือรูปแบบไม่ตรง (เช่น proxy คืนหน้า HTML): นับเป็น Error ที่ลองใหม่ได้
+                return None, LLMRequestError(f"LLM returned a malformed response: {e!r}"), None
+            outcome = OUTCOME_SUCCESS
+            self._record(caller, requests=1, latency_seconds=time.monotonic() - started)
+            return LLMResponse(text, data), None, None
+        except httpx.TimeoutException as e:
+            outcome = OUTCOME_OVERLOAD
+            return None, e, None
+        except httpx.TransportError as e:
+            return None, e, None
+        finally:
+            self.limiter.release(outcome, time.monotonic() - started)
+
+    def _complete_with_retries(self, prompt: str, caller: str, remaining) -> LLMResponse:
+        last_error = None
+        for attempt in range(config.LLM_MAX_RETRIES + 1):
+            response, last_error, retry_after = self._send_once(prompt, caller, remaining)
+            if response is not None:
+                return response
+
+            self._record(caller, requests=1, errors=1)
+            if attempt == config.LLM_MAX_RETRIES:
+                break
+            delay = self._backoff_seconds(attempt, retry_after)
+            if delay >= remaining():
+                raise LLMDeadlineExceeded(f"LLM call for '{caller}' would exceed its deadline while backing off")
+            print(f" -> ⚠️ LLM ({caller}) ล้มเหลว ({last_error}), ลองใหม่ใน {delay:.1f} วินาที")
+            self._record(caller, retries=1)
+            time.sleep(delay)
+
+        raise LLMRequestError(f"LLM call for '{caller}' failed after {config.LLM_MAX_RETRIES + 1} attempts: {last_error}")
+
+    async def acomplete(
+        self,
+        prompt: str,
+        caller: str = "default",
+        deadline: Optional[float] = None,
+        use_cache: bool = False,
+        refresh: bool = False
+    ) -> LLMResponse:
+        """เวอร์ชัน async ของ complete (ใช้ connection pool, โควตา concurrency และ cache เดียวกัน)"""
+        return await asyncio.to_thread(self.complete, prompt, caller, deadline, use_cache, refresh)
+
+    def stats(self) -> Dict[str, Any]:
+        """สถิติแยกตามผู้เรียก: จำนวน Request, การลองใหม่, Error และ latency เฉลี่ย"""
+        with self._lock:
+            return {
+                caller: {
+                    **stats,
+                    "avg_latency_seconds": stats["latency_seconds"] / max(1, stats["requests"] - stats["errors"]),
+                }
+                for caller, stats in self._stats.items()
+            }
+
+
+class CallerLLM:
+    """LLMClient ที่ผูกกับชื่อผู้เรียก (llm.complete(prompt).text)"""
+
+    def __init__(self, client: LLMClient, caller: str, use_cache: bool):
+        self.client = client
+        self.caller = caller
+        self.use_cache = use_cache
+
+    def complete(self, prompt: str, deadline: Optional[float] = None, refresh: bool = False) -> LLMResponse:
+        return self.client.complete(prompt, self.caller, deadline, self.use_cache, refresh)
+
+    async def acomplete(self, prompt: str, deadline: Optional[float] = None, refresh: bool = False) -> LLMResponse:
+        return await self.client.acomplete(prompt, self.caller, deadline, self.use_cache, refresh)
+
+
+def get_llm_client(caller: str = "default", use_cache: Optional[bool] = None) -> CallerLLM:
+    """
+    คืน LLM client (ใช้ connection pool และโควตาร่วมกันทั้ง Process) ในนามของผู้เรียก caller
+    เช่น get_llm_client("validator").complete(prompt).text
+
+    Args:
+        caller (str): ชื่อขั้นตอนที่เรียก
+        use_cache (bool | None): บังคับเปิด/ปิด cache คำตอบ (None = เปิดถ้า caller อยู่ใน LLM_CACHE_STAGES)
+    """
+    global _llm_client_instance
+    if _llm_client_instance is None:
+        with _llm_client_lock:
+            if _llm_client_instance is None:
+                _llm_client_instance = LLMClient()
+    if use_cache is None:
+        use_cache = caller in {stage.strip() for stage in config.LLM_CACHE_STAGES.split(",")}
+    return CallerLLM(_llm_client_instance, caller, use_cache)
+
+
+def get_llm_client_stats() -> Dict[str, Any]:
+    """สถิติของ LLM client แยกตามผู้เรียก และสถิติของ cache คำตอบ (ว่างถ้ายังไม่เคยถูกสร้าง)"""
+    if _llm_client_instance is None:
+        return {}
+    stats = {
+        "callers": _llm_client_instance.stats(),
+        "concurrency": _llm_client_instance.limiter.stats(),
+        "single_flight": _llm_client_instance.single_flight.stats(),
+    }
+    if _llm_client_instance.cache is not None:
+        stats["cache"] = _llm_client_instance.cache.stats()
+    return stats
 
 def get_embed_model():
     """
@@ -42,4 +346,184 @@ def get_embed_model():
             device=config.EMBED_DEVICE
         )
         print("Embedding Model Loaded.")
-    return _embed_model_instance
\ No newline at end of file
+    return _embed_model_instance
+
+
+class _EncodeRequest:
+    """คำขอ encode หนึ่งครั้งที่รอให้ worker thread ของ EmbeddingEngine ประมวลผล"""
+
+    def __init__(self, texts: List[str], normalize: bool):
+        self.texts = texts
+        self.normalize = normalize
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class EmbeddingEngine:
+    """
+    เครื่องสร้าง Embedding กลางของทั้ง Pipeline (Chunker, Indexer, sync_to_vectordb)
+    โหลดโมเดลครั้งเดียว และให้ทุก Thread ส่งคำขอเข้าคิวเดียวกัน
+
+    - Micro-batching: คำขอที่เข้ามาภายใน EMBED_MAX_WAIT_MS จะถูกรวมเป็นงานเดียว
+    - Length bucketing: เรียงข้อความตามความยาวก่อนแบ่ง batch (EMBED_BATCH_SIZE)
+      ข้อความที่ยาวใกล้กันจะอยู่ batch เดียวกัน ลด padding ที่เสียเปล่า
+    - Cache (ถ้ามี): ข้อความที่เคย encode แล้วจะดึงจาก EmbeddingCache แทน ส่งเข้าโมเดลเฉพาะที่ไม่พบ
+    - stats(): สถิติ throughput และสัดส่วน padding
+    """
+
+    def __init__(
+        self,
+        model: SentenceTransformer,
+        batch_size: int,
+        max_wait_ms: float,
+        cache: Optional[EmbeddingCache] = None
+    ):
+        self.model = model
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[_EncodeRequest]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "texts": 0,
+            "batches": 0,
+            "encode_seconds": 0.0,
+            "input_chars": 0,
+            "padded_chars": 0,
+        }
+        self._worker = threading.Thread(target=self._run, name="embedding-engine", daemon=True)
+        self._worker.start()
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], normalize: bool = True) -> np.ndarray:
+        """
+        สร้าง Embedding (float32) ของข้อความทั้งหมด โดยเรียงผลลัพธ์ตามลำดับของ texts เสมอ
+        (เรียกได้พร้อมกันจากหลาย Thread)
+        """
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        texts = list(texts)
+        cached = self.cache.get_many(texts, normalize) if self.cache is not None else {}
+        missing = [i for i in range(len(texts)) if i not in cached]
+
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for i, vector in cached.items():
+            vectors[i] = vector
+        if not missing:
+            return vectors
+
+        request = _EncodeRequest([texts[i] for i in missing], normalize)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        vectors[missing] = request.result
+        if self.cache is not None:
+            self.cache.put_many(request.texts, request.result, normalize)
+        return vectors
+
+    def _run(self):
+        while True:
+            pending = [self._queue.get()]
+            # รอคำขออื่นๆ ที่ตามมาติดๆ เพื่อรวมเป็นงานเดียว (แต่ไม่เกิน max_wait)
+            deadline = time.monotonic() + self.max_wait
+            while sum(len(r.texts) for r in pending) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            for normalize in (True, False):
+                group = [r for r in pending if r.normalize == normalize]
+                if group:
+                    self._process(group, normalize)
+
+    def _process(self, requests: List[_EncodeRequest], normalize: bool):
+        try:
+            texts = [text for r in requests for text in r.texts]
+            # Length bucketing: เรียงตามความยาว แล้วแบ่งเป็น batch ละ batch_size
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+            vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+            started = time.perf_counter()
+            padded_chars = 0
+            batches = 0
+            for b in range(0, len(order), self.batch_size):
+                idx = order[b:b + self.batch_size]
+                batch = [texts[i] for i in idx]
+                vectors[idx] = self.model.encode(
+                    batch,
+                    batch_size=len(batch),
+                    normalize_embeddings=normalize,
+                    convert_to_numpy=True,
+                    show_progress_bar=False,
+                )
+                padded_chars += len(texts[idx[-1]]) * len(idx)
+                batches += 1
+            elapsed = time.perf_counter() - started
+
+            with self._stats_lock:
+                self._stats["requests"] += len(requests)
+                self._stats["texts"] += len(texts)
+                self._stats["batches"] += batches
+                self._stats["encode_seconds"] += elapsed
+                self._stats["input_chars"] += sum(len(t) for t in texts)
+                self._stats["padded_chars"] += padded_chars
+
+            offset = 0
+            for r in requests:
+                r.result = vectors[offset:offset + len(r.texts)]
+                offset += len(r.texts)
+        except Exception as e:
+            for r in requests:
+                r.error = e
+        finally:
+            for r in requests:
+                r.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """สถิติการทำงาน: จำนวนข้อความ, batch, throughput (ข้อความ/วินาที) และสัดส่วน padding"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["texts_per_second"] = stats["texts"] / stats["encode_seconds"] if stats["encode_seconds"] else 0.0
+        stats["avg_batch_size"] = stats["texts"] / stats["batches"] if stats["batches"] else 0.0
+        stats["padding_ratio"] = (
+            1 - stats["input_chars"] / stats["padded_chars"] if stats["padded_chars"] else 0.0
+        )
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+
+def get_embedding_engine() -> EmbeddingEngine:
+    """
+    Provides the shared EmbeddingEngine singleton (thread-safe).
+    Every component should embed text through this engine instead of using the raw model.
+    """
+    global _embedding_engine_instance
+    if _embedding_engine_instance is None:
+        with _embedding_engine_lock:
+            if _embedding_engine_instance is None:
+                model = get_embed_model()
+                cache = None
+                if config.EMBED_CACHE_ENABLED:
+                    cache = EmbeddingCache(
+                        directory=os.path.join(config.CACHE_DIR, "embeddings"),
+                        model_name=config.EMBED_MODEL_NAME,
+                        dimension=model.get_sentence_embedding_dimension(),
+                        max_entries=config.EMBED_CACHE_MAX_ENTRIES,
+                    )
+                _embedding_engine_instance = EmbeddingEngine(
+                    model,
+                    batch_size=config.EMBED_BATCH_SIZE,
+                    max_wait_ms=config.EMBED_MAX_WAIT_MS,
+                    cache=cache,
+                )
+    return _embedding_engine_instance
@@ -4,9 +4,11 @@ from langgraph.graph import StateGraph, END
 from typing import Literal
 
 # --- Import "ถาด" และ "สถานีทำงาน" ทั้งหมดของเรา ---
+from agentic_rag_pipeline import config
 from .state import GraphState
 from .nodes import (
     preprocess_node,
+    preprocess_stream_node,  # <-- Preprocess แบบ Streaming (เปิดด้วย PREPROCESS_STREAMING)
     metadata_node,
     chunker_node,
     layout_analysis_node,  # <-- [V2] อัปเดตจาก strategize_chunking_node
@@ -56,7 +58,7 @@ def create_graph():
     workflow = StateGraph(GraphState)
 
     # --- เพิ่ม "สถานีทำงาน" (V2) ---
-    workflow.add_node("preprocess", preprocess_node)
+    workflow.add_node("preprocess", preprocess_stream_node if config.PREPROCESS_STREAMING else preprocess_node)
     workflow.add_node("generate_metadata", metadata_node)
     workflow.add_node("layout_analysis", layout_analysis_node) # <--- [V2] อัปเดต
     workflow.add_node("chunker", chunker_node)
@@ -0,0 +1,189 @@
+# agentic_rag_pipeline/graph_agent/layout_analyzer.py
+
+import re
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+from langchain.prompts import PromptTemplate
+
+from agentic_rag_pipeline import config
+
+# --- นักวิเคราะห์โครงสร้างแบบแบ่งหน้าต่าง (Windowed Map-Reduce Layout Analysis) ---
+# 1. Map: แบ่งเอกสารทั้งฉบับเป็นหน้าต่างที่ซ้อนทับกัน (LAYOUT_WINDOW_CHARS / LAYOUT_WINDOW_OVERLAP)
+#    แล้วให้ LLM อ่านพร้อมกันหลายหน้าต่าง โดยตอบกลับเป็น "ข้อความหัวข้อ" ตามที่ปรากฏในเอกสาร
+#    (LLM นับตำแหน่งตัวอักษรไม่แม่น จึงไม่ให้ตอบ char_start/char_end)
+# 2. หาตำแหน่งจริงของหัวข้อในเครื่องด้วยการค้นหาข้อความ (str.find ภายในช่วงของหน้าต่างนั้น)
+# 3. Reduce: รวมหัวข้อจากทุกหน้าต่าง ตัดตัวซ้ำในส่วนที่ซ้อนทับ แล้วสร้าง layout_map เดียว
+
+LAYOUT_WINDOW_PROMPT = PromptTemplate.from_template(
+    """คุณคือ "สถาปนิกโครงสร้างเอกสาร" (Document Structure Architect) ภารกิจของคุณคือการหา "หัวข้อ" ที่เป็นจุดเริ่มต้นของ "ส่วน" (Section) ใหม่ ในเนื้อหาช่วงหนึ่งของเอกสาร
+
+[ข้อมูลเอกสาร]
+- หัวข้อ: "{document_title}"
+- สรุปย่อ: "{summary}"
+- ช่วงที่กำลังอ่าน: ส่วนที่ {window_number} จาก {total_windows} ของเอกสาร
+
+[กฎเหล็ก]
+1.  เลือกเฉพาะหัวข้อระดับที่ควรแบ่งเป็น "ส่วน" (เช่น บทนำ, หมวด, บทที่, ภาคผนวก) ไม่ต้องเลือกหัวข้อย่อยทุกข้อ
+2.  "heading" ต้องคัดลอกข้อความของบรรทัดหัวข้อ "ตรงตามที่ปรากฏในเนื้อหา" ทุกตัวอักษร ห้ามแก้คำ ห้ามสรุป
+3.  สำหรับแต่ละหัวข้อ ให้ "แนะนำกลยุทธ์" (recommended_strategy) ในการแบ่งเนื้อหาของส่วนนั้น:
+    - "semantic": ถ้าส่วนนั้นเป็น "ความเรียง" หรือ "บทความ" ที่ต้องแบ่งตามความหมาย
+    - "structural": ถ้าส่วนนั้นมีโครงสร้างชัดเจน (เช่น กฎหมาย, ถาม-ตอบ, ข้อบังคับ)
+    - "recursive": ถ้าส่วนนั้นเป็นเนื้อหาทั่วไป หรือคุณไม่แน่ใจ (เป็นค่า Default ที่ปลอดภัย)
+4.  "content_strategy": กลยุทธ์ที่เหมาะกับเนื้อหาตอนต้นของช่วงนี้ (ก่อนหัวข้อแรก)
+
+[เนื้อหาช่วงนี้]
+{window_text}
+
+จงตอบกลับเป็น JSON object เท่านั้น:
+{{
+  "content_strategy": "recursive",
+  "headings": [
+    {{"heading": "หมวด ๑ บททั่วไป", "recommended_strategy": "structural"}},
+    {{"heading": "ภาคผนวก ก คำถามที่พบบ่อย", "recommended_strategy": "recursive"}}
+  ]
+}}
+
+**จงส่งคืนเฉพาะ JSON object ที่สมบูรณ์เท่านั้น โดยไม่มีคำอธิบายอื่นใดเพิ่มเติม**
+"""
+)
+
+_STRATEGIES = {"semantic", "structural", "recursive"}
+
+
+def _parse_json_object(text: str) -> Optional[dict]:
+    try:
+        return json.loads(text[text.find('{'):text.rfind('}') + 1])
+    except Exception:
+        return None
+
+
+def _iter_windows(text: str, window_chars: int, overlap: int) -> List[Tuple[int, int]]:
+    """แบ่งข้อความเป็นช่วง (start, end) ที่ซ้อนทับกัน overlap ตัวอักษร โดยพยายามตัดที่การขึ้นบรรทัดใหม่"""
+    window_chars = max(1000, window_chars)
+    overlap = min(max(0, overlap), window_chars // 2)
+    windows = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + window_chars)
+        if end < len(text):
+            newline = text.rfind("\n", start + window_chars // 2, end)
+            if newline != -1:
+                end = newline + 1
+        windows.append((start, end))
+        if end >= len(text):
+            break
+        start = max(start + 1, end - overlap)
+    return windows
+
+
+def _locate_heading(text: str, heading: str, start: int, end: int) -> int:
+    """
+    หาตำแหน่งของหัวข้อในช่วง [start, end) ด้วยการค้นหาข้อความตรงตัวก่อน
+    ถ้าไม่พบ (เช่น LLM ยุบช่องว่าง/ขึ้นบรรทัด) จะค้นแบบยืดหยุ่นเรื่องช่องว่าง คืนค่า -1 ถ้าไม่พบ
+    """
+    heading = heading.strip()
+    if not heading:
+        return -1
+    offset = text.find(heading, start, end)
+    if offset != -1:
+        return offset
+    tokens = heading.split()
+    pattern = re.compile(r'\s+'.join(re.escape(token) for token in tokens))
+    match = pattern.search(text, start, end)
+    return match.start() if match else -1
+
+
+def _analyze_window(llm, text: str, window: Tuple[int, int], window_number: int, total_windows: int, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Map: ส่งหน้าต่างเดียวให้ LLM แล้วแปลงหัวข้อที่ได้เป็นตำแหน่งจริงในเอกสาร"""
+    start, end = window
+    prompt = LAYOUT_WINDOW_PROMPT.format(
+        document_title=metadata.get("document_title", ""),
+        summary=metadata.get("summary", ""),
+        window_number=window_number,
+        total_windows=total_windows,
+        window_text=text[start:end],
+    )
+    try:
+        response = llm.complete(prompt)
+        parsed = _parse_json_object(response.text)
+        if not isinstance(parsed, dict) and response.cached:
+            # คำตอบผิดรูปแบบที่ค้างอยู่ใน cache: ถามใหม่แล้วบันทึกทับ
+            parsed = _parse_json_object(llm.complete(prompt, refresh=True).text)
+    except Exception as e:
+        # หน้าต่างที่ล้มเหลวไม่ให้ทั้งเอกสารล้ม: เนื้อหาช่วงนั้นจะรวมอยู่ในส่วนก่อนหน้า
+        print(f"   -> ⚠️ วิเคราะห์หน้าต่างที่ {window_number} ไม่สำเร็จ: {e}")
+        parsed = None
+    if not isinstance(parsed, dict):
+        return {"content_strategy": None, "headings": []}
+
+    headings = []
+    for entry in parsed.get("headings") or []:
+        if not isinstance(entry, dict) or not isinstance(entry.get("heading"), str):
+            continue
+        offset = _locate_heading(text, entry["heading"], start, end)
+        if offset == -1:
+            continue
+        strategy = entry.get("recommended_strategy")
+        headings.append({
+            "offset": offset,
+            "title": " ".join(entry["heading"].split()),
+            "recommended_strategy": strategy if strategy in _STRATEGIES else "recursive",
+        })
+
+    content_strategy = parsed.get("content_strategy")
+    return {
+        "content_strategy": content_strategy if content_strategy in _STRATEGIES else None,
+        "headings": headings,
+    }
+
+
+def _merge_windows(text: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Reduce: รวมหัวข้อจากทุกหน้าต่างเป็น layout_map เดียว (หัวข้อที่ตำแหน่งเดียวกันจากส่วนที่ซ้อนทับจะเหลือตัวเดียว)"""
+    by_offset: Dict[int, Dict[str, Any]] = {}
+    for result in results:
+        for heading in result["headings"]:
+            by_offset.setdefault(heading["offset"], heading)
+    headings = [by_offset[offset] for offset in sorted(by_offset)]
+
+    sections = []
+    if not headings or headings[0]["offset"] > 0:
+        sections.append({
+            "title": "ส่วนนำ" if headings else "Full Document",
+            "char_start": 0,
+            "recommended_strategy": results[0]["content_strategy"] or "recursive",
+        })
+    for heading in headings:
+        sections.append({
+            "title": heading["title"],
+            "char_start": heading["offset"],
+            "recommended_strategy": heading["recommended_strategy"],
+        })
+    for i, section in enumerate(sections):
+        section["section_id"] = i + 1
+        section["char_end"] = sections[i + 1]["char_start"] if i + 1 < len(sections) else len(text)
+    return {"sections": sections}
+
+
+def analyze_layout_windowed(text: str, metadata: Dict[str, Any], llm) -> Optional[Dict[str, Any]]:
+    """
+    วิเคราะห์โครงสร้างของเอกสารทั้งฉบับแบบแบ่งหน้าต่าง (ส่งให้ LLM พร้อมกันไม่เกิน LAYOUT_MAX_CONCURRENCY)
+
+    Returns:
+        Optional[Dict[str, Any]]: layout_map ({"sections": [...]}) หรือ None ถ้าไม่พบหัวข้อใดเลย
+    """
+    if not text.strip():
+        return None
+    windows = _iter_windows(text, config.LAYOUT_WINDOW_CHARS, config.LAYOUT_WINDOW_OVERLAP)
+    print(f"   -> 🪟 แบ่งเอกสาร {len(text):,} ตัวอักษร เป็น {len(windows)} หน้าต่าง (พร้อมกันสูงสุด {config.LAYOUT_MAX_CONCURRENCY})")
+
+    with ThreadPoolExecutor(max_workers=max(1, config.LAYOUT_MAX_CONCURRENCY)) as executor:
+        results = list(executor.map(
+            lambda numbered: _analyze_window(llm, text, numbered[1], numbered[0] + 1, len(windows), metadata),
+            enumerate(windows),
+        ))
+
+    if not any(result["headings"] for result in results):
+        return None
+    return _merge_windows(text, results)
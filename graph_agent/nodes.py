@@ -2,12 +2,20 @@
 
 import os
 import json
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from langchain.prompts import PromptTemplate
 
 # --- Import "ถาด" State และ LLM Provider ของเรา ---
 from .state import GraphState
-from agentic_rag_pipeline.core.llm_provider import get_llm
+from .pre_validator import find_mechanical_failures
+from .layout_analyzer import analyze_layout_windowed
+from .rule_layout_analyzer import analyze_layout_rules, recommend_strategy
+from .validation_sampling import wilson_upper_bound, stratified_order
+from agentic_rag_pipeline import config
+from agentic_rag_pipeline.core.llm_provider import get_llm_client
+from agentic_rag_pipeline.core.cache import DiskCache, make_cache_key
 
 # --- API Server URL ---
 API_BASE_URL = "http://localhost:8001"
@@ -73,56 +81,47 @@ ULTIMATE_VALIDATION_PROMPT_V5 = PromptTemplate.from_template(
 """
 )
 
-LAYOUT_ANALYSIS_PROMPT_V2 = PromptTemplate.from_template(
-    """คุณคือ "สถาปนิกโครงสร้างเอกสาร" (Document Structure Architect) ภารกิจของคุณคือการสแกน "เนื้อหาเอกสารทั้งฉบับ" แล้วแบ่งมันออกเป็น "ส่วน" (Sections) ตามโครงสร้างหรือหัวข้อที่ชัดเจน
+# --- Prompt สำหรับตรวจหลาย Chunks ในการเรียกครั้งเดียว (VALIDATION_PACK_SIZE > 1) ---
+# ใช้เกณฑ์เดียวกับ V5 แต่ส่งคำสั่งยาวๆ และแฟ้มประวัติเพียงครั้งเดียวต่อ K Chunks
+PACKED_VALIDATION_PROMPT_V5 = PromptTemplate.from_template(
+    """คุณคือ "แพทย์ผู้เชี่ยวชาญด้านการแบ่งข้อมูล AI" (V5) ภารกิจของคุณคือการตรวจสอบคุณภาพของ "Chunks" หลายชิ้นด้านล่าง โดยตรวจแต่ละชิ้นแยกกัน
 
-[กฎเหล็ก]
-1.  วิเคราะห์จาก "เนื้อหาทั้งฉบับ" ({document_text})
-2.  แบ่งเอกสารออกเป็น "ส่วน" (Sections) ตามตรรกะของเนื้อหา (เช่น บทนำ, บทที่ 1, ภาคผนวก)
-3.  สำหรับแต่ละ "ส่วน" ให้คุณ "แนะนำกลยุทธ์" (recommended_strategy) ที่ดีที่สุดในการแบ่งส่วนนั้นๆ:
-    - "semantic": ถ้าส่วนนั้นเป็น "ความเรียง" หรือ "บทความ" ที่ต้องแบ่งตามความหมาย
-    - "structural": ถ้าส่วนนั้นมีโครงสร้างชัดเจน (เช่น กฎหมาย, ถาม-ตอบ, ข้อบังคับ)
-    - "recursive": ถ้าส่วนนั้นเป็นเนื้อหาทั่วไป หรือคุณไม่แน่ใจ (เป็นค่า Default ที่ปลอดภัย)
+---
+### **หัวข้อหลัก:** "{document_title}"
+
+### **Chunks ที่ต้องตรวจ (คนไข้หลายราย):**
+{chunks_block}
+
+---
+### **แฟ้มประวัติการรักษา (ที่ล้มเหลว):**
+(นี่คือสิ่งที่เคยลองทำไปแล้ว และผลลัพธ์คือ "ไม่ผ่าน")
+---
+{retry_history_str}
+---
 
-[ข้อมูลเอกสาร]
-- หัวข้อ: "{document_title}"
-- สรุปย่อ: "{summary}"
+### **ภารกิจการตรวจสอบ (Your Mission):**
 
-[เนื้อหาเอกสารทั้งฉบับ (ย่อ)]
-{document_preview}
+ประเมินคุณภาพของ **"Chunk ปัจจุบัน"** ในแต่ละรายการ โดยดูความต่อเนื่องกับ "Chunk ก่อนหน้า" ของรายการนั้น
 
-จงตอบกลับเป็น JSON object ที่มี "แผนผังโครงสร้าง" (layout_map) เท่านั้น:
+**หากคุณภาพผ่าน:** ให้ "is_valid" เป็น true
+**หากคุณภาพไม่ผ่าน:** ให้ "is_valid" เป็น false พร้อม "reason", "diagnose" และ "recommendation"
+    - "action": เลือก "RETRY_SECTION" (ลองใหม่ที่ส่วนนี้) หรือ "GIVE_UP" (ยอมแพ้)
+    - "target_section_id": Section ID ของ Chunk นั้น
+    - "suggestion": (ถ้า action=RETRY_SECTION) แนะนำกลยุทธ์ใหม่ 'semantic' | 'structural' | 'recursive'
 
-ตัวอย่างผลลัพธ์:
+**จงตอบกลับเป็น JSON object ที่มีผลตรวจครบทุก Chunk (ใช้ "chunk_index" ตามที่ระบุไว้) ดังนี้เท่านั้น:**
 {{
-  "layout_map": {{
-    "sections": [
-      {{
-        "section_id": 1,
-        "title": "บทนำและหลักการ",
-        "char_start": 0,
-        "char_end": 4850,
-        "recommended_strategy": "semantic"
-      }},
-      {{
-        "section_id": 2,
-        "title": "ระเบียบข้อบังคับ มาตรา 1-50",
-        "char_start": 4851,
-        "char_end": 28900,
-        "recommended_strategy": "structural"
-      }},
-      {{
-        "section_id": 3,
-        "title": "ภาคผนวก: คำถามที่พบบ่อย",
-        "char_start": 28901,
-        "char_end": 35000,
-        "recommended_strategy": "recursive" 
-      }}
-    ]
-  }}
+  "results": [
+    {{"chunk_index": 12, "is_valid": true}},
+    {{
+      "chunk_index": 13,
+      "is_valid": false,
+      "reason": "ประโยคถูกตัดจบกลางคัน",
+      "diagnose": "กลยุทธ์ 'recursive' ไม่เหมาะกับ Section นี้",
+      "recommendation": {{"action": "RETRY_SECTION", "target_section_id": 2, "suggestion": "semantic"}}
+    }}
+  ]
 }}
-
-**จงส่งคืนเฉพาะ JSON object ที่สมบูรณ์เท่านั้น โดยไม่มีคำอธิบายอื่นใดเพิ่มเติม**
 """
 )
 
@@ -148,6 +147,8 @@ def preprocess_node(state: GraphState) -> GraphState:
             print("   -> ✅ สกัดและพิสูจน์อักษรสำเร็จ")
             state['clean_text'] = data.get("clean_text")
             state['original_filename'] = os.path.basename(file_path)
+            if data.get("layout_map"):
+                state['layout_map'] = data["layout_map"]
         else:
             print(f"   -> ❌ API Error: {data.get('message')}")
             state['error_message'] = data.get('message')
@@ -156,12 +157,88 @@ def preprocess_node(state: GraphState) -> GraphState:
         state['error_message'] = str(e)
     return state
 
+# ==============================================================================
+# สถานีที่ 1 (Streaming): รับข้อความทีละหน้า และเริ่มสร้าง Metadata ทันทีที่มีเนื้อหาพอ
+# ==============================================================================
+def preprocess_stream_node(state: GraphState) -> GraphState:
+    print("--- ⚙️ สถานี: Preprocessing (Streaming) ---")
+    file_path = state.get("file_path")
+    original_filename = os.path.basename(file_path)
+    page_texts = []
+    received_chars = 0
+    metadata_thread = None
+    metadata_result = {}
+
+    def generate_metadata(preview_text: str):
+        # Metadata ใช้แค่ส่วนต้นของเอกสาร จึงสร้างได้ทันทีโดยไม่ต้องรอหน้าที่เหลือ
+        try:
+            response = requests.post(
+                f"{API_BASE_URL}/tools/generate_metadata",
+                json={"clean_text": preview_text, "original_filename": original_filename}
+            )
+            response.raise_for_status()
+            metadata_result["metadata"] = response.json().get("metadata")
+        except requests.exceptions.RequestException as e:
+            print(f"   -> ⚠️ สร้าง Metadata ล่วงหน้าไม่สำเร็จ (จะลองใหม่ที่สถานี Metadata): {e}")
+
+    try:
+        response = requests.post(
+            f"{API_BASE_URL}/tools/preprocess_document_stream", json={"file_path": file_path}, stream=True
+        )
+        response.raise_for_status()
+        done_event = {}
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            event = json.loads(line)
+            if not isinstance(event, dict):
+                raise ValueError(f"expected a JSON object, got {line[:80]!r}")
+            if event.get("type") == "done":
+                done_event = event
+                break
+            page_texts.append(event.get("text", ""))
+            received_chars += len(event.get("text", ""))
+            print(f"   -> 📄 ได้รับหน้าที่ {event.get('page_number')}/{event.get('total_pages')}")
+
+            if metadata_thread is None and received_chars >= config.METADATA_PREVIEW_CHARS:
+                print("   -> 🚀 มีเนื้อหาพอแล้ว เริ่มสร้าง Metadata คู่ขนานไปกับหน้าที่เหลือ")
+                metadata_thread = threading.Thread(target=generate_metadata, args=("\n\n".join(page_texts),))
+                metadata_thread.start()
+
+        if done_event.get("status") == "success":
+            print("   -> ✅ สกัดและพิสูจน์อักษรสำเร็จ")
+            state['clean_text'] = "\n\n".join(page_texts)
+            state['original_filename'] = original_filename
+            if done_event.get("layout_map"):
+                state['layout_map'] = done_event["layout_map"]
+        else:
+            print(f"   -> ❌ API Error: {done_event.get('message', 'Stream ended unexpectedly')}")
+            state['error_message'] = done_event.get('message', 'Stream ended unexpectedly')
+    except requests.exceptions.RequestException as e:
+        print(f"   -> ❌ Network Error: {e}")
+        state['error_message'] = str(e)
+    except ValueError as e:
+        # บรรทัด NDJSON เสีย/ขาดกลางทาง (เช่น connection ถูกตัด): ถือเป็น Error ของ API เหมือนแบบไม่ Streaming
+        print(f"   -> ❌ API Error: ข้อมูล Stream ไม่ถูกต้อง: {e}")
+        state['error_message'] = f"Malformed preprocess stream: {e}"
+    finally:
+        if metadata_thread is not None:
+            metadata_thread.join()
+
+    if not state.get("error_message") and metadata_result.get("metadata"):
+        state['metadata'] = metadata_result["metadata"]
+    return state
+
 # ==============================================================================
 # สถานีที่ 2: Metadata Node (ไม่มีการแก้ไข)
 # ==============================================================================
 def metadata_node(state: GraphState) -> GraphState:
     print("--- ⚙️ สถานี: Metadata Generation ---")
     if state.get("error_message"): return state
+    if state.get("metadata"):
+        # สร้างไว้แล้วระหว่าง Preprocess แบบ Streaming
+        print("   -> ✅ มี Metadata จากขั้นตอน Streaming แล้ว ข้ามการสร้างซ้ำ")
+        return state
     try:
         response = requests.post(
             f"{API_BASE_URL}/tools/generate_metadata",
@@ -183,28 +260,42 @@ def layout_analysis_node(state: GraphState) -> GraphState:
     print("--- 🤔🗺️ สถานี: Layout Analysis (V2 - นักวิเคราะห์โครงสร้าง) ---")
     if state.get("error_message"): return state
 
-    llm = get_llm()
     metadata = state.get("metadata", {})
     clean_text = state.get("clean_text", "")
 
-    # ใช้เนื้อหาตัวอย่าง (เช่น 20000 ตัวอักษร) เพื่อประหยัด Token แต่ก็มากพอ
-    preview = clean_text[:20000]
-
-    prompt = LAYOUT_ANALYSIS_PROMPT_V2.format(
-        document_title=metadata.get("document_title", ""),
-        summary=metadata.get("summary", ""),
-        document_text=clean_text, # (ส่งเนื้อหาเต็มให้ LLM วิเคราะห์)
-        document_preview=preview  # (ส่งตัวอย่างให้ LLM ดูใน Prompt)
-    )
-
     try:
+        # แผนผังจากโครงสร้างในตัวไฟล์ (เช่น หัวข้อใน .docx) มีตำแหน่งที่แน่นอนอยู่แล้ว ไม่ต้องเรียก LLM
+        native_map = state.get("layout_map") or {}
+        if native_map.get("sections"):
+            for section in native_map["sections"]:
+                section["recommended_strategy"] = recommend_strategy(clean_text[section["char_start"]:section["char_end"]])
+            source = native_map.get("analysis", {}).get("source", "native")
+            print(f"   -> ✅ ใช้แผนผังจากโครงสร้างของไฟล์ ({source}) พบ {len(native_map['sections'])} ส่วน (ไม่เรียก LLM)")
+            return state
+
+        # ทางลัด: เอกสารที่หัวข้อเป็นแบบแผน (หมวด/ส่วนที่/บทที่/มาตรา/ข้อ) วิเคราะห์ด้วยกฎได้โดยไม่ต้องเรียก LLM
+        if config.LAYOUT_RULES_ENABLED:
+            rule_result = analyze_layout_rules(clean_text)
+            print(f"   -> 📐 วิเคราะห์ด้วยกฎ: พบ {rule_result['headings']} หัวข้อ, coverage {rule_result['coverage']:.0%}, confidence {rule_result['confidence']:.2f}")
+            if rule_result["layout_map"] and rule_result["confidence"] >= config.LAYOUT_RULES_MIN_CONFIDENCE:
+                layout_map = rule_result["layout_map"]
+                layout_map["analysis"] = {
+                    "source": "rules",
+                    "coverage": rule_result["coverage"],
+                    "confidence": rule_result["confidence"],
+                }
+                print(f"   -> ✅ ใช้ผลจากกฎ (ไม่เรียก LLM) พบ {len(layout_map['sections'])} ส่วน")
+                state['layout_map'] = layout_map
+                return state
+
+        llm = get_llm_client("layout")
+        # วิเคราะห์ทั้งฉบับแบบแบ่งหน้าต่าง (LLM ตอบเป็นข้อความหัวข้อ แล้วหาตำแหน่งจริงในเครื่อง)
         print("   -> 🧐 กำลังส่งเนื้อหาให้ LLM ช่วยวิเคราะห์โครงสร้าง...")
-        response_text = llm.complete(prompt).text
-        layout_data = _parse_json_from_llm(response_text)
+        layout_map = analyze_layout_windowed(clean_text, metadata, llm)
 
-        if layout_data and "layout_map" in layout_data:
-            print(f"   -> ✅ วิเคราะห์โครงสร้างสำเร็จ พบ {len(layout_data['layout_map'].get('sections', []))} ส่วน")
-            state['layout_map'] = layout_data['layout_map']
+        if layout_map:
+            print(f"   -> ✅ วิเคราะห์โครงสร้างสำเร็จ พบ {len(layout_map.get('sections', []))} ส่วน")
+            state['layout_map'] = layout_map
         else:
             print("   -> ⚠️ วิเคราะห์โครงสร้างล้มเหลว, จะใช้ 'กลยุทธ์เดียว' (Recursive) ทั้งไฟล์")
             # สร้าง Layout Map พื้นฐาน (Fallback)
@@ -267,6 +358,205 @@ def chunker_node(state: GraphState) -> GraphState:
 # ==============================================================================
 # [V5] สถานีที่ 5: Validate Chunks (แพทย์ผู้เชี่ยวชาญ V5)
 # ==============================================================================
+# --- Cache ผลตรวจ (เก็บเฉพาะ Chunk ที่ "ผ่าน") ---
+# เวอร์ชัน Prompt = hash ของ Template: แก้ Prompt เมื่อไหร่ ผลตรวจเดิมจะไม่ถูกนำมาใช้อีก
+_VALIDATION_PROMPT_VERSION = make_cache_key(ULTIMATE_VALIDATION_PROMPT_V5.template, PACKED_VALIDATION_PROMPT_V5.template)
+_validation_cache = DiskCache(
+    path=os.path.join(config.CACHE_DIR, "validation_verdicts.sqlite"),
+    max_bytes=config.VALIDATION_CACHE_MAX_MB * 1024 * 1024,
+)
+
+def _validation_cache_key(document_title: str, previous_chunk_text: str, current_chunk_text: str, chunk_metadata: dict) -> str:
+    return make_cache_key(
+        _VALIDATION_PROMPT_VERSION,
+        str(document_title),
+        previous_chunk_text,
+        current_chunk_text,
+        str(chunk_metadata.get("section_id", "N/A")),
+        str(chunk_metadata.get("section_title", "N/A")),
+        str(chunk_metadata.get("strategy_used", "N/A")),
+    )
+
+def _validate_single(llm, fields: dict, common: dict) -> dict | None:
+    """ตรวจ Chunk เดียวด้วย Prompt V5 (คืนผลตรวจที่ parse แล้ว หรือ None ถ้า LLM ตอบผิดรูปแบบ)"""
+    prompt = ULTIMATE_VALIDATION_PROMPT_V5.format(**common, **fields)
+    response = llm.complete(prompt)
+    validation_result = _parse_json_from_llm(response.text)
+    if validation_result is None and response.cached:
+        # คำตอบผิดรูปแบบที่ค้างอยู่ใน cache: ถามใหม่แล้วบันทึกทับ
+        validation_result = _parse_json_from_llm(llm.complete(prompt, refresh=True).text)
+    return validation_result
+
+def _format_chunks_block(items: list) -> str:
+    """สร้างรายการ Chunks สำหรับ PACKED_VALIDATION_PROMPT_V5 (Chunk ก่อนหน้าที่อยู่ในชุดเดียวกันจะอ้างถึงแทนการใส่ซ้ำ)"""
+    blocks = []
+    previous_in_pack = None
+    for i, fields in items:
+        if previous_in_pack is not None and fields["previous_chunk_text"] == previous_in_pack[1]:
+            previous_text = f"(คือ Chunk ปัจจุบันของ chunk_index {previous_in_pack[0]} ด้านบน)"
+        else:
+            previous_text = f"... {fields['previous_chunk_text']} ..."
+        blocks.append(
+            f"#### chunk_index: {i}\n"
+            f"- Section ID: {fields['section_id']} | Section Title: \"{fields['section_title']}\" | Strategy ที่ใช้: \"{fields['strategy_used']}\"\n"
+            f"- Chunk ก่อนหน้า: {previous_text}\n"
+            f"- Chunk ปัจจุบัน (ที่ต้องตรวจ): ... {fields['current_chunk_text']} ..."
+        )
+        previous_in_pack = (i, fields["current_chunk_text"])
+    return "\n\n".join(blocks)
+
+def _parse_packed_verdicts(text: str, expected: set) -> dict:
+    """
+    แยกผลตรวจรายชิ้นจากคำตอบของ PACKED_VALIDATION_PROMPT_V5
+    คืนเฉพาะผลที่ใช้ได้: chunk_index อยู่ในชุดที่ส่งไป, is_valid เป็น boolean
+    และถ้าไม่ผ่านต้องมี recommendation (ผลที่ขาดหาย/ผิดรูปแบบจะถูกตรวจใหม่ทีละชิ้น)
+    """
+    parsed = _parse_json_from_llm(text)
+    results = parsed.get("results") if isinstance(parsed, dict) else None
+    if not isinstance(results, list):
+        return {}
+    verdicts = {}
+    for entry in results:
+        if not isinstance(entry, dict) or not isinstance(entry.get("is_valid"), bool):
+            continue
+        try:
+            i = int(entry.get("chunk_index"))
+        except (TypeError, ValueError):
+            continue
+        if i not in expected or i in verdicts:
+            continue
+        if not entry["is_valid"] and not isinstance(entry.get("recommendation"), dict):
+            continue
+        verdicts[i] = entry
+    return verdicts
+
+def _validate_pack(llm, items: list, common: dict) -> dict:
+    """
+    ตรวจ Chunks หนึ่งชุด: ถ้ามีชิ้นเดียวใช้ Prompt V5 ตามปกติ
+    ถ้ามีหลายชิ้นใช้ Prompt แบบรวม แล้วตรวจซ้ำทีละชิ้นเฉพาะชิ้นที่ได้ผลไม่ครบ/ผิดรูปแบบ
+
+    Returns:
+        dict: {ลำดับ Chunk: ผลตรวจ (หรือ None)}
+    """
+    if len(items) == 1:
+        i, fields = items[0]
+        return {i: _validate_single(llm, fields, common)}
+
+    prompt = PACKED_VALIDATION_PROMPT_V5.format(chunks_block=_format_chunks_block(items), **common)
+    expected = {i for i, _ in items}
+    response = llm.complete(prompt)
+    verdicts = _parse_packed_verdicts(response.text, expected)
+    if len(verdicts) < len(items) and response.cached:
+        # คำตอบไม่ครบที่ค้างอยู่ใน cache: ถามใหม่แล้วบันทึกทับ
+        verdicts = _parse_packed_verdicts(llm.complete(prompt, refresh=True).text, expected)
+    missing = [(i, fields) for i, fields in items if i not in verdicts]
+    if missing:
+        print(f"   -> ⚠️ ผลตรวจแบบรวมไม่ครบ ({len(verdicts)}/{len(items)}), ตรวจซ้ำทีละชิ้น {len(missing)} รายการ")
+    for i, fields in missing:
+        verdicts[i] = _validate_single(llm, fields, common)
+        # ไม่ต้องตรวจชิ้นที่อยู่ถัดไปอีก เพราะจะรายงานเฉพาะชิ้นแรกที่ไม่ผ่าน
+        if not (verdicts[i] and verdicts[i].get("is_valid")):
+            break
+    return verdicts
+
+def _plan_validation_packs(items: list) -> list:
+    """แบ่ง Chunks เป็นชุดละไม่เกิน VALIDATION_PACK_SIZE ชิ้น และไม่เกิน VALIDATION_PACK_MAX_CHARS ตัวอักษร"""
+    pack_size = max(1, config.VALIDATION_PACK_SIZE)
+    packs = []
+    current, current_chars = [], 0
+    for item in items:
+        item_chars = len(item[1]["previous_chunk_text"]) + len(item[1]["current_chunk_text"])
+        if current and (len(current) >= pack_size or current_chars + item_chars > config.VALIDATION_PACK_MAX_CHARS):
+            packs.append(current)
+            current, current_chars = [], 0
+        current.append(item)
+        current_chars += item_chars
+    if current:
+        packs.append(current)
+    return packs
+
+def _validate_chunks_concurrently(llm, items: list, common: dict, cancel_on_failure: bool = True) -> tuple[tuple[int, dict | None] | None, list]:
+    """
+    ส่ง Chunks ไปตรวจพร้อมกัน (ไม่เกิน VALIDATION_MAX_CONCURRENCY ชุด)
+    items คือ [(ลำดับ Chunk, ข้อมูลของ Prompt), ...] เรียงตามลำดับ, common คือข้อมูลที่เหมือนกันทุก Chunk
+
+    เมื่อพบ Chunk ที่ไม่ผ่าน จะยกเลิกงานที่ยังไม่เริ่มของ Chunk ที่อยู่หลังจากนั้น (ถ้า cancel_on_failure)
+    แต่ยังรอผลของ Chunk ก่อนหน้าให้ครบ เพื่อให้ Chunk ที่รายงานว่าไม่ผ่านเป็นลำดับต่ำสุดเสมอ
+
+    Returns:
+        ((ลำดับ Chunk, ผลตรวจ) ของ Chunk แรกที่ไม่ผ่าน หรือ None ถ้าผ่านทั้งหมด, ลำดับของ Chunk ที่ผ่าน)
+    """
+    first_failure = None
+    passed = []
+    with ThreadPoolExecutor(max_workers=max(1, config.VALIDATION_MAX_CONCURRENCY)) as executor:
+        futures = {
+            executor.submit(_validate_pack, llm, pack, common): pack[0][0]
+            for pack in _plan_validation_packs(items)
+        }
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            for i, validation_result in sorted(future.result().items()):
+                if validation_result and validation_result.get("is_valid"):
+                    passed.append(i)
+                    continue
+                if first_failure is None or i < first_failure[0]:
+                    first_failure = (i, validation_result)
+                if not cancel_on_failure:
+                    continue
+                cancelled = sum(1 for f, j in futures.items() if j > i and f.cancel())
+                if cancelled:
+                    print(f"   -> ⏹️ พบ Chunk #{i+1} ไม่ผ่าน, ยกเลิกการตรวจที่เหลือ {cancelled} รายการ")
+                break
+    return first_failure, passed
+
+def _validate_chunks_by_sampling(llm, items: list, common: dict, prior_passes: int, seed: str) -> tuple[tuple[int, dict | None] | None, list, int]:
+    """
+    ตรวจแบบสุ่มตัวอย่างแบ่งชั้น (Section + กลยุทธ์) ทีละรอบ จนกว่า Wilson upper bound ของอัตราความล้มเหลว
+    ต่ำกว่า VALIDATION_SAMPLING_MAX_FAILURE_RATE (Chunk ที่ผ่านจาก cache นับเป็นตัวอย่างที่ผ่านด้วย)
+
+    ถ้า Chunk ที่สุ่มได้ไม่ผ่าน จะตรวจ Chunk ที่เหลือทั้งหมดของ Section นั้นก่อนตัดสิน
+    เพื่อให้รายงาน (และสั่งยา) ที่ Chunk แรกที่ไม่ผ่านของ Section และ Chunk ที่ผ่านถูกจำใน cache
+
+    Returns:
+        (Chunk แรกที่ไม่ผ่าน หรือ None, ลำดับของ Chunk ที่ผ่าน, จำนวน Chunk ที่สุ่มตรวจ)
+    """
+    order = stratified_order(items, seed)
+    strata = len({(str(f.get("section_id")), str(f.get("strategy_used"))) for _, f in items})
+    # รอบแรกครอบคลุมทุกกลุ่ม (Stratum) อย่างน้อยกลุ่มละหนึ่งชิ้น
+    round_size = max(strata, config.VALIDATION_MAX_CONCURRENCY * max(1, config.VALIDATION_PACK_SIZE))
+
+    passed = []
+    sampled = 0
+    while sampled < len(order):
+        if wilson_upper_bound(0, prior_passes + sampled, config.VALIDATION_SAMPLING_CONFIDENCE) <= config.VALIDATION_SAMPLING_MAX_FAILURE_RATE:
+            break
+        batch = sorted(order[sampled:sampled + round_size], key=lambda item: item[0])
+        sampled += len(batch)
+        failure, batch_passed = _validate_chunks_concurrently(llm, batch, common)
+        passed.extend(batch_passed)
+        if failure is None:
+            continue
+
+        # --- ยกระดับเป็นการตรวจเต็ม Section ---
+        failed_index = failure[0]
+        section_id = str(next(f.get("section_id") for i, f in items if i == failed_index))
+        checked = set(passed) | {i for i, _ in batch}
+        section_items = [
+            (i, f) for i, f in items
+            if str(f.get("section_id")) == section_id and i not in checked
+        ]
+        if section_items:
+            print(f"   -> 🔎 สุ่มพบ Chunk #{failed_index+1} ไม่ผ่าน, ตรวจเต็ม Section {section_id} อีก {len(section_items)} Chunks")
+            section_failure, section_passed = _validate_chunks_concurrently(llm, section_items, common, cancel_on_failure=False)
+            passed.extend(section_passed)
+            sampled += len(section_items)
+            if section_failure is not None and section_failure[0] < failed_index:
+                failure = section_failure
+        return failure, passed, sampled
+
+    return None, passed, sampled
+
 def validate_chunks_node(state: GraphState) -> GraphState:
     print("--- 🤔🧐🧠 สถานี: Validate Chunks (V5 - แพทย์ผู้เชี่ยวชาญ) ---")
     if state.get("error_message"): return state
@@ -276,7 +566,7 @@ def validate_chunks_node(state: GraphState) -> GraphState:
         state['error_message'] = "Chunking process returned no chunks."
         return state
 
-    llm = get_llm()
+    llm = get_llm_client("validator")
     previous_chunk_text = "ไม่มี"
 
     # [V5] โหลด "แฟ้มประวัติ"
@@ -285,77 +575,129 @@ def validate_chunks_node(state: GraphState) -> GraphState:
     if history_list:
         retry_history_str = json.dumps(history_list, indent=2, ensure_ascii=False)
 
-    # --- เริ่มการตรวจสอบทีละ Chunk ---
+    document_title = state.get("metadata", {}).get("document_title", "N/A")
+
+    # --- คัดกรองด้วย Pre-Validator ก่อน: ถ้าพบปัญหาเชิงกลไกที่ Chunk ใด ส่งให้ LLM เฉพาะ Chunk ที่อยู่ก่อนหน้านั้น ---
+    pre_failures = find_mechanical_failures(chunks, history_list) if config.PRE_VALIDATION_ENABLED else []
+    pre_failure = pre_failures[0] if pre_failures else None
+    if pre_failure is not None:
+        print(f"   -> 🩺 Pre-Validator พบปัญหา {len(pre_failures)} Chunks (ชิ้นแรก: Chunk #{pre_failure[0]+1}), ส่งตรวจด้วย LLM เฉพาะ Chunk ก่อนหน้านั้น")
+
+    # [V5] ใช้ Prompt V5, ส่ง "แฟ้มประวัติ" และ "ข้อมูล Section"
+    common = {"document_title": document_title, "retry_history_str": retry_history_str}
+
+    # --- เตรียมข้อมูล Prompt ของทุก Chunk ล่วงหน้า (แต่ละ Prompt ใช้แค่ข้อความของ Chunk ก่อนหน้า) ---
+    # Chunk ที่เคยผ่านแล้ว (ข้อความ, Chunk ก่อนหน้า และ Section เหมือนเดิม) จะไม่ถูกส่งให้ LLM ซ้ำ
+    items = []
+    cache_keys = {}
+    total_checked = 0
+    cache_hits = 0
     for i, chunk in enumerate(chunks):
+        if pre_failure is not None and i >= pre_failure[0]: break
         current_chunk_text = chunk.get("content", "")
         if not current_chunk_text: continue
 
         # [V5] ดึงข้อมูล Metadata ของ Chunk เพื่อบอก "แพทย์" ว่า Chunk นี้มาจากไหน
         chunk_metadata = chunk.get("metadata", {})
-        section_id = chunk_metadata.get("section_id", "N/A")
-        section_title = chunk_metadata.get("section_title", "N/A")
-        strategy_used = chunk_metadata.get("strategy_used", "N/A")
-
-        print(f"   -> 🧐 กำลังตรวจสอบ Chunk #{i+1} (จาก Section: '{section_title}')...")
-
-        # [V5] ใช้ Prompt V5, ส่ง "แฟ้มประวัติ" และ "ข้อมูล Section"
-        prompt = ULTIMATE_VALIDATION_PROMPT_V5.format(
-            document_title=state.get("metadata", {}).get("document_title", "N/A"),
-            previous_chunk_text=previous_chunk_text,
-            current_chunk_text=current_chunk_text,
-            section_id=section_id,
-            section_title=section_title,
-            strategy_used=strategy_used,
-            retry_history_str=retry_history_str
-        )
-        
-        response_text = llm.complete(prompt).text
-        validation_result = _parse_json_from_llm(response_text)
-
-        # [V5] ตรรกะการตัดสินใจ (กรณีไม่ผ่าน)
-        if not validation_result or not validation_result.get("is_valid"):
-            reason = validation_result.get("reason", "Unknown")
-            diagnose = validation_result.get("diagnose", "No diagnosis")
-            print(f"   -> ❌ Validation Failed: Chunk #{i+1} คุณภาพไม่ผ่าน.")
-            print(f"      -> เหตุผล: {reason}")
-            print(f"      -> วินิจฉัย: {diagnose}")
-
-            recommendation = validation_result.get("recommendation")
-            
-            # [V5] บันทึก "แฟ้มประวัติ"
-            if recommendation:
-                 full_diagnosis_entry = {
-                    "attempt": len(history_list) + 1,
-                    "diagnosis": {"reason": reason, "diagnose": diagnose},
-                    "prescription_given": recommendation 
-                }
-                 history_list.append(full_diagnosis_entry)
-            else:
-                recommendation = {"action": "GIVE_UP"}
-                history_list.append({"attempt": len(history_list) + 1, "diagnosis": "Malformed LLM response", "prescription_given": recommendation})
-            
-            state['retry_history'] = history_list
+        total_checked += 1
+
+        if config.VALIDATION_CACHE_ENABLED:
+            cache_key = _validation_cache_key(document_title, previous_chunk_text, current_chunk_text, chunk_metadata)
+            if _validation_cache.get(cache_key) is not None:
+                cache_hits += 1
+                previous_chunk_text = current_chunk_text
+                continue
+            cache_keys[i] = cache_key
+
+        items.append((i, {
+            "previous_chunk_text": previous_chunk_text,
+            "current_chunk_text": current_chunk_text,
+            "section_id": chunk_metadata.get("section_id", "N/A"),
+            "section_title": chunk_metadata.get("section_title", "N/A"),
+            "strategy_used": chunk_metadata.get("strategy_used", "N/A"),
+        }))
+        previous_chunk_text = current_chunk_text
 
-            action = recommendation.get("action")
-            
-            if action == "GIVE_UP":
-                print("   -> 💡 วินิจฉัย (LLM): ยอมแพ้ (GIVE_UP).")
-                state['error_message'] = f"Validation failed (LLM recommendation: GIVE_UP)"
-                state['validation_passes'] = 0 
-                return state
+    if cache_hits:
+        print(f"   -> ♻️ ข้าม {cache_hits}/{total_checked} Chunks ที่เคยตรวจผ่านแล้ว (cache hit)")
+
+    # --- เลือกโหมดตามขนาดเอกสาร: เอกสารใหญ่ใช้การสุ่มตรวจ, เอกสารทั่วไปตรวจทุก Chunk ---
+    sampling = 0 < config.VALIDATION_SAMPLING_MIN_CHUNKS <= len(chunks)
+    if sampling:
+        print(f"   -> 🎲 เอกสารมี {len(chunks)} Chunks, ใช้การสุ่มตรวจแบบแบ่งชั้น (ยอมรับอัตราไม่ผ่าน ≤ {config.VALIDATION_SAMPLING_MAX_FAILURE_RATE:.0%} ที่ความเชื่อมั่น {config.VALIDATION_SAMPLING_CONFIDENCE:.0%})")
+        # seed จากเนื้อหาของ Chunks: เอกสารเดิมที่แบ่งเหมือนเดิมจะสุ่มได้ลำดับเดิมเสมอ
+        seed = make_cache_key(*(chunk.get("content", "") for chunk in chunks))
+        failure, passed, sampled = _validate_chunks_by_sampling(llm, items, common, cache_hits, seed)
+        print(f"   -> 🎲 สุ่มตรวจด้วย LLM {sampled}/{len(items)} Chunks")
+    else:
+        print(f"   -> 🧐 กำลังตรวจสอบ {len(items)} Chunks (ชุดละ {config.VALIDATION_PACK_SIZE} ชิ้น, พร้อมกันสูงสุด {config.VALIDATION_MAX_CONCURRENCY} ชุด)...")
+        failure, passed = _validate_chunks_concurrently(llm, items, common)
+        sampled = len(items)
+    if failure is None:
+        failure = pre_failure
+
+    for i in passed:
+        if i in cache_keys:
+            _validation_cache.set(cache_keys[i], json.dumps({"is_valid": True}))
+
+    state['validation_stats'] = {
+        "chunks": total_checked,
+        "cache_hits": cache_hits,
+        "cache_hit_rate": cache_hits / total_checked if total_checked else 0.0,
+        "needs_llm": len(items),
+        "pre_validator_failures": len(pre_failures),
+        "mode": "sampling" if sampling else "full",
+        "sampled": sampled,
+        "failure_rate_upper_bound": wilson_upper_bound(
+            0 if failure is None else 1, cache_hits + sampled, config.VALIDATION_SAMPLING_CONFIDENCE
+        ),
+    }
+
+    # [V5] ตรรกะการตัดสินใจ (กรณีไม่ผ่าน)
+    if failure is not None:
+        i, validation_result = failure
+        validation_result = validation_result or {}
+        section_title = chunks[i].get("metadata", {}).get("section_title", "N/A")
+        reason = validation_result.get("reason", "Unknown")
+        diagnose = validation_result.get("diagnose", "No diagnosis")
+        print(f"   -> ❌ Validation Failed: Chunk #{i+1} (จาก Section: '{section_title}') คุณภาพไม่ผ่าน.")
+        print(f"      -> เหตุผล: {reason}")
+        print(f"      -> วินิจฉัย: {diagnose}")
+
+        recommendation = validation_result.get("recommendation")
+
+        # [V5] บันทึก "แฟ้มประวัติ"
+        if recommendation:
+             full_diagnosis_entry = {
+                "attempt": len(history_list) + 1,
+                "diagnosis": {"reason": reason, "diagnose": diagnose},
+                "prescription_given": recommendation 
+            }
+             history_list.append(full_diagnosis_entry)
+        else:
+            recommendation = {"action": "GIVE_UP"}
+            history_list.append({"attempt": len(history_list) + 1, "diagnosis": "Malformed LLM response", "prescription_given": recommendation})
 
-            elif action == "RETRY_SECTION":
-                print(f"   -> 💡 วินิจฉัย (LLM): สั่งลองใหม่ที่ Section ID: {recommendation.get('target_section_id')}")
-                # ไม่ต้องทำอะไรเพิ่ม "เภสัชกร" (chunker_node) จะอ่าน "ยา" (RETRY_SECTION)
-                # จาก `retry_history` เองในรอบถัดไป
-                pass
+        state['retry_history'] = history_list
 
+        action = recommendation.get("action")
+
+        if action == "GIVE_UP":
+            print("   -> 💡 วินิจฉัย (LLM): ยอมแพ้ (GIVE_UP).")
+            state['error_message'] = f"Validation failed (LLM recommendation: GIVE_UP)"
             state['validation_passes'] = 0 
-            return state # <-- ออกจาก Node ทันทีเพื่อวนกลับไปทำใหม่
+            return state
 
-        previous_chunk_text = current_chunk_text
+        elif action == "RETRY_SECTION":
+            print(f"   -> 💡 วินิจฉัย (LLM): สั่งลองใหม่ที่ Section ID: {recommendation.get('target_section_id')}")
+            # ไม่ต้องทำอะไรเพิ่ม "เภสัชกร" (chunker_node) จะอ่าน "ยา" (RETRY_SECTION)
+            # จาก `retry_history` เองในรอบถัดไป
+            pass
+
+        state['validation_passes'] = 0 
+        return state # <-- ออกจาก Node ทันทีเพื่อวนกลับไปทำใหม่
 
-    # --- [V5] ถ้า 'for loop' จบ (ผ่านทุก Chunks) ---
+    # --- [V5] ถ้าตรวจครบ (ผ่านทุก Chunks) ---
     print("   -> ✅ Validation Passed: คุณภาพ Chunks ทั้งหมดอยู่ในเกณฑ์ดีเยี่ยม")
     state['validation_passes'] = 1
     state['retry_history'] = [] 
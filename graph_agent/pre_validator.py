@@ -0,0 +1,196 @@
+# agentic_rag_pipeline/graph_agent/pre_validator.py
+
+import re
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from agentic_rag_pipeline import config
+
+# --- "พยาบาลคัดกรอง" (Pre-Validator) ---
+# ตรวจปัญหาเชิงกลไกของ Chunks ด้วยกฎและสถิติในเครื่อง ก่อนส่งให้ "แพทย์" (LLM Validator)
+# ปัญหาที่พบบ่อยและไม่ต้องใช้ LLM ตัดสิน:
+#   - Chunk ว่าง/สั้นเกินไป หรือมีแต่ Header ที่ Chunker เติมให้ ("จากเอกสาร: ... ส่วน: ...")
+#   - ถูกตัดกลางคำ (ขึ้นต้นด้วยสระ/วรรณยุกต์ที่ขึ้นต้นพยางค์ไม่ได้ หรือจบด้วยสระหน้า)
+#   - Overlap ซ้ำซ้อน (เนื้อหาซ้ำกับ Chunk ก่อนหน้าทั้งชิ้น หรือ embedding แทบเหมือนกัน)
+#   - มีแต่หัวข้อโดดๆ (เช่น "มาตรา 5" โดยไม่มีเนื้อหา)
+# ผลตรวจที่ไม่ผ่านมีรูปแบบเดียวกับคำตอบของ LLM Validator (พร้อม RETRY_SECTION) จึงใช้ต่อได้ทันที
+
+# Header ที่ Chunker เติมไว้หน้าเนื้อหาทุก Chunk
+_ENRICHMENT_HEADER = re.compile(r'^จากเอกสาร: [^\n]*\nส่วน: [^\n]*\n\n')
+
+# สระหลัง/สระบน/สระล่าง/วรรณยุกต์ ที่ขึ้นต้นพยางค์ไม่ได้ -> Chunk เริ่มกลางพยางค์
+_DANGLING_THAI_START = re.compile(r'^[ะ-ฺๅ็-๎]')
+# สระหน้า (เ แ โ ใ ไ) ต้องตามด้วยพยัญชนะเสมอ -> Chunk จบกลางพยางค์
+_DANGLING_THAI_END = re.compile(r'[เ-ไ]$')
+
+# หัวข้อที่พบบ่อยในเอกสารไทย/อังกฤษ: คำนำหน้า + เลขหัวข้อ (บังคับ) + ชื่อหัวข้อสั้นๆ (ไม่บังคับ) จนจบบรรทัด
+# - ต้องมีเลขตามหลังคำนำหน้าเสมอ ("ข้อมูลเพิ่มเติม", "ส่วนที่เหลือ" จึงไม่ใช่หัวข้อ)
+# - หัวข้อแบบตัวเลขต้องมีจุดปิดท้ายเลข ("1." / "2.3.") และชื่อหัวข้อไม่มีเครื่องหมายวรรคตอนของประโยค
+#   ("2.5 ล้านบาท สำหรับโครงการนี้" จึงไม่ใช่หัวข้อ)
+_HEADING_TITLE = r'(?:[ \t]+[^\n.,;:!?()"]{1,40})?[ \t]*$'
+_HEADING_LINE = re.compile(
+    r'^(?:(?:หมวด(?:ที่)?|ส่วนที่|มาตรา|บทที่|ข้อ(?:ที่)?|ภาค)[ \t]*[\d๐-๙]+'
+    r'|ภาคผนวก[ \t]*[ก-ฮA-Z\d๐-๙]'
+    r'|(?:Chapter|CHAPTER|Section|SECTION|Article|ARTICLE|Part|PART)[ \t]+[\dIVXLC]+\b'
+    r'|[\d๐-๙]+(?:\.[\d๐-๙]+)*\.(?=[ \t]))'
+    + _HEADING_TITLE
+)
+_LONE_HEADING_MAX_CHARS = 80
+
+# กลยุทธ์ใหม่ที่แนะนำ ตามประเภทปัญหาและกลยุทธ์ที่ใช้อยู่
+_SUGGESTIONS = {
+    "near_empty": {"recursive": "structural", "structural": "recursive", "semantic": "recursive"},
+    "lone_heading": {"recursive": "structural", "structural": "recursive", "semantic": "structural"},
+    "mid_word_cut": {"recursive": "semantic", "structural": "semantic", "semantic": "recursive"},
+    "duplicate_overlap": {"recursive": "semantic", "structural": "recursive", "semantic": "recursive"},
+}
+
+_REASONS = {
+    "near_empty": "Chunk แทบไม่มีเนื้อหา (มีแต่ Header หรือข้อความสั้นเกินไป)",
+    "lone_heading": "Chunk มีแต่หัวข้อโดดๆ โดยไม่มีเนื้อหาของหัวข้อนั้น",
+    "mid_word_cut": "Chunk ถูกตัดกลางคำ/กลางพยางค์",
+    "duplicate_overlap": "เนื้อหาของ Chunk ซ้ำกับ Chunk ก่อนหน้า (Overlap ซ้ำซ้อน)",
+}
+
+
+def chunk_body(content: str) -> str:
+    """ตัด Header ที่ Chunker เติมไว้ ("จากเอกสาร: ...\\nส่วน: ...\\n\\n") ออก เหลือเฉพาะเนื้อหา"""
+    return _ENRICHMENT_HEADER.sub("", content, count=1)
+
+
+def _is_lone_heading(body: str) -> bool:
+    stripped = body.strip()
+    return (
+        "\n" not in stripped
+        and len(stripped) <= _LONE_HEADING_MAX_CHARS
+        and bool(_HEADING_LINE.match(stripped))
+    )
+
+
+def _is_heading_block(body: str) -> bool:
+    """
+    หัวข้อหลายบรรทัดที่ StructuralSplitter แยกไว้หน้าหน่วยแรกของหัวข้อนั้น (เช่น "หมวด 1\nบททั่วไป")
+    เป็นผลปกติของการแบ่งตามโครงสร้าง ไม่ใช่ Chunk ที่แบ่งพลาด
+    """
+    lines = [line.strip() for line in body.strip().splitlines() if line.strip()]
+    return (
+        len(lines) > 1
+        and bool(_HEADING_LINE.match(lines[0]))
+        and all(len(line) <= _LONE_HEADING_MAX_CHARS for line in lines)
+    )
+
+
+def _adjacent_similarities(bodies: List[str]) -> Optional[np.ndarray]:
+    """cosine similarity ของ Chunk ที่ติดกัน (similarities[k] = Chunk k กับ k+1) คำนวณในครั้งเดียว"""
+    if len(bodies) < 2:
+        return None
+    # import ตอนใช้งาน เพื่อไม่ให้ต้องโหลดโมเดล Embedding ถ้าปิดการตรวจนี้ไว้
+    from agentic_rag_pipeline.core.llm_provider import get_embedding_engine
+    embeddings = get_embedding_engine().encode(bodies, normalize=True)
+    return np.einsum("ij,ij->i", embeddings[:-1], embeddings[1:])
+
+
+def _detect_problem(body: str, previous_body: Optional[str], similarity: Optional[float], section_chunk_count: int) -> Optional[str]:
+    """คืนชื่อปัญหาแรกที่พบใน Chunk (หรือ None ถ้าไม่พบปัญหาเชิงกลไก)"""
+    stripped = body.strip()
+
+    if _is_heading_block(stripped):
+        return None
+
+    # Section ที่มีเนื้อหาสั้นทั้ง Section แบ่งใหม่ก็ไม่ช่วย ให้ LLM เป็นผู้ตัดสิน
+    if len(stripped) < config.PRE_VALIDATION_MIN_CHARS:
+        if section_chunk_count > 1:
+            return "lone_heading" if stripped and _is_lone_heading(stripped) else "near_empty"
+        return None
+
+    if section_chunk_count > 1 and _is_lone_heading(stripped):
+        return "lone_heading"
+
+    if _DANGLING_THAI_START.match(stripped) or _DANGLING_THAI_END.search(stripped):
+        return "mid_word_cut"
+
+    if previous_body is not None:
+        if stripped in previous_body:
+            return "duplicate_overlap"
+        if similarity is not None and similarity >= config.PRE_VALIDATION_DUPLICATE_SIMILARITY:
+            return "duplicate_overlap"
+
+    return None
+
+
+def _already_prescribed(retry_history: List[Dict[str, Any]], section_id: Any, suggestion: str) -> bool:
+    for entry in retry_history:
+        prescription = entry.get("prescription_given") or {}
+        if (
+            prescription.get("action") == "RETRY_SECTION"
+            and str(prescription.get("target_section_id")) == str(section_id)
+            and prescription.get("suggestion") == suggestion
+        ):
+            return True
+    return False
+
+
+def find_mechanical_failures(
+    chunks: List[Dict[str, Any]],
+    retry_history: List[Dict[str, Any]]
+) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    ตรวจ Chunks ทั้งหมดด้วยกฎในเครื่อง (ไม่เรียก LLM)
+
+    ถ้ายาที่จะสั่ง (Section + กลยุทธ์ใหม่) เคยถูกสั่งไปแล้วใน retry_history
+    จะไม่นับเป็นความล้มเหลว แต่ปล่อยให้ LLM Validator ตัดสินแทน เพื่อไม่ให้วนสั่งยาเดิมซ้ำ
+
+    Returns:
+        List[Tuple[int, Dict[str, Any]]]: [(ลำดับ Chunk, ผลตรวจรูปแบบเดียวกับ LLM Validator), ...] เรียงตามลำดับ
+    """
+    indexed_bodies = [
+        (i, chunk_body(chunk.get("content", "")), chunk.get("metadata", {}))
+        for i, chunk in enumerate(chunks)
+        if chunk.get("content", "")
+    ]
+
+    section_chunk_counts: Dict[Any, int] = {}
+    for _, _, metadata in indexed_bodies:
+        section_id = metadata.get("section_id", "N/A")
+        section_chunk_counts[section_id] = section_chunk_counts.get(section_id, 0) + 1
+
+    similarities = None
+    if config.PRE_VALIDATION_EMBEDDING_CHECK:
+        try:
+            similarities = _adjacent_similarities([body for _, body, _ in indexed_bodies])
+        except Exception as e:
+            print(f"   -> ⚠️ คำนวณ Embedding Similarity ไม่สำเร็จ, ข้ามการตรวจนี้: {e}")
+
+    failures = []
+    previous = None
+    for k, (i, body, metadata) in enumerate(indexed_bodies):
+        section_id = metadata.get("section_id", "N/A")
+        # เทียบกับ Chunk ก่อนหน้าเฉพาะเมื่ออยู่ใน Section เดียวกัน
+        same_section = previous is not None and previous[1].get("section_id", "N/A") == section_id
+        problem = _detect_problem(
+            body,
+            previous[0] if same_section else None,
+            float(similarities[k - 1]) if same_section and similarities is not None else None,
+            section_chunk_counts[section_id],
+        )
+        previous = (body.strip(), metadata)
+        if problem is None:
+            continue
+
+        strategy_used = metadata.get("strategy_used", "recursive")
+        suggestion = _SUGGESTIONS[problem].get(strategy_used, "recursive")
+        if _already_prescribed(retry_history, section_id, suggestion):
+            continue
+
+        failures.append((i, {
+            "is_valid": False,
+            "reason": _REASONS[problem],
+            "diagnose": f"Pre-Validator: พบปัญหา '{problem}' จากกลยุทธ์ '{strategy_used}' ใน Section {section_id} ('{metadata.get('section_title', 'N/A')}')",
+            "recommendation": {
+                "action": "RETRY_SECTION",
+                "target_section_id": section_id,
+                "suggestion": suggestion,
+            },
+        }))
+    return failures
@@ -0,0 +1,241 @@
+# agentic_rag_pipeline/graph_agent/rule_layout_analyzer.py
+
+import re
+from typing import List, Dict, Any, Optional
+
+# --- นักวิเคราะห์โครงสร้างแบบกฎ (Rule-Based Layout Analysis) ---
+# เอกสารกฎหมาย/ระเบียบของไทยมีรูปแบบหัวข้อที่ค่อนข้างตายตัว (ภาค, หมวด, ส่วนที่, บทที่, มาตรา, ข้อ)
+# จึงสร้าง layout_map ได้จากการค้นหาบรรทัดหัวข้อโดยตรง ไม่ต้องเรียก LLM และได้ตำแหน่งที่ถูกต้องแน่นอน
+#   - หัวข้อระดับ "ส่วน" (ภาค, หมวด, ส่วนที่, บทที่, ภาคผนวก, บทเฉพาะกาล) -> จุดเริ่มต้นของ Section
+#   - หน่วยย่อย (มาตรา, ข้อ, คำถาม:) -> บอกว่า Section นั้นควรใช้กลยุทธ์ "structural"
+#   - ถ้าไม่พบหัวข้อระดับ "ส่วน" จะลองใช้หัวข้อแบบตัวเลข ("1. บทนำ", "๒. ขอบเขต") ที่เรียงต่อกัน
+# ผลลัพธ์มาพร้อม coverage และ confidence ผู้เรียกตัดสินใจเองว่าจะเชื่อผลนี้ หรือส่งต่อให้ LLM
+
+# ลำดับชั้นของหัวข้อ (ตัวเลขน้อย = ระดับสูงกว่า) ใช้ตรวจความต่อเนื่องของเลขหัวข้อ
+_SECTION_LEVELS = {
+    "ภาค": 0,
+    "ภาคผนวก": 0,
+    "หมวด": 1,
+    "บทที่": 1,
+    "บทเฉพาะกาล": 1,
+    "ส่วนที่": 2,
+}
+
+_SECTION_HEADING = re.compile(
+    r'^[ \t]*(ภาคผนวก|ภาค|หมวด(?:ที่)?|ส่วนที่|บทที่|บทเฉพาะกาล)(?=[\s\d๐-๙]|$)[ \t]*([\d๐-๙]+)?[^\n]*$',
+    re.MULTILINE
+)
+_NUMBERED_HEADING = re.compile(r'^[ \t]*([\d๐-๙]{1,3})\.[ \t]+(\S[^\n]*)$', re.MULTILINE)
+_UNIT_LINE = re.compile(r'^[ \t]*(?:มาตรา[ \t]*[\d๐-๙]+|ข้อ(?:ที่)?[ \t]*[\d๐-๙]+|(?:คำถาม|ถาม)[ \t]*[:：])', re.MULTILINE)
+
+_MAX_HEADING_CHARS = 120
+# หัวข้อแบบตัวเลขที่ยาวกว่านี้ หรือจบด้วยเครื่องหมายจบประโยค มักเป็นรายการ ไม่ใช่หัวข้อ
+_MAX_NUMBERED_HEADING_CHARS = 80
+# Section ที่มีเนื้อหา (ไม่นับบรรทัดหัวข้อ) น้อยกว่านี้ จะถูกรวมเข้ากับ Section ถัดไป
+_MIN_SECTION_BODY_CHARS = 20
+_MIN_UNITS_FOR_STRUCTURAL = 2
+# เอกสารที่มีแต่หน่วยย่อย: ความยาวเฉลี่ยต่อหน่วยที่ยังถือว่า "ทั้งฉบับมีโครงสร้าง" และจำนวนหน่วยขั้นต่ำที่ไม่ลดความมั่นใจ
+_MAX_CHARS_PER_UNIT = 3000
+_MIN_UNITS_FOR_FULL_CONFIDENCE = 5
+
+
+def _heading_number(raw: Optional[str]) -> Optional[int]:
+    # int() รองรับเลขไทย (๐-๙) อยู่แล้ว
+    return int(raw) if raw else None
+
+
+def _find_section_headings(text: str) -> List[Dict[str, Any]]:
+    headings = []
+    for match in _SECTION_HEADING.finditer(text):
+        line = match.group(0).strip()
+        if len(line) > _MAX_HEADING_CHARS:
+            continue
+        kind = match.group(1)
+        kind = "หมวด" if kind.startswith("หมวด") else kind
+        headings.append({
+            "offset": match.start() + (len(match.group(0)) - len(match.group(0).lstrip())),
+            "line_end": match.end(),
+            "kind": kind,
+            "number": _heading_number(match.group(2)),
+            "title": line,
+        })
+    return headings
+
+
+def _find_numbered_headings(text: str) -> List[Dict[str, Any]]:
+    """
+    หัวข้อแบบ "1. ชื่อหัวข้อ" ที่เลขเรียงต่อกัน 1, 2, 3, ...
+    บรรทัดที่ตามด้วยบรรทัดเลขข้อถัดไปทันที (ไม่มีเนื้อหาคั่น) ถือเป็นรายการ ไม่ใช่หัวข้อ
+    """
+    candidates = [
+        match for match in _NUMBERED_HEADING.finditer(text)
+        if len(match.group(0).strip()) <= _MAX_NUMBERED_HEADING_CHARS
+        and not match.group(0).strip().endswith((".", ",", ";", ":"))
+    ]
+    headings = []
+    expected = 1
+    for i, match in enumerate(candidates):
+        if i + 1 < len(candidates) and len(text[match.end():candidates[i + 1].start()].strip()) < _MIN_SECTION_BODY_CHARS:
+            continue
+        if int(match.group(1)) != expected:
+            continue
+        headings.append({
+            "offset": match.start() + (len(match.group(0)) - len(match.group(0).lstrip())),
+            "line_end": match.end(),
+            "kind": "numbered",
+            "number": expected,
+            "title": match.group(0).strip(),
+        })
+        expected += 1
+    return headings if len(headings) >= 2 else []
+
+
+def _find_units(text: str) -> List[Dict[str, Any]]:
+    """หน่วยย่อย (มาตรา/ข้อ/คำถาม:) พร้อมเลข ในรูปแบบเดียวกับหัวข้อ เพื่อใช้ตรวจความต่อเนื่องของเลขได้"""
+    units = []
+    for match in _UNIT_LINE.finditer(text):
+        line = match.group(0).strip()
+        number = re.search(r'[\d๐-๙]+', line)
+        units.append({
+            "offset": match.start() + (len(match.group(0)) - len(match.group(0).lstrip())),
+            "kind": "มาตรา" if line.startswith("มาตรา") else "ข้อ" if line.startswith("ข้อ") else "คำถาม",
+            "number": int(number.group(0)) if number else None,
+        })
+    return units
+
+
+def _attach_subtitle(text: str, heading: Dict[str, Any]):
+    """
+    กฎหมายไทยมักเขียนหัวข้อสองบรรทัด ("หมวด ๑" / "บททั่วไป")
+    ถ้าบรรทัดหัวข้อมีแค่ชื่อกับเลข ให้ต่อบรรทัดถัดไป (ถ้าสั้นและไม่ใช่หัวข้อ/หน่วยย่อย) เข้าไปในชื่อ
+    """
+    if heading["kind"] == "numbered" or len(heading["title"].split()) > 2:
+        return
+    next_start = heading["line_end"] + 1
+    next_end = text.find("\n", next_start)
+    next_end = len(text) if next_end == -1 else next_end
+    next_line = text[next_start:next_end].strip()
+    if (
+        next_line
+        and len(next_line) <= _MAX_NUMBERED_HEADING_CHARS
+        and not _SECTION_HEADING.match(next_line)
+        and not _UNIT_LINE.match(next_line)
+    ):
+        heading["title"] = f"{heading['title']} {next_line}"
+        heading["line_end"] = next_end
+
+
+def _merge_heading_only_sections(text: str, headings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """หัวข้อที่ตามด้วยหัวข้ออีกตัวทันที (เช่น "ภาค ๑" แล้ว "หมวด ๑") รวมเป็น Section เดียว"""
+    merged: List[Dict[str, Any]] = []
+    for heading in headings:
+        if merged:
+            previous = merged[-1]
+            body = text[previous["line_end"]:heading["offset"]].strip()
+            if len(body) < _MIN_SECTION_BODY_CHARS:
+                if previous["title"].count(" / ") < 1:
+                    previous["title"] = f"{previous['title']} / {heading['title']}"
+                previous["line_end"] = heading["line_end"]
+                continue
+        merged.append(dict(heading))
+    return merged
+
+
+def _sequence_consistency(headings: List[Dict[str, Any]]) -> float:
+    """
+    สัดส่วนของหัวข้อที่เลขต่อเนื่องจากหัวข้อชนิดเดียวกันก่อนหน้า (หรือเริ่มนับใหม่ที่ 1)
+    หัวข้อระดับสูงกว่าจะรีเซ็ตตัวนับของระดับที่ต่ำกว่า (เช่น "ส่วนที่" นับใหม่ในแต่ละ "หมวด")
+    """
+    numbered = [heading for heading in headings if heading["number"] is not None]
+    if not numbered:
+        return 1.0
+    last_number: Dict[str, int] = {}
+    consistent = 0
+    for heading in numbered:
+        kind = heading["kind"]
+        level = _SECTION_LEVELS.get(kind, 1)
+        expected = last_number.get(kind, 0) + 1
+        if heading["number"] in (expected, 1):
+            consistent += 1
+        last_number[kind] = heading["number"]
+        for other_kind in list(last_number):
+            if _SECTION_LEVELS.get(other_kind, 1) > level:
+                del last_number[other_kind]
+    return consistent / len(numbered)
+
+
+def recommend_strategy(section_text: str) -> str:
+    """กลยุทธ์ที่แนะนำของ Section ("structural" ถ้ามีหน่วยย่อย มาตรา/ข้อ/คำถาม: ตั้งแต่ 2 หน่วย ไม่เช่นนั้น "recursive")"""
+    units = len(_UNIT_LINE.findall(section_text))
+    return "structural" if units >= _MIN_UNITS_FOR_STRUCTURAL else "recursive"
+
+
+def analyze_layout_rules(text: str) -> Dict[str, Any]:
+    """
+    สร้าง layout_map จากรูปแบบหัวข้อในเอกสาร (ไม่เรียก LLM)
+
+    Returns:
+        Dict[str, Any]: {
+            "layout_map": {"sections": [...]} หรือ None ถ้าไม่พบโครงสร้าง,
+            "coverage": สัดส่วนของเอกสารที่อยู่ใน Section ซึ่งเริ่มด้วยหัวข้อที่ตรวจพบ (0-1),
+            "confidence": ความมั่นใจโดยรวม (0-1) = coverage x ความต่อเนื่องของเลขหัวข้อ,
+            "headings": จำนวนหัวข้อที่ใช้แบ่ง Section,
+        }
+    """
+    result = {"layout_map": None, "coverage": 0.0, "confidence": 0.0, "headings": 0}
+    if not text.strip():
+        return result
+
+    headings = _find_section_headings(text) or _find_numbered_headings(text)
+    for heading in headings:
+        _attach_subtitle(text, heading)
+    # ตรวจความต่อเนื่องของเลขก่อนรวมหัวข้อ (หลังรวมแล้วหัวข้อบางตัวจะหายไปจากลำดับ)
+    sequence_consistency = _sequence_consistency(headings)
+    headings = _merge_heading_only_sections(text, headings)
+
+    if not headings:
+        # ไม่มีหัวข้อระดับ "ส่วน" แต่มีหน่วยย่อยเรียงกันทั้งฉบับ (เช่น กฎหมายสั้นที่มีแต่มาตรา)
+        units = _find_units(text)
+        if len(units) < _MIN_UNITS_FOR_STRUCTURAL:
+            return result
+        first = units[0]["offset"]
+        coverage = (len(text) - first) / len(text)
+        # หน่วยย่อยต้องกระจายทั่วเอกสาร: บรรทัด "ข้อ 1" หลงมาไม่กี่บรรทัดในบทความยาวไม่ใช่โครงสร้างของทั้งฉบับ
+        density = min(1.0, len(units) * _MAX_CHARS_PER_UNIT / max(1, len(text) - first))
+        confidence = coverage * density * _sequence_consistency(units)
+        if len(units) < _MIN_UNITS_FOR_FULL_CONFIDENCE:
+            confidence *= 0.5
+        result.update({
+            "layout_map": {"sections": [{
+                "section_id": 1, "title": "Full Document",
+                "char_start": 0, "char_end": len(text),
+                "recommended_strategy": "structural",
+            }]},
+            "coverage": coverage,
+            "confidence": confidence,
+        })
+        return result
+
+    sections = []
+    if text[:headings[0]["offset"]].strip():
+        sections.append({"title": "ส่วนนำ", "char_start": 0})
+    else:
+        headings[0]["offset"] = 0
+    for heading in headings:
+        sections.append({"title": heading["title"], "char_start": heading["offset"]})
+    for i, section in enumerate(sections):
+        section["section_id"] = i + 1
+        section["char_end"] = sections[i + 1]["char_start"] if i + 1 < len(sections) else len(text)
+        section["recommended_strategy"] = recommend_strategy(text[section["char_start"]:section["char_end"]])
+
+    preamble = sections[0]["char_end"] if sections[0]["title"] == "ส่วนนำ" else 0
+    coverage = (len(text) - preamble) / len(text)
+    # หัวข้อเดียวแบ่งอะไรไม่ได้มาก จึงลดความมั่นใจลงครึ่งหนึ่ง
+    confidence = coverage * sequence_consistency * (1.0 if len(headings) >= 2 else 0.5)
+    result.update({
+        "layout_map": {"sections": sections},
+        "coverage": coverage,
+        "confidence": confidence,
+        "headings": len(headings),
+    })
+    return result
@@ -16,11 +16,12 @@ class GraphState(TypedDict):
         error_message (str | None): เก็บข้อความ Error หากมีข้อผิดพลาดเกิดขึ้น
 
         # --- [V2] Fields สำหรับ "นักวิเคราะห์โครงสร้าง" ---
-        layout_map: Dict[str, Any]  # <-- [ใหม่!] เก็บแผนผังโครงสร้าง (Layout Map)
+        layout_map: Dict[str, Any]  # <-- [ใหม่!] เก็บแผนผังโครงสร้าง (Layout Map) ไฟล์ .docx จะได้มาตั้งแต่สถานี Preprocess
         
         # --- [V5] Fields สำหรับ "แพทย์ผู้เชี่ยวชาญ" ---
         validation_passes: int
         retry_history: List[Dict[str, Any]] # <-- "แฟ้มประวัติผู้ป่วย" (เหมือน V4)
+        validation_stats: Dict[str, Any] # <-- สถิติการตรวจรอบล่าสุด (จำนวนที่ตรวจ, cache hit ฯลฯ)
 
         # --- [ใหม่!] ขั้นตอนที่ 1: เพิ่ม Field สำหรับ Dify ---
         dify_integration_config: Dict[str, Any]
@@ -38,6 +39,7 @@ class GraphState(TypedDict):
     # --- [V5] ---
     validation_passes: int
     retry_history: List[Dict[str, Any]]
+    validation_stats: Dict[str, Any]
 
     # --- [ใหม่!] Field สำหรับ Dify ---
     dify_integration_config: Dict[str, Any]
\ No newline at end of file
@@ -0,0 +1,57 @@
+# agentic_rag_pipeline/graph_agent/validation_sampling.py
+
+import math
+import random
+import hashlib
+from statistics import NormalDist
+from typing import List, Dict, Any, Tuple
+
+# --- การตรวจแบบสุ่มตัวอย่าง (Sampling Validation) สำหรับเอกสารขนาดใหญ่ ---
+# แทนที่จะให้ LLM ตรวจทุก Chunk จะสุ่มตรวจแบบแบ่งชั้น (Stratified) ตาม Section + กลยุทธ์
+# แล้วหยุดเมื่อ "ขอบบนของอัตราความล้มเหลว" (Wilson upper bound) ต่ำกว่าเกณฑ์ที่ยอมรับได้
+
+
+def wilson_upper_bound(failures: int, n: int, confidence: float) -> float:
+    """
+    ขอบบนแบบด้านเดียว (one-sided) ของสัดส่วนความล้มเหลว ด้วย Wilson score interval
+
+    Args:
+        failures (int): จำนวนที่ไม่ผ่าน
+        n (int): จำนวนที่ตรวจแล้วทั้งหมด
+        confidence (float): ระดับความเชื่อมั่น (เช่น 0.95)
+    """
+    if n <= 0:
+        return 1.0
+    z = NormalDist().inv_cdf(confidence)
+    p = failures / n
+    denominator = 1 + z * z / n
+    center = p + z * z / (2 * n)
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n))
+    return min(1.0, (center + margin) / denominator)
+
+
+def stratified_order(items: List[Tuple[int, Dict[str, Any]]], seed: str) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    เรียงลำดับการสุ่มตรวจแบบแบ่งชั้น: จัดกลุ่มตาม (Section ID, กลยุทธ์) สุ่มลำดับภายในกลุ่ม
+    แล้วหยิบสลับกลุ่มละชิ้น (round-robin) ทำให้ทุกกลุ่มถูกตรวจอย่างน้อยหนึ่งชิ้นก่อน
+
+    ลำดับขึ้นกับ seed เท่านั้น (ผู้เรียกใช้ hash ของเนื้อหา Chunks) ผลการสุ่มจึงเหมือนเดิมทุกครั้งสำหรับ Chunks ชุดเดียวกัน
+    """
+    strata: Dict[Tuple[str, str], List[Tuple[int, Dict[str, Any]]]] = {}
+    for item in items:
+        fields = item[1]
+        strata.setdefault((str(fields.get("section_id")), str(fields.get("strategy_used"))), []).append(item)
+
+    rng = random.Random(int(hashlib.sha256(seed.encode("utf-8")).hexdigest()[:16], 16))
+    groups = list(strata.values())
+    for group in groups:
+        rng.shuffle(group)
+
+    ordered = []
+    depth = 0
+    while len(ordered) < len(items):
+        for group in groups:
+            if depth < len(group):
+                ordered.append(group[depth])
+        depth += 1
+    return ordered
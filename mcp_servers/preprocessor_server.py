@@ -5,15 +5,18 @@ from fastapi import FastAPI, BackgroundTasks, UploadFile, File, Form # <-- [ใ
 from pydantic import BaseModel
 from typing import List, Dict, Any
 from fastapi.openapi.utils import get_openapi
+from fastapi.responses import StreamingResponse
 from typing import Optional
 import tempfile # <-- [ใหม่!] ขั้นตอนที่ 4: เพิ่ม Import
 import os       # <-- [ใหม่!] ขั้นตอนที่ 4: เพิ่ม Import
+import json
 
 # --- Import "เครื่องมือ" ของเรา ---
 from agentic_rag_pipeline.components import document_preprocessor
 from agentic_rag_pipeline.components import metadata_generator
 from agentic_rag_pipeline.components import chunker
 from agentic_rag_pipeline.components import indexer
+from agentic_rag_pipeline.core.llm_provider import get_llm_client_stats
 
 # --- [ใหม่!] ขั้นตอนที่ 4: Import "โรงงาน" (Graph) ---
 from agentic_rag_pipeline.graph_agent.graph import graph_app
@@ -61,18 +64,47 @@ class PreprocessResponse(BaseModel):
     clean_text: str
     status: str
     message: str
+    layout_map: Optional[Dict[str, Any]] = None  # มีเฉพาะไฟล์ที่มีโครงสร้างในตัว (.docx)
 
 @app.post("/tools/preprocess_document", response_model=PreprocessResponse, tags=["Pipeline Tools"])
 async def preprocess_document_endpoint(request: PreprocessRequest):
     """Tool 1: Takes a file path, returns clean, proofread text."""
     try:
-        clean_text = document_preprocessor.process_document(request.file_path)
+        clean_text, layout_map = document_preprocessor.process_document_with_layout(request.file_path)
         if not clean_text:
             return PreprocessResponse(clean_text="", status="error", message="Failed to process document.")
-        return PreprocessResponse(clean_text=clean_text, status="success", message="Document processed.")
+        return PreprocessResponse(clean_text=clean_text, status="success", message="Document processed.", layout_map=layout_map)
     except Exception as e:
         return PreprocessResponse(clean_text="", status="error", message=f"Server error: {e}")
 
+# === Tool 1 (Streaming): Document Preprocessor แบบทีละหน้า ======================
+@app.post("/tools/preprocess_document_stream", tags=["Pipeline Tools"])
+def preprocess_document_stream_endpoint(request: PreprocessRequest):
+    """
+    Tool 1 (Streaming): Takes a file path, streams clean text page by page as NDJSON.
+    Each line is {"type": "page", "page_number", "total_pages", "text"}, and the last line is
+    {"type": "done", "status": "success" | "error", "message"} (plus "layout_map" for files with native structure, e.g. .docx).
+    """
+    def event_stream():
+        pages_sent = 0
+        layout_map = None
+        try:
+            for segment in document_preprocessor.iter_process_document(request.file_path):
+                pages_sent += 1
+                layout_map = segment.pop("layout_map", layout_map)
+                yield json.dumps({"type": "page", **segment}, ensure_ascii=False) + "\n"
+            if pages_sent:
+                done = {"type": "done", "status": "success", "message": f"Document processed ({pages_sent} segments)."}
+                if layout_map:
+                    done["layout_map"] = layout_map
+            else:
+                done = {"type": "done", "status": "error", "message": "Failed to process document."}
+        except Exception as e:
+            done = {"type": "done", "status": "error", "message": f"Server error: {e}"}
+        yield json.dumps(done, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
 # ... (Endpoint ของ Tool 2, 3, 4 ไม่ต้องแก้ไข เหมือนเดิมทุกประการ) ...
 
 # === Tool 2: Metadata Generator ==========================================
@@ -85,7 +117,8 @@ class MetadataResponse(BaseModel):
     status: str
 
 @app.post("/tools/generate_metadata", response_model=MetadataResponse, tags=["Pipeline Tools"])
-async def generate_metadata_endpoint(request: MetadataRequest):
+def generate_metadata_endpoint(request: MetadataRequest):
+    # (sync def: FastAPI จะรันใน threadpool จึงไม่บล็อก Event Loop ระหว่างที่ preprocess แบบ Streaming ยังทำงานอยู่)
     """Tool 2: Takes clean text, returns structured metadata."""
     metadata = metadata_generator.generate_metadata_for_text(request.clean_text, request.original_filename)
     return MetadataResponse(metadata=metadata, status="success")
@@ -138,6 +171,18 @@ async def index_document_endpoint(request: IndexRequest):
     else:
         return IndexResponse(success=False, message="Indexing failed. Check server logs.")
 
+@app.get("/stats", tags=["Monitoring"])
+def stats_endpoint():
+    """สถิติการทำงานของ Client กลาง: limit ปัจจุบันของ LLM/OCR (AIMD), cache, คำขอที่ถูกรวม (single-flight) และจำนวน Request"""
+    return {
+        "llm": get_llm_client_stats(),
+        "ocr": {
+            "concurrency": document_preprocessor.get_ocr_concurrency_stats(),
+            "cache": document_preprocessor.get_ocr_cache_stats(),
+            "single_flight": document_preprocessor.get_ocr_single_flight_stats(),
+        },
+    }
+
 # ==============================================================================
 # [ใหม่!] ขั้นตอนที่ 4: สร้าง Dify Integration Endpoint
 # ==============================================================================
@@ -6,7 +6,7 @@ from qdrant_client import models, QdrantClient
 
 # --- Import ส่วนประกอบจากโปรเจกต์ของเรา ---
 from agentic_rag_pipeline import config
-from agentic_rag_pipeline.core.llm_provider import get_embed_model
+from agentic_rag_pipeline.core.llm_provider import get_embedding_engine
 
 def get_source_db_connection():
     """เชื่อมต่อฐานข้อมูลต้นทาง (PostgreSQL ของ Agent)"""
@@ -40,16 +40,16 @@ def main():
 
     conn = get_source_db_connection()
     qdrant_client = get_destination_qdrant_client()
-    embed_model = get_embed_model() # โหลด Embedding model เพื่อเอาขนาดของ Vector
+    embedding_engine = get_embedding_engine() # โหลด Embedding Engine กลางเพื่อเอาขนาดของ Vector
 
-    if not conn or not qdrant_client or not embed_model:
+    if not conn or not qdrant_client or not embedding_engine:
         print("!!! ไม่สามารถเริ่มกระบวนการได้เนื่องจากการเชื่อมต่อล้มเหลว !!!")
         return
 
     # แก้ไขให้ใช้ Config ใหม่สำหรับ Agent Qdrant
     collection_name = config.AGENT_QDRANT_COLLECTION_NAME
     # ดึงขนาด vector จาก model ที่เราใช้ใน pipeline
-    vector_size = embed_model.get_sentence_embedding_dimension()
+    vector_size = embedding_engine.dimension
 
     # --- 1. อ่านข้อมูล Chunks ทั้งหมดจาก PostgreSQL ---
     points_to_upsert = []
@@ -0,0 +1,267 @@
+# agentic_rag_pipeline/tests/test_components.py
+
+import re
+
+import pytest
+
+from agentic_rag_pipeline.benchmarks.bench_structural_splitter import _legacy_split, _make_law_compilation
+from agentic_rag_pipeline.components import chunker
+from agentic_rag_pipeline.components import document_preprocessor as dp
+from agentic_rag_pipeline.components import structural_splitter
+from agentic_rag_pipeline.components.html_table_converter import html_table_to_markdown
+from agentic_rag_pipeline.components.structural_splitter import ARTICLE, CLAUSE, split_structural
+
+
+# --- OCR แบบ Streaming (document_preprocessor) ---
+
+def _fake_convert(broken_windows=(), missing_pages=()):
+    def convert_from_path(file_path, first_page, last_page, **kwargs):
+        if (first_page, last_page) in broken_windows:
+            raise RuntimeError("poppler crashed")
+        return [f"img{page}" for page in range(first_page, last_page + 1) if page not in missing_pages]
+    return convert_from_path
+
+
+def test_ocr_pages_stay_aligned_when_rasterizer_drops_a_page(monkeypatch):
+    monkeypatch.setattr(dp, "convert_from_path", _fake_convert(missing_pages={5}))
+    monkeypatch.setattr(dp, "_ocr_image", lambda image: image)
+    monkeypatch.setattr(dp.config, "OCR_PAGE_WINDOW", 8)
+
+    pages = list(dp._iter_ocr_pdf_pages("doc.pdf", [2, 3, 4, 5, 6, 7, 9]))
+
+    assert pages == [(2, "img2"), (3, "img3"), (4, "img4"), (5, ""), (6, "img6"), (7, "img7"), (9, "img9")]
+
+
+def test_ocr_window_failure_falls_back_to_single_pages(monkeypatch):
+    monkeypatch.setattr(dp, "convert_from_path", _fake_convert(broken_windows={(1, 3)}))
+    monkeypatch.setattr(dp, "_ocr_image", lambda image: image)
+    monkeypatch.setattr(dp.config, "OCR_PAGE_WINDOW", 3)
+
+    pages = list(dp._iter_ocr_pdf_pages("doc.pdf", range(1, 7)))
+
+    assert pages == [(page, f"img{page}") for page in range(1, 7)]
+
+
+def test_pdf_pages_merge_text_layer_and_ocr_in_order(monkeypatch):
+    monkeypatch.setattr(dp, "convert_from_path", _fake_convert(missing_pages={3}))
+    monkeypatch.setattr(dp, "_ocr_image", lambda image: image)
+    monkeypatch.setattr(dp, "_extract_pdf_text_layer", lambda file_path: {1: "text1", 4: "text4"})
+    monkeypatch.setattr(dp.config, "PDF_TEXT_LAYER_ENABLED", True)
+
+    pages = list(dp._iter_pdf_pages("doc.pdf", 5))
+
+    assert pages == [(1, "text1"), (2, "img2"), (3, ""), (4, "text4"), (5, "img5")]
+
+
+# --- พิสูจน์อักษร (document_preprocessor) ---
+
+def test_split_text_parts_cuts_at_boundaries_and_is_lossless():
+    text = "ย่อหน้าแรก ยาวพอสมควร\n\nย่อหน้าที่สอง บรรทัดหนึ่ง\nบรรทัดสอง มีคำหลายคำ\n\n" * 20
+
+    parts = dp._split_text_parts(text, 100)
+
+    assert "".join(parts) == text
+    assert all(len(part) <= 100 for part in parts)
+    assert all(part.endswith(("\n", " ")) for part in parts[:-1])
+
+
+def test_split_text_parts_hard_cuts_only_without_separators():
+    text = "ก" * 250
+
+    assert dp._split_text_parts(text, 100) == ["ก" * 100, "ก" * 100, "ก" * 50]
+    assert dp._split_text_parts("สั้น", 100) == ["สั้น"]
+
+
+class _ScriptedLLM:
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    def complete(self, prompt, refresh=False):
+        self.calls.append(refresh)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return type("Response", (), {"text": reply})()
+
+
+def test_proofread_part_does_not_retry_llm_errors(monkeypatch):
+    monkeypatch.setattr(dp.config, "PROOFREAD_MODE", "full")
+    llm = _ScriptedLLM(RuntimeError("LLM call failed after 5 attempts"))
+
+    assert dp._proofread_part("  ข้อความเดิม\n", llm) == "  ข้อความเดิม\n"
+    assert llm.calls == [False]
+
+
+def test_proofread_part_reasks_unparseable_edits_without_cache(monkeypatch):
+    monkeypatch.setattr(dp.config, "PROOFREAD_MODE", "edits")
+    monkeypatch.setattr(dp.config, "PROOFREAD_MAX_RETRIES", 2)
+    monkeypatch.setattr(dp.time, "sleep", lambda seconds: pytest.fail("should not sleep"))
+    llm = _ScriptedLLM("ขออภัย", '{"corrections": [{"original": "กฏหมาย", "replacement": "กฎหมาย"}]}')
+
+    assert dp._proofread_part("ตามกฏหมาย", llm) == "ตามกฎหมาย"
+    assert llm.calls == [False, True]
+
+
+def test_apply_corrections_replaces_in_order_and_skips_bad_entries():
+    text = "ผู้ใดฝ่าฝืนมาตรา ๕ ต้องระวางโทษ และผู้ใดฝ่าฝืนมาตรา ๖"
+    corrections = [
+        {"original": "ผู้ใดฝ่าฝืน", "replacement": "ผู้ใดฝ่าฝีน"},
+        {"original": "ไม่มีในต้นฉบับ", "replacement": "x"},
+        "not a dict",
+        {"original": "", "replacement": "x"},
+        {"original": "ผู้ใดฝ่าฝืน", "replacement": "บุคคลใดฝ่าฝืน"},
+    ]
+
+    assert dp._apply_corrections(text, corrections) == "ผู้ใดฝ่าฝีนมาตรา ๕ ต้องระวางโทษ และบุคคลใดฝ่าฝืนมาตรา ๖"
+    assert dp._apply_corrections(text, []) == text
+
+
+def test_parse_corrections_rejects_non_json():
+    assert dp._parse_corrections('ผลลัพธ์: {"corrections": []}') == []
+    with pytest.raises(ValueError):
+        dp._parse_corrections("ไม่มีจุดที่ต้องแก้")
+    with pytest.raises(ValueError):
+        dp._parse_corrections('{"corrections": "none"}')
+
+
+# --- แปลงตาราง HTML (html_table_converter) ---
+
+def test_html_table_spreads_rowspan_and_colspan():
+    html = (
+        "<table><tr><th>ชื่อ</th><th colspan=2>คะแนน</th></tr>"
+        "<tr><td rowspan=2>ก</td><td>1</td><td>2</td></tr>"
+        "<tr><td>3</td><td>4|5</td></tr></table>"
+    )
+
+    assert html_table_to_markdown(html) == (
+        "| ชื่อ | คะแนน | คะแนน |\n"
+        "|:---|:---|:---|\n"
+        "| ก | 1 | 2 |\n"
+        "| ก | 3 | 4\\|5 |"
+    )
+
+
+def test_html_table_without_header_uses_column_numbers():
+    assert html_table_to_markdown("<table><tr><td>a<br>b</td><td>&amp;</td></tr></table>") == (
+        "| 0 | 1 |\n|:---|:---|\n| a b | & |"
+    )
+    with pytest.raises(ValueError):
+        html_table_to_markdown("<table></table>")
+
+
+def test_convert_html_tables_keeps_surrounding_text():
+    text = "ก่อน <table><tr><th>h</th></tr><tr><td>v</td></tr></table> หลัง"
+
+    converted = dp._convert_html_tables_to_markdown(text)
+
+    assert converted.startswith("ก่อน ") and converted.endswith(" หลัง")
+    assert "| h |" in converted and "<table" not in converted
+
+
+# --- Chunker: memo ราย Section ---
+
+def _semantic_layout(text):
+    return {"sections": [{"section_id": 1, "title": "ทั้งหมด", "char_start": 0, "char_end": len(text), "recommended_strategy": "semantic"}]}
+
+
+def test_failed_semantic_split_is_not_memoized_as_semantic(monkeypatch):
+    monkeypatch.setattr(chunker, "_section_memo", chunker.OrderedDict())
+    outcomes = iter([RuntimeError("embedding service down"), ["ประโยคแรก", "ประโยคสอง"]])
+
+    def semantic_split(text, breakpoint_threshold):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(chunker, "semantic_split", semantic_split)
+    text = "ประโยคแรก ประโยคสอง"
+
+    first = chunker.create_chunks_for_text(text, {}, "doc.txt", _semantic_layout(text), {})
+    second = chunker.create_chunks_for_text(text, {}, "doc.txt", _semantic_layout(text), {})
+    third = chunker.create_chunks_for_text(text, {}, "doc.txt", _semantic_layout(text), {})
+
+    assert [c["content"].rsplit("\n", 1)[-1] for c in first] == [text]
+    assert [c["content"].rsplit("\n", 1)[-1] for c in second] == ["ประโยคแรก", "ประโยคสอง"]
+    assert third == second
+    assert [c["metadata"]["chunk_number"] for c in second] == [1, 2]
+
+
+# --- DOCX: layout_map หลังพิสูจน์อักษร (document_preprocessor) ---
+
+_DOCX_TITLES = ["บทที่ 1 บทนำ", "บทที่ 2 วิธีการ", "บทที่ 3 ผลการทดลอง"]
+
+
+def _docx_with_toc(path):
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    document.add_paragraph("สารบัญ")
+    for title in _DOCX_TITLES:
+        document.add_paragraph(title)
+    for i, title in enumerate(_DOCX_TITLES):
+        document.add_heading(title, level=1)
+        document.add_paragraph(f"เนื้อหาของหัวข้อที่ {i + 1} " * 10)
+    document.save(str(path))
+    return str(path)
+
+
+def test_reanchor_keeps_docx_offsets_when_text_is_unchanged(tmp_path, monkeypatch):
+    monkeypatch.setattr(dp.config, "DOCX_NATIVE_LAYOUT_ENABLED", True)
+    text, layout_map = dp._extract_docx(_docx_with_toc(tmp_path / "toc.docx"))
+
+    reanchored = dp._reanchor_layout_map(layout_map, text)
+
+    assert [s["char_start"] for s in reanchored["sections"]] == [s["char_start"] for s in layout_map["sections"]]
+    assert [s["title"] for s in reanchored["sections"]] == ["ส่วนนำ"] + _DOCX_TITLES
+    assert text.index(_DOCX_TITLES[0]) < reanchored["sections"][1]["char_start"]  # ไม่ใช่บรรทัดในสารบัญ
+
+
+def test_reanchor_follows_shifted_headings_not_toc_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(dp.config, "DOCX_NATIVE_LAYOUT_ENABLED", True)
+    text, layout_map = dp._extract_docx(_docx_with_toc(tmp_path / "toc.docx"))
+    # พิสูจน์อักษรแก้คำในเนื้อหาจนความยาวเปลี่ยน หัวข้อจริงจึงเลื่อนไปจากตำแหน่งเดิม
+    proofread = text.replace("เนื้อหาของหัวข้อ", "เนื้อหาในหัวข้อ")
+
+    reanchored = dp._reanchor_layout_map(layout_map, proofread)
+
+    toc_end = proofread.index(_DOCX_TITLES[-1]) + len(_DOCX_TITLES[-1])
+    starts = [s["char_start"] for s in reanchored["sections"][1:]]
+    assert starts == [proofread.index(title, toc_end) for title in _DOCX_TITLES]
+    assert starts != [s["char_start"] for s in layout_map["sections"][1:]]
+    assert reanchored["sections"][-1]["char_end"] == len(proofread)
+
+
+# --- Structural Splitter ---
+
+def test_structural_splitter_matches_legacy_per_pattern_split():
+    text = _make_law_compilation(50_000)
+
+    pattern, pieces = split_structural(text, "กฎหมาย")
+
+    assert pattern == ARTICLE
+    assert pieces == _legacy_split(text)
+    assert all(re.match(r"มาตรา \d+ ", piece) for piece in pieces[1:])
+    assert len(pieces) == text.count("\nมาตรา ") + 1
+    assert not any(piece.startswith("มาตรา ๓") for piece in pieces)  # การอ้างถึงกลางประโยคไม่ใช่ขอบเขต
+
+
+def test_structural_splitter_uses_document_type_priority():
+    text = "ประกาศ\nข้อ 1 ให้ใช้บังคับ\nมาตรา 5 อ้างอิง\nข้อ 2 ให้ยกเลิก"
+
+    assert split_structural(text, "ระเบียบ") == (CLAUSE, ["ประกาศ", "ข้อ 1 ให้ใช้บังคับ\nมาตรา 5 อ้างอิง", "ข้อ 2 ให้ยกเลิก"])
+    assert split_structural(text, "ไม่รู้จัก")[0] == ARTICLE
+    assert split_structural("ไม่มีหัวข้อ", "กฎหมาย") == (None, [])
+
+
+def test_register_patterns_rejects_invalid_regex(monkeypatch):
+    monkeypatch.setattr(structural_splitter, "_PATTERN_REGISTRY", dict(structural_splitter._PATTERN_REGISTRY))
+    monkeypatch.setattr(structural_splitter, "_compiled", {})
+
+    structural_splitter.register_patterns("ภาคผนวก", [r"ภาคผนวก[ \t]*[ก-ฮ]"])
+    with pytest.raises(re.error):
+        structural_splitter.register_patterns("ภาคผนวก", [r"ภาคผนวก("])
+
+    assert split_structural("ก่อน\nภาคผนวก ก ตาราง\nภาคผนวก ข แบบฟอร์ม", "ภาคผนวก")[1] == [
+        "ก่อน", "ภาคผนวก ก ตาราง", "ภาคผนวก ข แบบฟอร์ม",
+    ]
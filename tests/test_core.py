@@ -0,0 +1,225 @@
+# agentic_rag_pipeline/tests/test_core.py
+
+import time
+import zlib
+import threading
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from agentic_rag_pipeline.core import cache as cache_module
+from agentic_rag_pipeline.core import concurrency
+from agentic_rag_pipeline.core import llm_provider
+from agentic_rag_pipeline.core.cache import DiskCache
+from agentic_rag_pipeline.core.concurrency import (
+    AdaptiveLimiter, SingleFlight, SingleFlightTimeout, OUTCOME_SUCCESS, OUTCOME_OVERLOAD, OUTCOME_ERROR
+)
+from agentic_rag_pipeline.core.embedding_cache import EmbeddingCache
+
+
+# --- Embedding Cache ---
+
+def _vector(text: str, dimension: int = 8) -> np.ndarray:
+    return np.random.default_rng(zlib.crc32(text.encode("utf-8"))).random(dimension, dtype=np.float32)
+
+
+def test_embedding_cache_survives_reopen(tmp_path):
+    texts = [f"ข้อความ {i}" for i in range(50)]
+    cache = EmbeddingCache(str(tmp_path), "bge-m3", dimension=8, max_entries=100)
+    cache.put_many(texts, np.stack([_vector(t) for t in texts]), normalize=True)
+
+    reopened = EmbeddingCache(str(tmp_path), "bge-m3", dimension=8, max_entries=100)
+    found = reopened.get_many(texts + ["ไม่มีใน cache"], normalize=True)
+
+    assert sorted(found) == list(range(50))
+    for i, text in enumerate(texts):
+        np.testing.assert_array_equal(found[i], _vector(text))
+    assert reopened.get_many(texts[:1], normalize=False) == {}
+
+
+def test_embedding_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "bge-m3", dimension=8, max_entries=3)
+    cache.put_many(["a", "b", "c"], np.stack([_vector(t) for t in "abc"]), normalize=True)
+    cache.get_many(["a"], normalize=True)
+    cache.put_many(["d"], np.stack([_vector("d")]), normalize=True)
+
+    found = cache.get_many(["a", "b", "c", "d"], normalize=True)
+
+    assert sorted(found) == [0, 2, 3]
+    np.testing.assert_array_equal(found[3], _vector("d"))
+
+
+def _fill_cache(directory: str, worker: int):
+    cache = EmbeddingCache(directory, "bge-m3", dimension=8, max_entries=10_000)
+    for batch in range(10):
+        texts = [f"w{worker}-b{batch}-{i}" for i in range(20)]
+        cache.put_many(texts, np.stack([_vector(t) for t in texts]), normalize=True)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="ต้องใช้ fork")
+def test_embedding_cache_allocates_rows_atomically_across_processes(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_fill_cache, args=(str(tmp_path), w)) for w in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    assert all(process.exitcode == 0 for process in workers)
+
+    texts = [f"w{w}-b{b}-{i}" for w in range(4) for b in range(10) for i in range(20)]
+    found = EmbeddingCache(str(tmp_path), "bge-m3", dimension=8, max_entries=10_000).get_many(texts, normalize=True)
+
+    assert len(found) == len(texts)
+    for i, text in enumerate(texts):
+        np.testing.assert_array_equal(found[i], _vector(text))
+
+
+# --- Disk Cache ---
+
+def test_disk_cache_expires_entries_after_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache = DiskCache(str(tmp_path / "cache.sqlite"), max_bytes=1024, ttl_seconds=60)
+    cache.set("a", "คำตอบ")
+
+    now[0] += 59
+    assert cache.get("a") == "คำตอบ"
+    now[0] += 2
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_disk_cache_evicts_least_recently_used_bytes(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache = DiskCache(str(tmp_path / "cache.sqlite"), max_bytes=10)
+    for key in "abc":
+        now[0] += 1
+        cache.set(key, "xxx")
+    now[0] += 1
+    cache.get("a")
+    now[0] += 1
+    cache.set("d", "xxx")
+
+    assert [cache.get(key) is not None for key in "abcd"] == [True, False, True, True]
+    cache.set("huge", "x" * 11)
+    assert cache.get("huge") is None
+
+
+# --- LLM Client: single-flight + cache ---
+
+def test_coalesced_follower_caches_result_when_leader_does_not(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_provider.config, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(llm_provider.config, "LLM_CACHE_ENABLED", True)
+    client = llm_provider.LLMClient()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def complete_with_limits(prompt, caller, expires_at):
+        calls.append(caller)
+        started.set()
+        release.wait(5)
+        return llm_provider.LLMResponse("คำตอบ")
+
+    monkeypatch.setattr(client, "_complete_with_limits", complete_with_limits)
+    leader = threading.Thread(target=client.complete, args=("prompt", "indexer", None, False))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=client.complete, args=("prompt", "validator", None, True))
+    follower.start()
+    while client.single_flight.stats()["coalesced"] == 0:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert calls == ["indexer"]
+    response = client.complete("prompt", "validator", use_cache=True)
+    assert (response.text, response.cached) == ("คำตอบ", True)
+
+
+# --- AdaptiveLimiter / SingleFlight (concurrency) ---
+
+def test_adaptive_limiter_grows_per_round_and_halves_on_overload(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(concurrency.time, "monotonic", lambda: now[0])
+    limiter = AdaptiveLimiter("test", min_limit=1, max_limit=4, initial_limit=2)
+
+    for _ in range(2):
+        assert limiter.acquire(timeout=0)
+        limiter.release(OUTCOME_SUCCESS, 0.1)
+    assert limiter.stats()["limit"] == 3
+
+    for outcome in (OUTCOME_OVERLOAD, OUTCOME_OVERLOAD, OUTCOME_ERROR):
+        assert limiter.acquire(timeout=0)
+        limiter.release(outcome, 0.1)
+    assert limiter.stats()["limit"] == 1  # ลดครั้งเดียวต่อช่วง cooldown แล้วชนขั้นต่ำ
+
+    assert limiter.acquire(timeout=0)
+    assert not limiter.acquire(timeout=0)
+    limiter.release(OUTCOME_SUCCESS, 0.1)
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_adaptive_limiter_does_not_grow_on_slow_success():
+    limiter = AdaptiveLimiter("test", min_limit=1, max_limit=4, initial_limit=1, latency_target_seconds=1.0)
+
+    for _ in range(3):
+        assert limiter.acquire(timeout=0)
+        limiter.release(OUTCOME_SUCCESS, 2.0)
+
+    assert limiter.stats()["limit"] == 1
+
+
+def test_single_flight_follower_times_out_while_leader_finishes():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    results = {}
+
+    def leader():
+        results["leader"] = flight.do("k", lambda: release.wait(5) and "ผลลัพธ์")
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    while flight.stats()["in_flight"] == 0:
+        time.sleep(0.001)
+
+    with pytest.raises(SingleFlightTimeout):
+        flight.do("k", lambda: pytest.fail("follower must not run fn"), timeout=0.05)
+    release.set()
+    thread.join()
+
+    assert results["leader"] == ("ผลลัพธ์", False)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_single_flight_shares_leader_exception():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    errors = []
+
+    def failing():
+        release.wait(5)
+        raise ValueError("boom")
+
+    def run(fn):
+        try:
+            flight.do("k", fn, timeout=5)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=run, args=(failing,))
+    leader.start()
+    while flight.stats()["in_flight"] == 0:
+        time.sleep(0.001)
+    follower = threading.Thread(target=run, args=(lambda: pytest.fail("follower must not run fn"),))
+    follower.start()
+    while flight.stats()["coalesced"] == 0:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert len(errors) == 2 and errors[0] is errors[1]
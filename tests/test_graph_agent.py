@@ -0,0 +1,261 @@
+# agentic_rag_pipeline/tests/test_graph_agent.py
+
+import json
+import time
+
+from agentic_rag_pipeline.components.chunker import create_chunks_for_text
+from agentic_rag_pipeline.graph_agent import nodes
+from agentic_rag_pipeline.graph_agent.pre_validator import find_mechanical_failures
+from agentic_rag_pipeline.graph_agent.rule_layout_analyzer import analyze_layout_rules
+from agentic_rag_pipeline.graph_agent.validation_sampling import stratified_order, wilson_upper_bound
+
+
+# --- Preprocess แบบ Streaming (nodes) ---
+
+class _StreamResponse:
+    def __init__(self, lines):
+        self.lines = lines
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.lines)
+
+
+def test_preprocess_stream_node_reports_truncated_stream(monkeypatch):
+    page = json.dumps({"type": "page", "page_number": 1, "total_pages": 2, "text": "หน้าแรก"}, ensure_ascii=False)
+    monkeypatch.setattr(nodes.requests, "post", lambda *args, **kwargs: _StreamResponse([page, '{"type": "pa']))
+
+    state = nodes.preprocess_stream_node({"file_path": "/data/doc.pdf"})
+
+    assert "Malformed preprocess stream" in state["error_message"]
+    assert "clean_text" not in state
+
+
+# --- การตรวจแบบสุ่มตัวอย่าง (validation_sampling) ---
+
+def _items(sections):
+    """sections = [(section_id, จำนวน Chunk), ...] -> [(ลำดับ, fields), ...]"""
+    items = []
+    for section_id, count in sections:
+        for _ in range(count):
+            i = len(items)
+            items.append((i, {
+                "previous_chunk_text": f"chunk {i - 1}",
+                "current_chunk_text": f"chunk {i}",
+                "section_id": section_id,
+                "section_title": f"Section {section_id}",
+                "strategy_used": "structural",
+            }))
+    return items
+
+
+def test_stratified_order_is_deterministic_and_covers_every_stratum_first():
+    items = _items([(1, 10), (2, 3), (3, 7)])
+
+    order = stratified_order(items, "seed")
+
+    assert order == stratified_order(items, "seed")
+    assert sorted(i for i, _ in order) == list(range(20))
+    assert {fields["section_id"] for _, fields in order[:3]} == {1, 2, 3}
+    assert [i for i, _ in order] != [i for i, _ in stratified_order(items, "another seed")]
+
+
+def test_wilson_upper_bound_shrinks_with_clean_samples():
+    assert wilson_upper_bound(0, 0, 0.95) == 1.0
+    assert wilson_upper_bound(0, 10, 0.95) > 0.05
+    assert wilson_upper_bound(0, 60, 0.95) <= 0.05
+    assert wilson_upper_bound(1, 60, 0.95) > wilson_upper_bound(0, 60, 0.95)
+
+
+def _fake_validate_pack(failing, calls):
+    def validate_pack(llm, pack, common):
+        calls.extend(i for i, _ in pack)
+        return {i: {"is_valid": i not in failing, "recommendation": {}} for i, _ in pack}
+    return validate_pack
+
+
+def test_sampling_stops_once_failure_rate_is_bounded(monkeypatch):
+    calls = []
+    monkeypatch.setattr(nodes, "_validate_pack", _fake_validate_pack(set(), calls))
+    monkeypatch.setattr(nodes.config, "VALIDATION_MAX_CONCURRENCY", 4)
+    monkeypatch.setattr(nodes.config, "VALIDATION_PACK_SIZE", 1)
+    items = _items([(1, 150), (2, 150)])
+
+    failure, passed, sampled = nodes._validate_chunks_by_sampling(None, items, {}, prior_passes=0, seed="doc")
+
+    assert failure is None
+    assert sampled == len(calls) == len(passed) < len(items)
+    assert nodes.wilson_upper_bound(0, sampled, 0.95) <= nodes.config.VALIDATION_SAMPLING_MAX_FAILURE_RATE
+
+
+def test_sampled_failure_escalates_to_the_whole_section(monkeypatch):
+    calls = []
+    failing = {4, 25}
+    monkeypatch.setattr(nodes, "_validate_pack", _fake_validate_pack(failing, calls))
+    monkeypatch.setattr(nodes.config, "VALIDATION_MAX_CONCURRENCY", 4)
+    monkeypatch.setattr(nodes.config, "VALIDATION_PACK_SIZE", 1)
+    items = _items([(1, 30), (2, 30)])
+
+    failure, passed, sampled = nodes._validate_chunks_by_sampling(None, items, {}, prior_passes=0, seed="doc")
+
+    assert failure[0] == 4
+    assert set(range(30)) <= set(calls)
+    assert set(range(30)) - failing <= set(passed)
+
+
+# --- ตรวจ Chunks พร้อมกัน (nodes) ---
+
+def test_concurrent_validation_reports_lowest_failing_index(monkeypatch):
+    def validate_pack(llm, pack, common):
+        # Chunk ลำดับต่ำกว่าเสร็จช้ากว่า: ผลที่ไม่ผ่านของลำดับสูงจะมาถึงก่อน
+        i = pack[0][0]
+        time.sleep(0.02 * (10 - i))
+        return {i: {"is_valid": i not in (3, 7)}}
+
+    monkeypatch.setattr(nodes, "_validate_pack", validate_pack)
+    monkeypatch.setattr(nodes.config, "VALIDATION_MAX_CONCURRENCY", 8)
+    monkeypatch.setattr(nodes.config, "VALIDATION_PACK_SIZE", 1)
+
+    for _ in range(3):
+        failure, passed = nodes._validate_chunks_concurrently(None, _items([(1, 10)]), {})
+        assert failure == (3, {"is_valid": False})
+        assert {0, 1, 2} <= set(passed) and 3 not in passed
+
+
+# --- ตรวจหลาย Chunk ใน Prompt เดียว (nodes) ---
+
+def test_parse_packed_verdicts_keeps_only_usable_entries():
+    text = """ผลตรวจ:
+    {"results": [
+        {"chunk_index": 1, "is_valid": true},
+        {"chunk_index": "2", "is_valid": false, "recommendation": {"action": "RETRY_SECTION"}},
+        {"chunk_index": 3, "is_valid": false},
+        {"chunk_index": 4, "is_valid": "yes"},
+        {"chunk_index": 9, "is_valid": true},
+        {"chunk_index": 1, "is_valid": false, "recommendation": {}}
+    ]}"""
+
+    verdicts = nodes._parse_packed_verdicts(text, expected={1, 2, 3, 4})
+
+    assert sorted(verdicts) == [1, 2]
+    assert verdicts[1]["is_valid"] is True
+    assert verdicts[2]["recommendation"] == {"action": "RETRY_SECTION"}
+    assert nodes._parse_packed_verdicts("ไม่ใช่ JSON", expected={1}) == {}
+    assert nodes._parse_packed_verdicts('{"results": "none"}', expected={1}) == {}
+
+
+# --- พยาบาลคัดกรอง (pre_validator) ---
+
+LAW_TEXT = """พระราชบัญญัติ
+การทดสอบระบบเอกสาร
+พ.ศ. ๒๕๖๙
+
+มาตรา ๑ พระราชบัญญัตินี้เรียกว่า "พระราชบัญญัติการทดสอบระบบเอกสาร พ.ศ. ๒๕๖๙"
+มาตรา ๒ พระราชบัญญัตินี้ให้ใช้บังคับตั้งแต่วันถัดจากวันประกาศในราชกิจจานุเบกษาเป็นต้นไป
+
+หมวด ๑
+บททั่วไป
+
+มาตรา ๓ ในพระราชบัญญัตินี้ "เอกสาร" หมายความว่า ข้อความที่บันทึกไว้ไม่ว่าในรูปแบบใด และให้หมายความรวมถึงข้อมูลอิเล็กทรอนิกส์ด้วย
+มาตรา ๔ ให้รัฐมนตรีว่าการกระทรวงดิจิทัลเพื่อเศรษฐกิจและสังคมรักษาการตามพระราชบัญญัตินี้ และให้มีอำนาจออกกฎกระทรวงเพื่อปฏิบัติการตามพระราชบัญญัตินี้
+มาตรา ๕ ผู้ใดจัดเก็บเอกสารต้องจัดให้มีระบบป้องกันการเข้าถึงโดยมิชอบตามหลักเกณฑ์ที่รัฐมนตรีประกาศกำหนด
+
+หมวด ๒
+การจัดเก็บเอกสาร
+
+มาตรา ๖ การจัดเก็บเอกสารต้องกระทำในลักษณะที่สามารถเข้าถึงและนำกลับมาใช้ได้โดยข้อความไม่เปลี่ยนแปลง
+มาตรา ๗ ผู้จัดเก็บเอกสารต้องเก็บรักษาเอกสารไว้ไม่น้อยกว่าห้าปีนับแต่วันที่จัดทำเอกสารนั้น เว้นแต่กฎหมายอื่นจะกำหนดไว้เป็นอย่างอื่น
+มาตรา ๘ ในกรณีที่เอกสารสูญหายหรือเสียหาย ผู้จัดเก็บต้องแจ้งต่อพนักงานเจ้าหน้าที่ภายในสิบห้าวันนับแต่วันที่ทราบเหตุ
+
+หมวด ๓
+บทกำหนดโทษ
+
+มาตรา ๙ ผู้ใดฝ่าฝืนมาตรา ๕ ต้องระวางโทษปรับไม่เกินหนึ่งแสนบาท
+มาตรา ๑๐ ผู้ใดฝ่าฝืนมาตรา ๗ หรือมาตรา ๘ ต้องระวางโทษปรับไม่เกินห้าหมื่นบาท
+"""
+
+
+def _chunk(body, section_id=1, strategy="structural"):
+    return {
+        "content": f"จากเอกสาร: ทดสอบ\nส่วน: Section {section_id}\n\n{body}",
+        "metadata": {"section_id": section_id, "section_title": f"Section {section_id}", "strategy_used": strategy},
+    }
+
+
+def test_structural_law_chunks_pass_mechanical_checks(monkeypatch):
+    monkeypatch.setattr(nodes.config, "PRE_VALIDATION_EMBEDDING_CHECK", False)
+    layout_map = analyze_layout_rules(LAW_TEXT)["layout_map"]
+    for section in layout_map["sections"]:
+        section["recommended_strategy"] = "structural"
+
+    chunks = create_chunks_for_text(LAW_TEXT, {"document_title": "ทดสอบ", "document_type": "กฎหมาย"}, "law.txt", layout_map, {})
+
+    assert any(chunk["content"].endswith("หมวด ๑\nบททั่วไป") for chunk in chunks)
+    assert find_mechanical_failures(chunks, []) == []
+
+
+def test_mechanical_failures_name_the_problem_and_next_strategy(monkeypatch):
+    monkeypatch.setattr(nodes.config, "PRE_VALIDATION_EMBEDDING_CHECK", False)
+    body = "ผู้ใดจัดเก็บเอกสารต้องจัดให้มีระบบป้องกันการเข้าถึงโดยมิชอบ"
+    chunks = [
+        _chunk(body),
+        _chunk("สั้น"),
+        _chunk("มาตรา ๕"),
+        _chunk("ิ" + body, strategy="recursive"),
+        _chunk(body[body.index("ต้อง"):]),
+        _chunk("สั้น", section_id=2),
+    ]
+
+    failures = find_mechanical_failures(chunks, [])
+
+    assert [(i, f["recommendation"]["suggestion"]) for i, f in failures] == [
+        (1, "recursive"), (2, "recursive"), (3, "semantic"), (4, "recursive"),
+    ]
+    assert "near_empty" in failures[0][1]["diagnose"] and "lone_heading" in failures[1][1]["diagnose"]
+    assert "mid_word_cut" in failures[2][1]["diagnose"] and "duplicate_overlap" in failures[3][1]["diagnose"]
+
+    history = [{"prescription_given": {"action": "RETRY_SECTION", "target_section_id": 1, "suggestion": "recursive"}}]
+    assert [i for i, _ in find_mechanical_failures(chunks, history)] == [3]
+
+
+# --- วิเคราะห์โครงสร้างแบบกฎ (rule_layout_analyzer) ---
+
+def test_layout_rules_split_law_at_chapter_headings():
+    result = analyze_layout_rules(LAW_TEXT)
+    sections = result["layout_map"]["sections"]
+
+    assert [section["title"] for section in sections] == [
+        "ส่วนนำ", "หมวด ๑ บททั่วไป", "หมวด ๒ การจัดเก็บเอกสาร", "หมวด ๓ บทกำหนดโทษ",
+    ]
+    assert all(LAW_TEXT.startswith("หมวด", section["char_start"]) for section in sections[1:])
+    assert [section["char_end"] for section in sections[:-1]] == [section["char_start"] for section in sections[1:]]
+    assert sections[-1]["char_end"] == len(LAW_TEXT)
+    assert {section["recommended_strategy"] for section in sections} == {"structural"}
+    assert result["headings"] == 3
+    assert result["confidence"] >= nodes.config.LAYOUT_RULES_MIN_CONFIDENCE
+
+
+def test_layout_rules_distrust_stray_units_in_prose():
+    essay = (
+        "ย่อหน้านี้อธิบายแนวคิดทั่วไปของการจัดการเอกสารในองค์กร " * 40
+        + "\nข้อ 1 ควรสำรองข้อมูล\nข้อ 2 ควรเข้ารหัส\n"
+        + "สรุปแล้วการจัดการเอกสารที่ดีช่วยลดความเสี่ยง " * 40
+    )
+
+    assert analyze_layout_rules(essay)["confidence"] < nodes.config.LAYOUT_RULES_MIN_CONFIDENCE
+    assert analyze_layout_rules("ข้อความธรรมดา ไม่มีหัวข้อใดๆ เลย")["layout_map"] is None
+
+
+def test_layout_rules_numbered_headings_skip_list_items():
+    report = (
+        "1. บทนำ\nรายงานนี้สรุปผลการทดลองระบบจัดเก็บเอกสาร\n"
+        "2. วิธีการ\nขั้นตอนการทดลองแบ่งออกเป็นสองขั้นตอนดังนี้\n1. เก็บข้อมูล\n2. วิเคราะห์\nแล้วจึงสรุปผลการวิเคราะห์ทั้งหมด\n"
+        "3. ผลการทดลอง\nระบบทำงานได้ถูกต้องทุกกรณีที่ทดสอบ\n"
+    )
+
+    sections = analyze_layout_rules(report)["layout_map"]["sections"]
+
+    assert [section["title"] for section in sections] == ["1. บทนำ", "2. วิธีการ", "3. ผลการทดลอง"]
+    assert [section["char_start"] for section in sections] == [0, report.index("2. วิธีการ"), report.index("3. ผลการทดลอง")]